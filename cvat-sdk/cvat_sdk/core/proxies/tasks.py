@@ -8,10 +8,12 @@ import io
 import json
 import mimetypes
 import shutil
+import tempfile
+import zipfile
 from enum import Enum
 from pathlib import Path
 from time import sleep
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Sequence, Tuple
 
 from PIL import Image
 
@@ -193,6 +195,50 @@ class Task(
         (_, response) = self.api.retrieve_data(self.id, number=frame_id, **params, type="frame")
         return io.BytesIO(response.data)
 
+    _FRAMES_PER_REQUEST = 1000
+
+    @staticmethod
+    def _format_frame_ranges(frame_ids: Sequence[int]) -> str:
+        ranges = []
+        for frame_id in frame_ids:
+            if ranges and ranges[-1][1] + 1 == frame_id:
+                ranges[-1][1] = frame_id
+            else:
+                ranges.append([frame_id, frame_id])
+
+        return ",".join(
+            str(start) if start == stop else f"{start}-{stop}" for start, stop in ranges
+        )
+
+    def _iterate_frames(
+        self, frame_ids: Sequence[int], *, quality: Optional[str] = None
+    ) -> Iterator[Tuple[int, io.BytesIO]]:
+        # Frames are requested in batches, each batch is returned by the server as a zip archive.
+        # The archive is spooled to a temporary file, so only one frame is kept in memory.
+        params = {}
+        if quality:
+            params["quality"] = quality
+
+        unique_frame_ids = sorted(set(frame_ids))
+        for batch_start in range(0, len(unique_frame_ids), self._FRAMES_PER_REQUEST):
+            batch = unique_frame_ids[batch_start : batch_start + self._FRAMES_PER_REQUEST]
+            (_, response) = self.api.retrieve_data(
+                self.id,
+                type="frames",
+                frames=self._format_frame_ranges(batch),
+                **params,
+                _parse_response=False,
+            )
+
+            with tempfile.TemporaryFile() as archive_file:
+                with response:
+                    shutil.copyfileobj(response, archive_file)
+
+                with zipfile.ZipFile(archive_file) as zip_file:
+                    for name in zip_file.namelist():
+                        frame_id = int(Path(name).stem.rsplit("_", maxsplit=1)[-1])
+                        yield frame_id, io.BytesIO(zip_file.read(name))
+
     def get_preview(
         self,
     ) -> io.RawIOBase:
@@ -232,9 +278,7 @@ class Task(
         outdir = Path(outdir)
         outdir.mkdir(parents=True, exist_ok=True)
 
-        for frame_id in frame_ids:
-            frame_bytes = self.get_frame(frame_id, quality=quality)
-
+        for frame_id, frame_bytes in self._iterate_frames(frame_ids, quality=quality):
             im = Image.open(frame_bytes)
             if image_extension is None:
                 mime_type = im.get_format_mimetype() or "image/jpg"
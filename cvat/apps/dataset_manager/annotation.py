@@ -5,7 +5,6 @@
 
 from copy import copy, deepcopy
 
-import math
 from typing import Optional, Sequence
 import numpy as np
 from itertools import chain
@@ -576,6 +575,21 @@ class TrackManager(ObjectManager):
 
             return copied
 
+        if included_frames is not None:
+            included_frames_array = np.unique(np.fromiter(included_frames, dtype=np.int64))
+        else:
+            included_frames_array = None
+
+        def get_frames(start_frame, stop_frame):
+            # Returns the requested frames in the (start_frame; stop_frame) interval
+            if included_frames_array is None:
+                return np.arange(start_frame + 1, stop_frame, dtype=np.int64)
+
+            return included_frames_array[
+                np.searchsorted(included_frames_array, start_frame, side="right"):
+                np.searchsorted(included_frames_array, stop_frame, side="left")
+            ]
+
         def find_angle_diff(right_angle, left_angle):
             angle_diff = right_angle - left_angle
             angle_diff = ((angle_diff + 180) % 360) - 180
@@ -587,196 +601,175 @@ class TrackManager(ObjectManager):
             return angle_diff
 
         def simple_interpolation(shape0, shape1):
-            shapes = []
-            distance = shape1["frame"] - shape0["frame"]
-            diff = np.subtract(shape1["points"], shape0["points"])
-
-            for frame in range(shape0["frame"] + 1, shape1["frame"]):
-                offset = (frame - shape0["frame"]) / distance
-                rotation = (shape0["rotation"] + find_angle_diff(
-                    shape1["rotation"], shape0["rotation"],
-                ) * offset + 360) % 360
-                points = shape0["points"] + diff * offset
-
-                if included_frames is None or frame in included_frames:
-                    shapes.append(copy_shape(shape0, frame, points, rotation))
-
-            return shapes
+            frames = get_frames(shape0["frame"], shape1["frame"])
+            if not len(frames):
+                return []
 
-        def simple_3d_interpolation(shape0, shape1):
-            result = simple_interpolation(shape0, shape1)
-            angles = (shape0["points"][3:6] + shape1["points"][3:6])
+            # All the in-between frames are computed at once,
+            # each row of the resulting arrays corresponds to a frame
             distance = shape1["frame"] - shape0["frame"]
+            offsets = (frames - shape0["frame"]) / distance
+            diff = np.subtract(shape1["points"], shape0["points"])
+            rotations = (shape0["rotation"] + find_angle_diff(
+                shape1["rotation"], shape0["rotation"],
+            ) * offsets + 360) % 360
+            points = np.asarray(shape0["points"]) + diff * offsets[:, np.newaxis]
 
-            for shape in result:
-                offset = (shape["frame"] - shape0["frame"]) / distance
-                for i, angle0 in enumerate(angles):
-                    if i < 3:
-                        angle1 = angles[i + 3]
-                        angle0 = (angle0 if angle0 >= 0 else angle0 + math.pi * 2) * 180 / math.pi
-                        angle1 = (angle1 if angle1 >= 0 else angle1 + math.pi * 2) * 180 / math.pi
-                        angle = angle0 + find_angle_diff(angle1, angle0) * offset * math.pi / 180
-                        shape["points"][i + 3] = angle if angle <= math.pi else angle - math.pi * 2
-
-            return result
+            return [
+                copy_shape(shape0, frame, frame_points, rotation)
+                for frame, frame_points, rotation in zip(
+                    frames.tolist(), points.tolist(), rotations.tolist()
+                )
+            ]
 
         def points_interpolation(shape0, shape1):
             if len(shape0["points"]) == 2 and len(shape1["points"]) == 2:
                 return simple_interpolation(shape0, shape1)
             else:
-                shapes = []
-                for frame in range(shape0["frame"] + 1, shape1["frame"]):
-                    if included_frames is None or frame in included_frames:
-                        shapes.append(copy_shape(shape0, frame))
+                return propagate(shape0, shape1["frame"])
 
-            return shapes
+        def interpolate_positions(left_points, right_points, offsets):
+            # Interpolates a polyshape for all the offsets at once.
+            # The point matching depends only on the keyframes, so it is computed once,
+            # and the per-frame point reduction is vectorized over the offsets.
+            def square(values):
+                # The array ** operator is a plain multiplication, which can be rounded
+                # differently than the scalar one. Keep the results the same for both.
+                return np.float_power(values, 2)
 
-        def interpolate_position(left_position, right_position, offset):
-            def to_array(points):
-                return np.asarray(
-                    list(map(lambda point: [point["x"], point["y"]], points))
-                ).flatten()
+            def compute_segment_lengths(points):
+                deltas = np.diff(points, axis=0)
+                return np.sqrt(square(deltas[:, 0]) + square(deltas[:, 1]))
 
-            def to_points(array):
-                return list(map(
-                    lambda point: {"x": point[0], "y": point[1]}, np.asarray(array).reshape(-1, 2)
-                ))
+            def curve_length(segment_lengths):
+                # The lengths are accumulated sequentially to get
+                # the same values as in the offset vector
+                return np.cumsum(segment_lengths)[-1] if len(segment_lengths) else 0
+
+            def curve_to_offset_vec(segment_lengths):
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    return np.concatenate((
+                        [0], np.cumsum(segment_lengths) / curve_length(segment_lengths)
+                    ))
 
-            def curve_length(points):
-                length = 0
-                for i in range(1, len(points)):
-                    dx = points[i]["x"] - points[i - 1]["x"]
-                    dy = points[i]["y"] - points[i - 1]["y"]
-                    length += np.sqrt(dx ** 2 + dy ** 2)
-                return length
-
-            def curve_to_offset_vec(points, length):
-                offset_vector = [0]
-                accumulated_length = 0
-                for i in range(1, len(points)):
-                    dx = points[i]["x"] - points[i - 1]["x"]
-                    dy = points[i]["y"] - points[i - 1]["y"]
-                    accumulated_length += np.sqrt(dx ** 2 + dy ** 2)
-                    offset_vector.append(accumulated_length / length)
-
-                return offset_vector
-
-            def find_nearest_pair(value, curve):
-                minimum = [0, abs(value - curve[0])]
-                for i in range(1, len(curve)):
-                    distance = abs(value - curve[i])
-                    if distance < minimum[1]:
-                        minimum = [i, distance]
-
-                return minimum[0]
+            def find_nearest_pairs(values, curve):
+                distances = np.abs(values[:, np.newaxis] - curve[np.newaxis, :])
+
+                # Zero-length curves produce NaN offsets, they never match
+                distances[np.isnan(distances)] = np.inf
+
+                return np.argmin(distances, axis=1)
 
             def match_left_right(left_curve, right_curve):
-                matching = {}
-                for i, left_curve_item in enumerate(left_curve):
-                    matching[i] = [find_nearest_pair(left_curve_item, right_curve)]
-                return matching
+                return find_nearest_pairs(left_curve, right_curve)
 
             def match_right_left(left_curve, right_curve, left_right_matching):
-                matched_right_points = list(chain.from_iterable(left_right_matching.values()))
-                unmatched_right_points = filter(lambda x: x not in matched_right_points, range(len(right_curve)))
-                updated_matching = deepcopy_simple(left_right_matching)
-
-                for right_point in unmatched_right_points:
-                    left_point = find_nearest_pair(right_curve[right_point], left_curve)
-                    updated_matching[left_point].append(right_point)
-
-                for key, value in updated_matching.items():
-                    updated_matching[key] = sorted(value)
-
-                return updated_matching
-
-            def reduce_interpolation(interpolated_points, matching, left_points, right_points):
-                def average_point(points):
-                    sumX = 0
-                    sumY = 0
-                    for point in points:
-                        sumX += point["x"]
-                        sumY += point["y"]
-
-                    return {
-                        "x": sumX / len(points),
-                        "y": sumY / len(points)
-                    }
+                unmatched_right_points = np.setdiff1d(
+                    np.arange(len(right_curve)), left_right_matching
+                )
+                unmatched_left_matching = find_nearest_pairs(
+                    right_curve[unmatched_right_points], left_curve
+                )
+
+                # The matching is returned as a list of (left, right) index pairs,
+                # sorted by the left and then by the right point index
+                left_indices = np.concatenate((
+                    np.arange(len(left_curve)), unmatched_left_matching
+                ))
+                right_indices = np.concatenate((left_right_matching, unmatched_right_points))
+                order = np.lexsort((right_indices, left_indices))
+
+                return left_indices[order], right_indices[order]
+
+            def reduce_interpolation(interpolated_points, matching,
+                left_segment_lengths, right_segment_lengths
+            ):
+                def average_point(point0, point1):
+                    return (point0 + point1) / 2
 
                 def compute_distance(point1, point2):
                     return np.sqrt(
-                        ((point1["x"] - point2["x"])) ** 2
-                        + ((point1["y"] - point2["y"]) ** 2)
+                        square(point1[..., 0] - point2[..., 0])
+                        + square(point1[..., 1] - point2[..., 1])
                     )
 
                 def minimize_segment(base_length, N, start_interpolated, stop_interpolated):
+                    # Returns the segment points for all the frames and the mask of
+                    # the points kept for each frame. The last column is the averaged point.
                     threshold = base_length / (2 * N)
-                    minimized = [interpolated_points[start_interpolated]]
-                    latest_pushed = start_interpolated
-                    for i in range(start_interpolated + 1, stop_interpolated):
-                        distance = compute_distance(
-                            interpolated_points[latest_pushed], interpolated_points[i]
-                        )
-
-                        if distance >= threshold:
-                            minimized.append(interpolated_points[i])
-                            latest_pushed = i
-
-                    minimized.append(interpolated_points[stop_interpolated])
-
-                    if len(minimized) == 2:
-                        distance = compute_distance(
-                            interpolated_points[start_interpolated],
-                            interpolated_points[stop_interpolated]
+                    segment = interpolated_points[:, start_interpolated:stop_interpolated + 1]
+
+                    kept = np.zeros(segment.shape[:2], dtype=bool)
+                    kept[:, 0] = True
+                    kept[:, -1] = True
+                    latest_pushed = segment[:, 0]
+                    for i in range(1, segment.shape[1] - 1):
+                        distance = compute_distance(latest_pushed, segment[:, i])
+
+                        pushed = distance >= threshold
+                        kept[:, i] = pushed
+                        latest_pushed = np.where(
+                            pushed[:, np.newaxis], segment[:, i], latest_pushed
                         )
 
-                        if distance < threshold:
-                            return [average_point(minimized)]
+                    averaged = ~kept[:, 1:-1].any(axis=1) & (
+                        compute_distance(segment[:, 0], segment[:, -1]) < threshold
+                    )
+                    kept[averaged] = False
+
+                    return (
+                        np.concatenate((
+                            segment,
+                            average_point(segment[:, 0], segment[:, -1])[:, np.newaxis]
+                        ), axis=1),
+                        np.concatenate((kept, averaged[:, np.newaxis]), axis=1),
+                    )
 
-                    return minimized
+                left_indices, right_indices = matching
+                matching_sizes = np.bincount(left_indices, minlength=len(left_segment_lengths) + 1)
+                interpolated_indexes = np.concatenate(([0], np.cumsum(matching_sizes)[:-1]))
+                first_matches = right_indices[interpolated_indexes].tolist()
+                last_matches = right_indices[interpolated_indexes + matching_sizes - 1].tolist()
+                matching_sizes = matching_sizes.tolist()
+                interpolated_indexes = interpolated_indexes.tolist()
 
                 reduced = []
-                interpolated_indexes = {}
-                accumulated = 0
-                for i in range(len(left_points)):
-                    interpolated_indexes[i] = []
-                    for _ in range(len(matching[i])):
-                        interpolated_indexes[i].append(accumulated)
-                        accumulated += 1
 
                 def left_segment(start, stop):
-                    start_interpolated = interpolated_indexes[start][0]
-                    stop_interpolated = interpolated_indexes[stop][0]
+                    start_interpolated = interpolated_indexes[start]
+                    stop_interpolated = interpolated_indexes[stop]
 
                     if start_interpolated == stop_interpolated:
-                        reduced.append(interpolated_points[start_interpolated])
+                        reduced.append((
+                            interpolated_points[:, start_interpolated:start_interpolated + 1],
+                            np.ones((len(interpolated_points), 1), dtype=bool),
+                        ))
                         return
 
-                    base_length = curve_length(left_points[start: stop + 1])
+                    base_length = curve_length(left_segment_lengths[start:stop])
                     N = stop - start + 1
 
-                    reduced.extend(
+                    reduced.append(
                         minimize_segment(base_length, N, start_interpolated, stop_interpolated)
                     )
 
-
                 def right_segment(left_point):
-                    start = matching[left_point][0]
-                    stop = matching[left_point][-1]
-                    start_interpolated = interpolated_indexes[left_point][0]
-                    stop_interpolated = interpolated_indexes[left_point][-1]
-                    base_length = curve_length(right_points[start: stop + 1])
+                    start = first_matches[left_point]
+                    stop = last_matches[left_point]
+                    start_interpolated = interpolated_indexes[left_point]
+                    stop_interpolated = start_interpolated + matching_sizes[left_point] - 1
+                    base_length = curve_length(right_segment_lengths[start:stop])
                     N = stop - start + 1
 
-                    reduced.extend(
+                    reduced.append(
                         minimize_segment(base_length, N, start_interpolated, stop_interpolated)
                     )
 
                 previous_opened = None
-                for i in range(len(left_points)):
-                    if len(matching[i]) == 1:
+                for i in range(len(matching_sizes)):
+                    if matching_sizes[i] == 1:
                         if previous_opened is not None:
-                            if matching[i][0] == matching[previous_opened][0]:
+                            if first_matches[i] == first_matches[previous_opened]:
                                 continue
                             else:
                                 start = previous_opened
@@ -795,64 +788,69 @@ class TrackManager(ObjectManager):
                         right_segment(i)
 
                 if previous_opened is not None:
-                    left_segment(previous_opened, len(left_points) - 1)
+                    left_segment(previous_opened, len(matching_sizes) - 1)
+
+                reduced_points = np.concatenate([points for points, _ in reduced], axis=1)
+                reduced_mask = np.concatenate([mask for _, mask in reduced], axis=1)
 
-                return reduced
+                # Split the kept points by frames
+                flat_points = reduced_points[reduced_mask].reshape(-1).tolist()
+                frame_bounds = np.cumsum(2 * reduced_mask.sum(axis=1)).tolist()
+                return [
+                    flat_points[frame_start:frame_stop]
+                    for frame_start, frame_stop in zip([0] + frame_bounds[:-1], frame_bounds)
+                ]
 
-            left_points = to_points(left_position["points"])
-            right_points = to_points(right_position["points"])
-            left_offset_vec = curve_to_offset_vec(left_points, curve_length(left_points))
-            right_offset_vec = curve_to_offset_vec(right_points, curve_length(right_points))
+            left_segment_lengths = compute_segment_lengths(left_points)
+            right_segment_lengths = compute_segment_lengths(right_points)
+            left_offset_vec = curve_to_offset_vec(left_segment_lengths)
+            right_offset_vec = curve_to_offset_vec(right_segment_lengths)
 
             matching = match_left_right(left_offset_vec, right_offset_vec)
             completed_matching = match_right_left(
                 left_offset_vec, right_offset_vec, matching
             )
 
-            interpolated_points = []
-            for left_point_index, left_point in enumerate(left_points):
-                for right_point_index in completed_matching[left_point_index]:
-                    right_point = right_points[right_point_index]
-                    interpolated_points.append({
-                        "x": left_point["x"] + (right_point["x"] - left_point["x"]) * offset,
-                        "y": left_point["y"] + (right_point["y"] - left_point["y"]) * offset
-                    })
+            left_indices, right_indices = completed_matching
+            matched_left_points = left_points[left_indices]
+            matched_right_points = right_points[right_indices]
+            interpolated_points = matched_left_points + (
+                matched_right_points - matched_left_points
+            ) * offsets[:, np.newaxis, np.newaxis]
 
-            reducedPoints = reduce_interpolation(
+            return reduce_interpolation(
                 interpolated_points,
                 completed_matching,
-                left_points,
-                right_points
+                left_segment_lengths,
+                right_segment_lengths,
             )
 
-            return to_array(reducedPoints).tolist()
-
         def polyshape_interpolation(shape0, shape1):
-            shapes = []
+            frames = get_frames(shape0["frame"], shape1["frame"])
+            if not len(frames):
+                return []
+
+            left_points = np.asarray(shape0["points"], dtype=float).reshape(-1, 2)
+            right_points = np.asarray(shape1["points"], dtype=float).reshape(-1, 2)
+
             is_polygon = shape0["type"] == ShapeType.POLYGON
             if is_polygon:
                 # Make the polygon closed for computations
-                shape0 = shape0.copy()
-                shape1 = shape1.copy()
-                shape0["points"] = shape0["points"] + shape0["points"][:2]
-                shape1["points"] = shape1["points"] + shape1["points"][:2]
+                left_points = np.concatenate((left_points, left_points[:1]))
+                right_points = np.concatenate((right_points, right_points[:1]))
 
             distance = shape1["frame"] - shape0["frame"]
-            for frame in range(shape0["frame"] + 1, shape1["frame"]):
-                offset = (frame - shape0["frame"]) / distance
-                points = interpolate_position(shape0, shape1, offset)
-
-                if included_frames is None or frame in included_frames:
-                    shapes.append(copy_shape(shape0, frame, points))
+            offsets = (frames - shape0["frame"]) / distance
+            interpolated_points = interpolate_positions(left_points, right_points, offsets)
 
             if is_polygon:
                 # Remove the extra point added
-                shape0["points"] = shape0["points"][:-2]
-                shape1["points"] = shape1["points"][:-2]
-                for shape in shapes:
-                    shape["points"] = shape["points"][:-2]
+                interpolated_points = [points[:-2] for points in interpolated_points]
 
-            return shapes
+            return [
+                copy_shape(shape0, frame, points)
+                for frame, points in zip(frames.tolist(), interpolated_points)
+            ]
 
         def interpolate(shape0, shape1):
             is_same_type = shape0["type"] == shape1["type"]
@@ -868,8 +866,6 @@ class TrackManager(ObjectManager):
                 raise NotImplementedError()
 
             shapes = []
-            if dimension == DimensionType.DIM_3D:
-                shapes = simple_3d_interpolation(shape0, shape1)
             if is_rectangle or is_cuboid or is_ellipse or is_skeleton:
                 shapes = simple_interpolation(shape0, shape1)
             elif is_points:
@@ -881,11 +877,10 @@ class TrackManager(ObjectManager):
 
             return shapes
 
-        def propagate(shape, end_frame, *, included_frames=None):
+        def propagate(shape, end_frame):
             return [
-                copy_shape(shape, i)
-                for i in range(shape["frame"] + 1, end_frame)
-                if included_frames is None or i in included_frames
+                copy_shape(shape, frame)
+                for frame in get_frames(shape["frame"], end_frame).tolist()
             ]
 
         shapes = []
@@ -932,7 +927,7 @@ class TrackManager(ObjectManager):
         if prev_shape and (not prev_shape["outside"] or include_outside):
             # When the latest keyframe of a track is less than the end_frame
             # and it is not outside, need to propagate
-            shapes.extend(propagate(prev_shape, end_frame, included_frames=included_frames))
+            shapes.extend(propagate(prev_shape, end_frame))
 
         shapes = [
             shape for shape in shapes
@@ -7,7 +7,7 @@ from __future__ import annotations
 
 import os.path as osp
 import sys
-from collections import namedtuple
+from collections import deque, namedtuple
 from functools import reduce
 from operator import add
 from pathlib import Path
@@ -205,10 +205,14 @@ class CommonData(InstanceLabelData):
         host='',
         create_callback=None,
         use_server_track_ids: bool = False,
-        included_frames: Optional[Sequence[int]] = None
+        included_frames: Optional[Sequence[int]] = None,
+        shape_reader: Optional[Callable[[], Iterable[Tuple[int, List[dict]]]]] = None
     ) -> None:
         self._dimension = annotation_ir.dimension
         self._annotation_ir = annotation_ir
+        # If set, the shapes are not in annotation_ir yet. The reader yields
+        # (frame, shapes) pairs in the frame order, see _load_shapes()
+        self._shape_reader = shape_reader
         self._host = host
         self._create_callback = create_callback
         self._MAX_ANNO_SIZE = 30000
@@ -395,24 +399,96 @@ class CommonData(InstanceLabelData):
             type=label.type
         )
 
+    def _make_frame(self, idx):
+        frame_info = self._frame_info[idx]
+        return CommonData.Frame(
+            idx=idx,
+            id=frame_info.get("id", 0),
+            frame=self.abs_frame_id(idx),
+            name=frame_info["path"],
+            height=frame_info["height"],
+            width=frame_info["width"],
+            labeled_shapes=[],
+            tags=[],
+            shapes=[],
+            labels={}
+        )
+
+    def _add_labeled_shape(self, frame, shape):
+        frame.labeled_shapes.append(self._export_labeled_shape(shape))
+        frame.shapes.append(self._export_shape(shape))
+        for label in self._label_mapping.values():
+            label = self._export_label(label)
+            frame.labels.update({label.id: label})
+
+    def _load_shapes(self):
+        if self._shape_reader is None:
+            return
+
+        self._annotation_ir.shapes = [
+            shape
+            for _, frame_shapes in self._shape_reader()
+            for shape in frame_shapes
+        ]
+        self._shape_reader = None
+
+    def _iterate_shapes(self):
+        if self._shape_reader is None:
+            yield from self._annotation_ir.shapes
+        else:
+            for _, frame_shapes in self._shape_reader():
+                yield from frame_shapes
+
+    def _group_by_frame_from_reader(self, shape_reader, include_empty: bool):
+        # Without tracks, every frame is built from its own shapes only,
+        # so the frames can be produced one by one as the shapes are read
+        included_frames = self.get_included_frames()
+
+        tags_by_frame = {}
+        for tag in self._annotation_ir.tags:
+            if tag['frame'] in included_frames:
+                tags_by_frame.setdefault(tag['frame'], []).append(tag)
+
+        other_frames = set(tags_by_frame)
+        if include_empty:
+            other_frames.update(set(self._frame_info) & included_frames)
+        other_frames = deque(sorted(other_frames))
+
+        def make_frame(idx, shapes):
+            frame = self._make_frame(idx)
+            for shape in sorted(shapes, key=lambda shape: shape.get("z_order", 0)):
+                self._add_labeled_shape(frame, shape)
+            for tag in tags_by_frame.get(idx, []):
+                frame.tags.append(self._export_tag(tag))
+            return frame
+
+        for idx, shapes in shape_reader():
+            if idx not in included_frames:
+                continue
+
+            while other_frames and other_frames[0] < idx:
+                yield make_frame(other_frames.popleft(), [])
+            if other_frames and other_frames[0] == idx:
+                other_frames.popleft()
+
+            yield make_frame(idx, shapes)
+
+        for idx in other_frames:
+            yield make_frame(idx, [])
+
     def group_by_frame(self, include_empty: bool = False):
+        if self._shape_reader is not None:
+            if not self._annotation_ir.tracks:
+                return self._group_by_frame_from_reader(self._shape_reader, include_empty)
+
+            # Tracks are interpolated over all the frames together with the shapes
+            self._load_shapes()
+
         frames = {}
         def get_frame(idx):
-            frame_info = self._frame_info[idx]
             frame = self.abs_frame_id(idx)
             if frame not in frames:
-                frames[frame] = CommonData.Frame(
-                    idx=idx,
-                    id=frame_info.get("id", 0),
-                    frame=frame,
-                    name=frame_info["path"],
-                    height=frame_info["height"],
-                    width=frame_info["width"],
-                    labeled_shapes=[],
-                    tags=[],
-                    shapes=[],
-                    labels={}
-                )
+                frames[frame] = self._make_frame(idx)
             return frames[frame]
 
         included_frames = self.get_included_frames()
@@ -431,23 +507,13 @@ class CommonData(InstanceLabelData):
             ),
             key=lambda shape: shape.get("z_order", 0)
         ):
-            shape_data = ''
-
             if 'track_id' in shape:
                 if shape['outside']:
                     continue
-                exported_shape = self._export_tracked_shape(shape)
+                get_frame(shape['frame']).labeled_shapes.append(
+                    self._export_tracked_shape(shape))
             else:
-                exported_shape = self._export_labeled_shape(shape)
-                shape_data = self._export_shape(shape)
-
-            get_frame(shape['frame']).labeled_shapes.append(exported_shape)
-
-            if shape_data:
-                get_frame(shape['frame']).shapes.append(shape_data)
-                for label in self._label_mapping.values():
-                    label = self._export_label(label)
-                    get_frame(shape['frame']).labels.update({label.id: label})
+                self._add_labeled_shape(get_frame(shape['frame']), shape)
 
         for tag in self._annotation_ir.tags:
             if tag['frame'] not in included_frames:
@@ -458,7 +524,7 @@ class CommonData(InstanceLabelData):
 
     @property
     def shapes(self):
-        for shape in self._annotation_ir.shapes:
+        for shape in self._iterate_shapes():
             if not self._is_frame_deleted(shape["frame"]):
                 yield self._export_labeled_shape(shape)
 
@@ -581,9 +647,11 @@ class CommonData(InstanceLabelData):
 
     @property
     def data(self):
+        self._load_shapes()
         return self._annotation_ir
 
     def _len(self):
+        self._load_shapes()
         track_len = 0
         for track in self._annotation_ir.tracks:
             track_len += len(track['shapes'])
@@ -3,14 +3,21 @@
 #
 # SPDX-License-Identifier: MIT
 
+import hashlib
 import os
+import zlib
 from collections import OrderedDict
 from copy import deepcopy
 from enum import Enum
+from itertools import groupby
 from tempfile import TemporaryDirectory
+from typing import Container, Iterator, List, Optional, Tuple
 from datumaro.components.errors import DatasetError, DatasetImportError, DatasetNotFoundError
 
+from django.core.cache import caches
 from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce
 from django.db.models.query import Prefetch
 from django.conf import settings
 from rest_framework.exceptions import ValidationError
@@ -18,6 +25,7 @@ from rest_framework.exceptions import ValidationError
 from cvat.apps.engine import models, serializers
 from cvat.apps.engine.plugins import plugin_decorator
 from cvat.apps.engine.log import DatasetLogManager
+from cvat.apps.engine.renderers import CVATAPIRenderer
 from cvat.apps.events.handlers import handle_annotations_change
 from cvat.apps.profiler import silk_profile
 
@@ -40,6 +48,7 @@ class PatchAction(str, Enum):
     CREATE = "create"
     UPDATE = "update"
     DELETE = "delete"
+    DELTA = "delta"
 
     @classmethod
     def values(cls):
@@ -48,6 +57,12 @@ class PatchAction(str, Enum):
     def __str__(self):
         return self.value
 
+class StaleAnnotationsVersionError(Exception):
+    pass
+
+def _make_job_annotations_cache_key(job_id: int) -> str:
+    return f"job_{job_id}_annotations"
+
 def merge_table_rows(rows, keys_for_merge, field_id):
     # It is necessary to keep a stable order of original rows
     # (e.g. for tracked boxes). Otherwise prev_box.frame can be bigger
@@ -77,6 +92,9 @@ def merge_table_rows(rows, keys_for_merge, field_id):
     return list(merged_rows.values())
 
 class JobAnnotation:
+    # The number of rows fetched from the DB cursor at once by the annotation readers
+    READ_CHUNK_SIZE = 2000
+
     @classmethod
     def add_prefetch_info(cls, queryset):
         assert issubclass(queryset.model, models.Job)
@@ -122,6 +140,8 @@ class JobAnnotation:
         self.start_frame = db_segment.start_frame
         self.stop_frame = db_segment.stop_frame
         self.ir_data = AnnotationIR(db_segment.task.dimension)
+        self._read_shapes_on_export = False
+        self._init_version_from_db()
 
         self.db_labels = {db_label.id:db_label
             for db_label in (db_segment.task.project.label_set.all()
@@ -148,6 +168,7 @@ class JobAnnotation:
 
     def reset(self):
         self.ir_data.reset()
+        self._init_version_from_db()
 
     def _validate_attribute_for_existence(self, db_attr_val, label_id, attr_type):
         if db_attr_val.spec_id not in self.db_attributes[label_id][attr_type]:
@@ -184,8 +205,8 @@ class JobAnnotation:
         min_frame = tracks[0]["frame"]
 
         for track in tracks:
-            if parent_track and parent_track.frame < track["frame"]:
-                track["frame"] = parent_track.frame
+            if parent_track and parent_track["frame"] < track["frame"]:
+                track["frame"] = parent_track["frame"]
 
             # track and its first shape must have the same frame
             self._correct_frame_of_tracked_shapes(track)
@@ -196,36 +217,38 @@ class JobAnnotation:
         if not parent_track:
             return
 
-        if min_frame < parent_track.frame:
+        if min_frame < parent_track["frame"]:
             # parent track cannot have a frame greater than the frame of the child track
-            parent_tracked_shape = parent_track.trackedshape_set.first()
-            parent_track.frame = min_frame
-            parent_tracked_shape.frame = min_frame
-
-            parent_tracked_shape.save()
-            parent_track.save()
+            parent_track["frame"] = min_frame
+            if parent_track["shapes"]:
+                parent_track["shapes"][0]["frame"] = min_frame
 
             for track in tracks:
-                if parent_track.frame < track["frame"]:
-                    track["frame"] = parent_track.frame
+                if parent_track["frame"] < track["frame"]:
+                    track["frame"] = parent_track["frame"]
 
                     self._correct_frame_of_tracked_shapes(track)
 
     def _save_tracks_to_db(self, tracks):
+        def sync_frames(tracks, parent_track=None):
+            self._sync_frames(tracks, parent_track)
+
+            for track in tracks:
+                sync_frames(track.get("elements", []), track)
 
-        def create_tracks(tracks, parent_track=None):
+        def create_tracks(tracks, parent_track_ids):
+            # Creates one nesting level of tracks with a fixed number of queries,
+            # returns the next level to be created
             db_tracks = []
             db_track_attr_vals = []
             db_shapes = []
             db_shape_attr_vals = []
 
-            self._sync_frames(tracks, parent_track)
-
-            for track in tracks:
+            for track, parent_track_id in zip(tracks, parent_track_ids):
                 track_attributes = track.pop("attributes", [])
                 shapes = track.pop("shapes")
                 elements = track.pop("elements", [])
-                db_track = models.LabeledTrack(job=self.db_job, parent=parent_track, **track)
+                db_track = models.LabeledTrack(job=self.db_job, parent_id=parent_track_id, **track)
 
                 self._validate_label_for_existence(db_track.label_id)
 
@@ -254,7 +277,7 @@ class JobAnnotation:
 
                 track["attributes"] = track_attributes
                 track["shapes"] = shapes
-                if elements or parent_track is None:
+                if elements or parent_track_id is None:
                     track["elements"] = elements
 
             db_tracks = bulk_create(
@@ -290,29 +313,44 @@ class JobAnnotation:
                 flt_param={}
             )
 
+            element_tracks = []
+            element_parent_ids = []
             shape_idx = 0
             for track, db_track in zip(tracks, db_tracks):
                 track["id"] = db_track.id
                 for shape in track["shapes"]:
                     shape["id"] = db_shapes[shape_idx].id
                     shape_idx += 1
-                create_tracks(track.get("elements", []), db_track)
 
-        create_tracks(tracks)
+                for element in track.get("elements", []):
+                    element_tracks.append(element)
+                    element_parent_ids.append(db_track.id)
+
+            return element_tracks, element_parent_ids
+
+        # Frames are synchronized in advance, so that parent tracks
+        # don't have to be updated after their elements are created
+        sync_frames(tracks)
+
+        level_tracks, level_parent_ids = tracks, [None] * len(tracks)
+        while level_tracks:
+            level_tracks, level_parent_ids = create_tracks(level_tracks, level_parent_ids)
 
         self.ir_data.tracks = tracks
 
     def _save_shapes_to_db(self, shapes):
-        def create_shapes(shapes, parent_shape=None):
+        def create_shapes(shapes, parent_shape_ids):
+            # Creates one nesting level of shapes with a fixed number of queries,
+            # returns the next level to be created
             db_shapes = []
             db_attr_vals = []
 
-            for shape in shapes:
+            for shape, parent_shape_id in zip(shapes, parent_shape_ids):
                 attributes = shape.pop("attributes", [])
                 shape_elements = shape.pop("elements", [])
                 # FIXME: need to clamp points (be sure that all of them inside the image)
                 # Should we check here or implement a validator?
-                db_shape = models.LabeledShape(job=self.db_job, parent=parent_shape, **shape)
+                db_shape = models.LabeledShape(job=self.db_job, parent_id=parent_shape_id, **shape)
 
                 self._validate_label_for_existence(db_shape.label_id)
 
@@ -325,7 +363,7 @@ class JobAnnotation:
 
                 db_shapes.append(db_shape)
                 shape["attributes"] = attributes
-                if shape_elements or parent_shape is None:
+                if shape_elements or parent_shape_id is None:
                     shape["elements"] = shape_elements
 
             db_shapes = bulk_create(
@@ -343,11 +381,20 @@ class JobAnnotation:
                 flt_param={}
             )
 
+            element_shapes = []
+            element_parent_ids = []
             for shape, db_shape in zip(shapes, db_shapes):
                 shape["id"] = db_shape.id
-                create_shapes(shape.get("elements", []), db_shape)
 
-        create_shapes(shapes)
+                for element in shape.get("elements", []):
+                    element_shapes.append(element)
+                    element_parent_ids.append(db_shape.id)
+
+            return element_shapes, element_parent_ids
+
+        level_shapes, level_parent_ids = shapes, [None] * len(shapes)
+        while level_shapes:
+            level_shapes, level_parent_ids = create_shapes(level_shapes, level_parent_ids)
 
         self.ir_data.shapes = shapes
 
@@ -400,6 +447,48 @@ class JobAnnotation:
             if db_project := db_task.project:
                 db_project.touch()
 
+    def _increment_version(self):
+        models.Job.objects.filter(id=self.db_job.id).update(
+            annotations_version=F('annotations_version') + 1
+        )
+        self.db_job.refresh_from_db(fields=['annotations_version'])
+        self._init_version_from_db()
+
+        cache_key = _make_job_annotations_cache_key(self.db_job.id)
+        transaction.on_commit(lambda: caches['media'].delete(cache_key))
+
+    def get_etag(self) -> str:
+        # The returned annotations also depend on the label attributes.
+        # Removal of a label or an attribute deletes annotations without a version change.
+        labels_state = [
+            (label_id, sorted(
+                (attr_id, default_value.value)
+                for attr_id, default_value in label_attributes["all"].items()
+            ))
+            for label_id, label_attributes in sorted(self.db_attributes.items())
+        ]
+
+        # The creation date distinguishes jobs with reused ids, e.g. after a DB restore
+        return '"{}"'.format(hashlib.sha1(repr((
+            self.db_job.id, self.db_job.created_date.isoformat(),
+            self.db_job.annotations_version, labels_state,
+        )).encode()).hexdigest())
+
+    def _check_version(self, version):
+        # the job row stays locked until the end of the transaction,
+        # so concurrent saves are applied one after another
+        current_version = models.Job.objects.select_for_update().values_list(
+            'annotations_version', flat=True
+        ).get(id=self.db_job.id)
+
+        if version != current_version:
+            raise StaleAnnotationsVersionError(
+                "The annotations have been changed since the version {}, "
+                "the current version is {}. Please reload the annotations".format(
+                    version, current_version
+                )
+            )
+
     @staticmethod
     def _data_is_empty(data):
         return not (data["tags"] or data["shapes"] or data["tracks"])
@@ -416,6 +505,7 @@ class JobAnnotation:
 
         if not self._data_is_empty(self.data):
             self._set_updated_date()
+            self._increment_version()
 
     def put(self, data):
         deleted_data = self._delete()
@@ -428,6 +518,7 @@ class JobAnnotation:
 
         if not deleted_data_is_empty or not self._data_is_empty(self.data):
             self._set_updated_date()
+            self._increment_version()
 
     def update(self, data):
         self._delete(data)
@@ -436,6 +527,27 @@ class JobAnnotation:
 
         if not self._data_is_empty(self.data):
             self._set_updated_date()
+            self._increment_version()
+
+    def apply_delta(self, data):
+        """
+        Applies the changes made on top of the specified annotations version:
+        the objects with ids are replaced, the objects without ids are created,
+        the objects listed in "deleted" are removed. Other objects are not touched.
+        """
+
+        self._check_version(data["version"])
+
+        deleted_data = self._delete_by_ids(data.get("deleted", {}))
+        handle_annotations_change(self.db_job, deleted_data, "delete")
+
+        self._delete(data)
+        self._create(data)
+        handle_annotations_change(self.db_job, self.data, "update")
+
+        if not self._data_is_empty(deleted_data) or not self._data_is_empty(self.data):
+            self._set_updated_date()
+            self._increment_version()
 
     def _delete(self, data=None):
         deleted_data = {}
@@ -475,12 +587,67 @@ class JobAnnotation:
 
         return deleted_data
 
+    def _delete_by_ids(self, ids):
+        # Only the fields required for the change events are read
+        deleted_tags = list(self.db_job.labeledimage_set.filter(
+            pk__in=ids.get("tags", [])
+        ).values('id', 'frame', 'label_id'))
+
+        deleted_shapes = list(self.db_job.labeledshape_set.filter(
+            pk__in=ids.get("shapes", [])
+        ).values('id', 'frame', 'label_id', 'type'))
+
+        deleted_tracks = []
+        db_track_rows = self.db_job.labeledtrack_set.filter(
+            pk__in=ids.get("tracks", [])
+        ).values(
+            'id', 'frame', 'label_id', 'trackedshape__id', 'trackedshape__frame',
+            'trackedshape__type',
+        ).order_by('id', 'trackedshape__id')
+        for track_id, track_rows in groupby(db_track_rows, key=lambda row: row['id']):
+            track_rows = list(track_rows)
+            deleted_tracks.append({
+                'id': track_id,
+                'frame': track_rows[0]['frame'],
+                'label_id': track_rows[0]['label_id'],
+                'attributes': [],
+                'shapes': [
+                    {
+                        'id': row['trackedshape__id'],
+                        'frame': row['trackedshape__frame'],
+                        'type': row['trackedshape__type'],
+                        'attributes': [],
+                    }
+                    for row in track_rows
+                    if row['trackedshape__id'] is not None
+                ],
+            })
+
+        for obj in deleted_tags + deleted_shapes:
+            obj['attributes'] = []
+
+        self.db_job.labeledimage_set.filter(pk__in=[tag['id'] for tag in deleted_tags]).delete()
+        self.db_job.labeledshape_set.filter(
+            pk__in=[shape['id'] for shape in deleted_shapes]
+        ).delete()
+        self.db_job.labeledtrack_set.filter(
+            pk__in=[track['id'] for track in deleted_tracks]
+        ).delete()
+
+        return {
+            "tags": deleted_tags,
+            "shapes": deleted_shapes,
+            # the change events are grouped by the track shape type
+            "tracks": [track for track in deleted_tracks if track['shapes']],
+        }
+
     def delete(self, data=None):
         deleted_data = self._delete(data)
         handle_annotations_change(self.db_job, deleted_data, "delete")
 
         if not self._data_is_empty(deleted_data):
             self._set_updated_date()
+            self._increment_version()
 
     @staticmethod
     def _extend_attributes(attributeval_set, default_attribute_values):
@@ -525,7 +692,40 @@ class JobAnnotation:
         serializer = serializers.LabeledImageSerializerFromDB(db_tags, many=True)
         self.ir_data.tags = serializer.data
 
-    def _init_shapes_from_db(self):
+    @staticmethod
+    def _collect_attributes(rows, field_prefix, default_attribute_values):
+        id_key = field_prefix + '__id'
+        spec_id_key = field_prefix + '__spec_id'
+        value_key = field_prefix + '__value'
+
+        # A result table can contain many equal rows for the same attribute value
+        attributes = OrderedDict()
+        for row in rows:
+            attr_id = row[id_key]
+            if attr_id is not None and attr_id not in attributes:
+                attributes[attr_id] = OrderedDict([
+                    ('spec_id', row[spec_id_key]),
+                    ('value', row[value_key]),
+                ])
+
+        attributes = list(attributes.values())
+        spec_ids = set(attr['spec_id'] for attr in attributes)
+        for db_attr in default_attribute_values:
+            if db_attr['spec_id'] not in spec_ids:
+                attributes.append(OrderedDict([
+                    ('spec_id', db_attr['spec_id']),
+                    ('value', db_attr['value']),
+                ]))
+
+        return attributes
+
+    def iterate_shapes_by_frame(self) -> Iterator[Tuple[int, List[dict]]]:
+        """
+        Reads the job shapes from the DB cursor, one frame at a time.
+        Yields (frame, shapes) pairs in the frame order. The shapes are returned
+        in the annotation IR format, skeleton elements are attached to their parents.
+        """
+
         # NOTE: do not use .prefetch_related() with .values() since it's useless:
         # https://github.com/cvat-ai/cvat/pull/7748#issuecomment-2063695007
         db_shapes = self.db_job.labeledshape_set.values(
@@ -544,41 +744,86 @@ class JobAnnotation:
             'labeledshapeattributeval__spec_id',
             'labeledshapeattributeval__value',
             'labeledshapeattributeval__id',
-        ).order_by('frame').iterator(chunk_size=2000)
+        ).order_by('frame', 'id').iterator(chunk_size=self.READ_CHUNK_SIZE)
+
+        shape_keys = [
+            'id', 'label_id', 'type', 'frame', 'group', 'source',
+            'occluded', 'outside', 'z_order', 'rotation', 'points',
+        ]
+
+        for frame, frame_rows in groupby(db_shapes, key=lambda row: row['frame']):
+            shapes = OrderedDict()
+            elements = {}
+            for shape_id, shape_rows in groupby(frame_rows, key=lambda row: row['id']):
+                shape_rows = list(shape_rows)
+                db_shape = shape_rows[0]
+
+                shape = OrderedDict((key, db_shape[key]) for key in shape_keys)
+                shape['attributes'] = self._collect_attributes(shape_rows,
+                    'labeledshapeattributeval',
+                    self.db_attributes[db_shape['label_id']]["all"].values())
+
+                if db_shape['parent'] is None:
+                    shape['elements'] = []
+                    shapes[shape_id] = shape
+                else:
+                    elements.setdefault(db_shape['parent'], []).append(shape)
 
-        db_shapes = merge_table_rows(
-            rows=db_shapes,
-            keys_for_merge={
-                'labeledshapeattributeval_set': [
-                    'labeledshapeattributeval__spec_id',
-                    'labeledshapeattributeval__value',
-                    'labeledshapeattributeval__id',
-                ],
-            },
-            field_id='id',
+            for shape_id, shape_elements in elements.items():
+                shapes[shape_id]['elements'] = shape_elements
+
+            yield frame, list(shapes.values())
+
+    def _init_shapes_from_db(self):
+        self.ir_data.shapes = [
+            shape
+            for _, frame_shapes in self.iterate_shapes_by_frame()
+            for shape in frame_shapes
+        ]
+
+    def _make_track_from_db(self, track_rows):
+        db_track = track_rows[0]
+
+        track = OrderedDict(
+            (key, db_track[key]) for key in ['id', 'label_id', 'frame', 'group', 'source']
         )
 
-        shapes = {}
-        elements = {}
-        for db_shape in db_shapes:
-            self._extend_attributes(db_shape.labeledshapeattributeval_set,
-                self.db_attributes[db_shape.label_id]["all"].values())
+        shape_keys = [
+            'id', 'type', 'frame', 'occluded', 'outside', 'z_order', 'rotation', 'points',
+        ]
 
-            if db_shape.parent is None:
-                db_shape.elements = []
-                shapes[db_shape.id] = db_shape
-            else:
-                if db_shape.parent not in elements:
-                    elements[db_shape.parent] = []
-                elements[db_shape.parent].append(db_shape)
+        shapes = []
+        # in case of tracked shapes need to interpolate attribute values and extend them
+        # by previous shape attribute values (not default values)
+        default_attribute_values = self.db_attributes[db_track['label_id']]["mutable"].values()
+        for shape_id, shape_rows in groupby(track_rows, key=lambda row: row['trackedshape__id']):
+            if shape_id is None:
+                continue
 
-        for shape_id, shape_elements in elements.items():
-            shapes[shape_id].elements = shape_elements
+            shape_rows = list(shape_rows)
+            db_shape = shape_rows[0]
 
-        serializer = serializers.LabeledShapeSerializerFromDB(list(shapes.values()), many=True)
-        self.ir_data.shapes = serializer.data
+            shape = OrderedDict((key, db_shape['trackedshape__' + key]) for key in shape_keys)
+            shape['attributes'] = self._collect_attributes(shape_rows,
+                'trackedshape__trackedshapeattributeval', default_attribute_values)
+            default_attribute_values = shape['attributes']
+
+            shapes.append(shape)
+
+        track['shapes'] = shapes
+        track['attributes'] = self._collect_attributes(track_rows,
+            'labeledtrackattributeval',
+            self.db_attributes[db_track['label_id']]["immutable"].values())
+
+        return track
+
+    def iterate_tracks(self) -> Iterator[dict]:
+        """
+        Reads the job tracks from the DB cursor, one track at a time.
+        The tracks are returned in the annotation IR format,
+        skeleton elements are attached to their parents.
+        """
 
-    def _init_tracks_from_db(self):
         # NOTE: do not use .prefetch_related() with .values() since it's useless:
         # https://github.com/cvat-ai/cvat/pull/7748#issuecomment-2063695007
         db_tracks = self.db_job.labeledtrack_set.values(
@@ -602,76 +847,37 @@ class JobAnnotation:
             "trackedshape__trackedshapeattributeval__spec_id",
             "trackedshape__trackedshapeattributeval__value",
             "trackedshape__trackedshapeattributeval__id",
-        ).order_by('id', 'trackedshape__frame').iterator(chunk_size=2000)
-
-        db_tracks = merge_table_rows(
-            rows=db_tracks,
-            keys_for_merge={
-                "labeledtrackattributeval_set": [
-                    "labeledtrackattributeval__spec_id",
-                    "labeledtrackattributeval__value",
-                    "labeledtrackattributeval__id",
-                ],
-                "trackedshape_set":[
-                    "trackedshape__type",
-                    "trackedshape__occluded",
-                    "trackedshape__z_order",
-                    "trackedshape__points",
-                    "trackedshape__rotation",
-                    "trackedshape__id",
-                    "trackedshape__frame",
-                    "trackedshape__outside",
-                    "trackedshape__trackedshapeattributeval__spec_id",
-                    "trackedshape__trackedshapeattributeval__value",
-                    "trackedshape__trackedshapeattributeval__id",
-                ],
-            },
-            field_id="id",
-        )
+        ).order_by(
+            # put skeleton elements right after their parent tracks
+            Coalesce('parent', 'id'),
+            F('parent').asc(nulls_first=True),
+            'id',
+            'trackedshape__frame',
+            'trackedshape__id',
+        ).iterator(chunk_size=self.READ_CHUNK_SIZE)
+
+        for _, root_track_rows in groupby(db_tracks, key=lambda row: row['parent'] or row['id']):
+            track = None
+            elements = []
+            for _, track_rows in groupby(root_track_rows, key=lambda row: row['id']):
+                track_rows = list(track_rows)
+                if track_rows[0]['parent'] is None:
+                    track = self._make_track_from_db(track_rows)
+                else:
+                    elements.append(self._make_track_from_db(track_rows))
 
-        tracks = {}
-        elements = {}
-        for db_track in db_tracks:
-            db_track["trackedshape_set"] = merge_table_rows(db_track["trackedshape_set"], {
-                'trackedshapeattributeval_set': [
-                    'trackedshapeattributeval__value',
-                    'trackedshapeattributeval__spec_id',
-                    'trackedshapeattributeval__id',
-                ]
-            }, 'id')
-
-            # A result table can consist many equal rows for track/shape attributes
-            # We need filter unique attributes manually
-            db_track["labeledtrackattributeval_set"] = list(set(db_track["labeledtrackattributeval_set"]))
-            self._extend_attributes(db_track.labeledtrackattributeval_set,
-                self.db_attributes[db_track.label_id]["immutable"].values())
-
-            default_attribute_values = self.db_attributes[db_track.label_id]["mutable"].values()
-            for db_shape in db_track["trackedshape_set"]:
-                db_shape["trackedshapeattributeval_set"] = list(
-                    set(db_shape["trackedshapeattributeval_set"])
-                )
-                # in case of trackedshapes need to interpolate attriute values and extend it
-                # by previous shape attribute values (not default values)
-                self._extend_attributes(db_shape["trackedshapeattributeval_set"], default_attribute_values)
-                default_attribute_values = db_shape["trackedshapeattributeval_set"]
-
-            if db_track.parent is None:
-                db_track.elements = []
-                tracks[db_track.id] = db_track
-            else:
-                if db_track.parent not in elements:
-                    elements[db_track.parent] = []
-                elements[db_track.parent].append(db_track)
+            if track is None:
+                # Element rows without their parent track can't be exported alone
+                continue
 
-        for track_id, track_elements in elements.items():
-            tracks[track_id].elements = track_elements
+            track['elements'] = elements
+            yield track
 
-        serializer = serializers.LabeledTrackSerializerFromDB(list(tracks.values()), many=True)
-        self.ir_data.tracks = serializer.data
+    def _init_tracks_from_db(self):
+        self.ir_data.tracks = list(self.iterate_tracks())
 
     def _init_version_from_db(self):
-        self.ir_data.version = 0 # FIXME: should be removed in the future
+        self.ir_data.version = self.db_job.annotations_version
 
     def init_from_db(self):
         self._init_tags_from_db()
@@ -679,6 +885,18 @@ class JobAnnotation:
         self._init_tracks_from_db()
         self._init_version_from_db()
 
+    def init_for_export(self):
+        """
+        Reads the job annotations for export. Shapes are not loaded here:
+        export() passes iterate_shapes_by_frame() to the exporter, which reads
+        them frame by frame, or loads them all if the job has tracks.
+        """
+
+        self._init_tags_from_db()
+        self.ir_data.tracks = list(self.iterate_tracks())
+        self._init_version_from_db()
+        self._read_shapes_on_export = True
+
     @property
     def data(self):
         return self.ir_data.data
@@ -688,6 +906,7 @@ class JobAnnotation:
             annotation_ir=self.ir_data,
             db_job=self.db_job,
             host=host,
+            shape_reader=self.iterate_shapes_by_frame if self._read_shapes_on_export else None,
         )
 
         temp_dir_base = self.db_job.get_tmp_dirname()
@@ -847,6 +1066,38 @@ def get_job_data(pk):
 
     return annotation.data
 
+@silk_profile(name="GET job data payload")
+@transaction.atomic
+def get_job_data_payload(
+    pk, *, known_etags: Container[str] = ()
+) -> Tuple[str, Optional[bytes]]:
+    """
+    Returns the ETag and the rendered annotations of the job. The rendered annotations
+    are cached until the next change. If the current ETag is among the known ones,
+    the annotations are not read and None is returned instead.
+    """
+
+    annotation = JobAnnotation(pk)
+    etag = annotation.get_etag()
+    if etag in known_etags or '*' in known_etags:
+        return etag, None
+
+    cache = caches['media']
+    cache_key = _make_job_annotations_cache_key(annotation.db_job.id)
+    if settings.ANNOTATIONS_CACHE_TTL:
+        cached_item = cache.get(cache_key)
+        if cached_item and cached_item[0] == etag:
+            return etag, zlib.decompress(cached_item[1])
+
+    annotation.init_from_db()
+    payload = CVATAPIRenderer().render(annotation.data)
+
+    if settings.ANNOTATIONS_CACHE_TTL:
+        cache.set(cache_key, (etag, zlib.compress(payload, level=1)),
+            timeout=settings.ANNOTATIONS_CACHE_TTL)
+
+    return etag, payload
+
 @silk_profile(name="POST job data")
 @transaction.atomic
 def put_job_data(pk, data):
@@ -866,6 +1117,8 @@ def patch_job_data(pk, data, action):
         annotation.update(data)
     elif action == PatchAction.DELETE:
         annotation.delete(data)
+    elif action == PatchAction.DELTA:
+        annotation.apply_delta(data)
 
     return annotation.data
 
@@ -883,7 +1136,7 @@ def export_job(job_id, dst_file, format_name, server_url=None, save_images=False
     # https://github.com/cvat-ai/cvat/issues/217
     with transaction.atomic():
         job = JobAnnotation(job_id)
-        job.init_from_db()
+        job.init_for_export()
 
     exporter = make_exporter(format_name)
     with open(dst_file, 'wb') as f:
@@ -4,6 +4,7 @@
 
 from cvat.apps.dataset_manager.annotation import TrackManager
 
+import math
 from unittest import TestCase
 
 
@@ -324,3 +325,140 @@ class TrackManagerTest(TestCase):
 
         interpolated_shapes = TrackManager.get_interpolated_shapes(track, 0, 3, '2d')
         self.assertEqual(expected_shapes, interpolated_shapes)
+
+
+class TrackInterpolationTest(TestCase):
+    def _make_track(self, shape_type, keyframes):
+        return {
+            "id": 1,
+            "frame": keyframes[0][0],
+            "label_id": 0,
+            "group": None,
+            "source": "manual",
+            "attributes": [],
+            "shapes": [
+                {
+                    "frame": frame,
+                    "points": points,
+                    "rotation": rotation,
+                    "type": shape_type,
+                    "occluded": False,
+                    "outside": False,
+                    "attributes": [],
+                }
+                for frame, points, rotation in keyframes
+            ]
+        }
+
+    def _make_long_polygon_track(self, keyframe_count, keyframe_step):
+        def make_contour(point_count, cx, cy, radius):
+            return [
+                coord
+                for i in range(point_count)
+                for coord in (
+                    cx + radius * math.cos(2 * math.pi * i / point_count),
+                    cy + radius * math.sin(2 * math.pi * i / point_count),
+                )
+            ]
+
+        return self._make_track("polygon", [
+            (
+                i * keyframe_step,
+                make_contour(40 + 7 * (i % 3), 100 + i, 100 - i, 50 + 5 * (i % 2)),
+                0
+            )
+            for i in range(keyframe_count)
+        ])
+
+    def _get_points(self, track, end_frame, **kwargs):
+        return [
+            (shape["frame"], shape["points"], shape["rotation"])
+            for shape in TrackManager.get_interpolated_shapes(track, 0, end_frame, '2d', **kwargs)
+        ]
+
+    def _assert_points_equal(self, expected, actual):
+        self.assertEqual([(frame, len(points)) for frame, points, _ in expected],
+            [(frame, len(points)) for frame, points, _ in actual])
+
+        for (_, expected_points, expected_rotation), (_, actual_points, actual_rotation) in zip(
+            expected, actual
+        ):
+            for expected_coord, actual_coord in zip(expected_points, actual_points):
+                self.assertAlmostEqual(expected_coord, actual_coord)
+            self.assertAlmostEqual(expected_rotation, actual_rotation)
+
+    def test_can_interpolate_rectangle(self):
+        track = self._make_track("rectangle", [
+            (0, [0.0, 0.0, 10.0, 10.0], 350),
+            (4, [4.0, 8.0, 14.0, 18.0], 10),
+        ])
+
+        self._assert_points_equal([
+            (0, [0.0, 0.0, 10.0, 10.0], 350),
+            (1, [1.0, 2.0, 11.0, 12.0], 355),
+            (2, [2.0, 4.0, 12.0, 14.0], 0),
+            (3, [3.0, 6.0, 13.0, 16.0], 5),
+            (4, [4.0, 8.0, 14.0, 18.0], 10),
+        ], self._get_points(track, 5))
+
+    def test_can_interpolate_polyline_with_different_point_count(self):
+        track = self._make_track("polyline", [
+            (0, [0.0, 0.0, 10.0, 0.0, 20.0, 0.0], 0),
+            (4, [0.0, 10.0, 5.0, 10.0, 10.0, 10.0, 15.0, 10.0, 20.0, 10.0], 0),
+        ])
+
+        self._assert_points_equal([
+            (0, [0.0, 0.0, 10.0, 0.0, 20.0, 0.0], 0),
+            (1, [0.0, 2.5, 1.25, 2.5, 10.0, 2.5, 11.25, 2.5, 20.0, 2.5], 0),
+            (2, [0.0, 5.0, 2.5, 5.0, 10.0, 5.0, 12.5, 5.0, 20.0, 5.0], 0),
+            (3, [0.0, 7.5, 3.75, 7.5, 10.0, 7.5, 13.75, 7.5, 20.0, 7.5], 0),
+            (4, [0.0, 10.0, 5.0, 10.0, 10.0, 10.0, 15.0, 10.0, 20.0, 10.0], 0),
+        ], self._get_points(track, 5))
+
+    def test_can_interpolate_polygon_with_different_point_count(self):
+        track = self._make_track("polygon", [
+            (0, [0.0, 0.0, 10.0, 0.0, 10.0, 10.0, 0.0, 10.0], 0),
+            (3, [2.0, 2.0, 12.0, 2.0, 7.0, 12.0], 0),
+        ])
+
+        self._assert_points_equal([
+            (0, [0.0, 0.0, 10.0, 0.0, 10.0, 10.0, 0.0, 10.0], 0),
+            (1, [2 / 3, 2 / 3, 32 / 3, 2 / 3, 9.0, 32 / 3, 7 / 3, 32 / 3], 0),
+            (2, [4 / 3, 4 / 3, 34 / 3, 4 / 3, 8.0, 34 / 3, 14 / 3, 34 / 3], 0),
+            (3, [2.0, 2.0, 12.0, 2.0, 7.0, 12.0], 0),
+            (4, [2.0, 2.0, 12.0, 2.0, 7.0, 12.0], 0),
+        ], self._get_points(track, 5))
+
+    def test_can_interpolate_degenerate_polyline(self):
+        track = self._make_track("polyline", [
+            (0, [5.0, 5.0, 5.0, 5.0], 0),
+            (2, [0.0, 0.0, 10.0, 0.0, 20.0, 0.0], 0),
+        ])
+
+        frames = [frame for frame, _, _ in self._get_points(track, 3)]
+        self.assertEqual([0, 1, 2], frames)
+
+    def test_batch_interpolation_matches_per_frame_interpolation(self):
+        track = self._make_long_polygon_track(keyframe_count=4, keyframe_step=10)
+        end_frame = 35
+
+        batched = self._get_points(track, end_frame)
+        per_frame = [
+            shape
+            for frame in range(end_frame)
+            for shape in self._get_points(track, end_frame, included_frames={frame})
+        ]
+
+        self.assertEqual(batched, per_frame)
+
+    def test_can_interpolate_included_frames_only(self):
+        track = self._make_long_polygon_track(keyframe_count=3, keyframe_step=10)
+        included_frames = [2, 5, 10, 13, 29, 40]
+
+        all_shapes = self._get_points(track, 35)
+        included_shapes = self._get_points(track, 35, included_frames=included_frames)
+
+        self.assertEqual(
+            [shape for shape in all_shapes if shape[0] in included_frames],
+            included_shapes
+        )
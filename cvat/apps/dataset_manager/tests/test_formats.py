@@ -4,16 +4,21 @@
 #
 # SPDX-License-Identifier: MIT
 
+import copy
 import numpy as np
 import os.path as osp
 import tempfile
 import zipfile
+from collections import Counter
 from io import BytesIO
+from unittest import mock, skipUnless
 
 import datumaro
 from datumaro.components.dataset import Dataset, DatasetItem
 from datumaro.components.annotation import Mask
 from django.contrib.auth.models import Group, User
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
 from PIL import Image
 
 from rest_framework import status
@@ -22,10 +27,10 @@ from rest_framework.test import APIClient, APITestCase
 import cvat.apps.dataset_manager as dm
 from cvat.apps.dataset_manager.annotation import AnnotationIR
 from cvat.apps.dataset_manager.bindings import (CvatTaskOrJobDataExtractor,
-                                                TaskData, find_dataset_root)
-from cvat.apps.dataset_manager.task import TaskAnnotation
-from cvat.apps.dataset_manager.util import make_zip_archive
-from cvat.apps.engine.models import Task
+                                                JobData, TaskData, find_dataset_root)
+from cvat.apps.dataset_manager.task import JobAnnotation, TaskAnnotation
+from cvat.apps.dataset_manager.util import _format_copy_value, bulk_create, make_zip_archive
+from cvat.apps.engine.models import Job, Label, Task
 from cvat.apps.engine.tests.utils import get_paginated_collection
 
 
@@ -978,3 +983,488 @@ class TaskAnnotationsImportTest(_DbTestBase):
             dm.task.import_task_annotations(dataset_path, task['id'], format_name, True)
             self._test_can_import_annotations(task, format_name)
 
+
+
+class SkeletonAnnotationsSaveTest(_DbTestBase):
+    def setUp(self):
+        super().setUp()
+
+        task = self._create_task({
+            "name": "skeleton task",
+            "overlap": 0,
+            "segment_size": 100,
+            "labels": [{
+                "name": "skeleton",
+                "type": "skeleton",
+                "attributes": [],
+                "sublabels": [
+                    { "name": str(i), "type": "points", "attributes": [] }
+                    for i in range(1, 4)
+                ],
+                "svg": "".join(
+                    f'<circle r="1.5" cx="{i}" cy="{i}" data-type="element node" '
+                    f'data-element-id="{i}" data-node-id="{i}" data-label-name="{i}"></circle>'
+                    for i in range(1, 4)
+                ),
+            }],
+        }, {
+            "image_quality": 75,
+            **{
+                "client_files[%d]" % i: generate_image_file("image_%d.jpg" % i)
+                for i in range(10)
+            },
+        })
+
+        self.job_id = Job.objects.get(segment__task_id=task["id"]).id
+        self.skeleton_label = Label.objects.get(task_id=task["id"], type="skeleton")
+        self.element_labels = list(self.skeleton_label.sublabels.order_by("name"))
+
+    def _generate_skeleton_tracks(self, count):
+        return [
+            {
+                "frame": 2,
+                "label_id": self.skeleton_label.id,
+                "group": 0,
+                "source": "manual",
+                "attributes": [],
+                "shapes": [{
+                    "type": "skeleton",
+                    "frame": 2,
+                    "occluded": False,
+                    "outside": False,
+                    "z_order": 0,
+                    "rotation": 0,
+                    "points": [],
+                    "attributes": [],
+                }],
+                "elements": [
+                    {
+                        "frame": 1 + element_idx,
+                        "label_id": element_label.id,
+                        "group": 0,
+                        "source": "manual",
+                        "attributes": [],
+                        "shapes": [{
+                            "type": "points",
+                            "frame": 1 + element_idx,
+                            "occluded": False,
+                            "outside": False,
+                            "z_order": 0,
+                            "rotation": 0,
+                            "points": [track_idx, element_idx],
+                            "attributes": [],
+                        }],
+                    }
+                    for element_idx, element_label in enumerate(self.element_labels)
+                ],
+            }
+            for track_idx in range(count)
+        ]
+
+    def _count_bulk_creates(self, tracks):
+        # Count batched writes per model rather than INSERT statements:
+        # Django splits a bulk insert into several statements on backends
+        # with a limit on query parameters (e.g. SQLite)
+        with mock.patch(
+            "cvat.apps.dataset_manager.task.bulk_create", wraps=bulk_create
+        ) as bulk_create_mock:
+            JobAnnotation(self.job_id).create({
+                "version": 0, "tags": [], "shapes": [], "tracks": tracks
+            })
+
+        return Counter(
+            call.kwargs["db_model"].__name__ for call in bulk_create_mock.call_args_list
+        )
+
+    def test_can_save_skeleton_tracks_with_fixed_number_of_inserts(self):
+        writes_for_few_tracks = self._count_bulk_creates(self._generate_skeleton_tracks(2))
+        writes_for_many_tracks = self._count_bulk_creates(self._generate_skeleton_tracks(50))
+
+        self.assertEqual(writes_for_few_tracks, writes_for_many_tracks)
+
+    def test_can_save_skeleton_tracks_with_elements(self):
+        self._count_bulk_creates(self._generate_skeleton_tracks(3))
+
+        job_annotation = JobAnnotation(self.job_id)
+        job_annotation.init_from_db()
+        tracks = job_annotation.data["tracks"]
+
+        self.assertEqual(len(tracks), 3)
+        for track_idx, track in enumerate(tracks):
+            # parent tracks must start not later than their elements
+            self.assertEqual(track["frame"], 1)
+            self.assertEqual(track["shapes"][0]["frame"], 1)
+            self.assertEqual(len(track["elements"]), len(self.element_labels))
+
+            for element_idx, element in enumerate(track["elements"]):
+                self.assertEqual(element["label_id"], self.element_labels[element_idx].id)
+                self.assertEqual(element["frame"], 1)
+                self.assertEqual(element["shapes"][0]["points"], [track_idx, element_idx])
+
+
+class JobAnnotationReadersTest(_DbTestBase):
+    def setUp(self):
+        super().setUp()
+
+        task = self._create_task({
+            "name": "readers task",
+            "overlap": 0,
+            "segment_size": 100,
+            "labels": [
+                { "name": "car", "attributes": [] },
+                {
+                    "name": "skeleton",
+                    "type": "skeleton",
+                    "attributes": [],
+                    "sublabels": [
+                        { "name": str(i), "type": "points", "attributes": [] }
+                        for i in range(1, 4)
+                    ],
+                    "svg": "".join(
+                        f'<circle r="1.5" cx="{i}" cy="{i}" data-type="element node" '
+                        f'data-element-id="{i}" data-node-id="{i}" data-label-name="{i}"></circle>'
+                        for i in range(1, 4)
+                    ),
+                },
+            ],
+        }, {
+            "image_quality": 75,
+            **{
+                "client_files[%d]" % i: generate_image_file("image_%d.jpg" % i)
+                for i in range(10)
+            },
+        })
+
+        self.job_id = Job.objects.get(segment__task_id=task["id"]).id
+        self.label = Label.objects.get(task_id=task["id"], name="car")
+        self.skeleton_label = Label.objects.get(task_id=task["id"], type="skeleton")
+        self.element_labels = list(self.skeleton_label.sublabels.order_by("name"))
+
+    def _generate_shape(self, frame, points, **fields):
+        shape = {
+            "type": "rectangle",
+            "frame": frame,
+            "label_id": self.label.id,
+            "group": 0,
+            "source": "manual",
+            "occluded": False,
+            "outside": False,
+            "z_order": 0,
+            "rotation": 0,
+            "points": points,
+            "attributes": [],
+        }
+        shape.update(fields)
+        return shape
+
+    def _generate_skeleton_shape(self, frame, offset):
+        return self._generate_shape(frame, [],
+            type="skeleton",
+            label_id=self.skeleton_label.id,
+            elements=[
+                self._generate_shape(frame, [offset, element_idx],
+                    type="points", label_id=element_label.id,
+                )
+                for element_idx, element_label in enumerate(self.element_labels)
+            ],
+        )
+
+    def _generate_track(self, frame, label_id, shapes, **fields):
+        track = {
+            "frame": frame,
+            "label_id": label_id,
+            "group": 0,
+            "source": "manual",
+            "attributes": [],
+            "shapes": [
+                {
+                    "type": shape_type,
+                    "frame": shape_frame,
+                    "occluded": False,
+                    "outside": False,
+                    "z_order": 0,
+                    "rotation": 0,
+                    "points": points,
+                    "attributes": [],
+                }
+                for shape_type, shape_frame, points in shapes
+            ],
+        }
+        track.update(fields)
+        return track
+
+    def _generate_skeleton_track(self, frame, offset):
+        return self._generate_track(frame, self.skeleton_label.id,
+            [("skeleton", frame, []), ("skeleton", frame + 2, [])],
+            elements=[
+                self._generate_track(frame, element_label.id, [
+                    ("points", frame, [offset, element_idx]),
+                    ("points", frame + 2, [offset, element_idx + 1]),
+                ])
+                for element_idx, element_label in enumerate(self.element_labels)
+            ],
+        )
+
+    def _save(self, *, shapes=(), tracks=()):
+        JobAnnotation(self.job_id).put({
+            "version": 0,
+            "tags": [],
+            "shapes": copy.deepcopy(list(shapes)),
+            "tracks": copy.deepcopy(list(tracks)),
+        })
+
+    @classmethod
+    def _strip_ids(cls, value):
+        if isinstance(value, dict):
+            return { k: cls._strip_ids(v) for k, v in value.items() if k != "id" }
+        elif isinstance(value, list):
+            return [cls._strip_ids(v) for v in value]
+        return value
+
+    def test_can_read_shapes_grouped_by_frame(self):
+        self._save(shapes=[
+            self._generate_shape(5, [0, 0, 1, 1]),
+            self._generate_shape(1, [1, 1, 2, 2]),
+            self._generate_skeleton_shape(3, 10),
+            self._generate_shape(5, [2, 2, 3, 3]),
+            self._generate_shape(3, [3, 3, 4, 4]),
+        ])
+
+        frames = list(JobAnnotation(self.job_id).iterate_shapes_by_frame())
+
+        self.assertEqual([frame for frame, _ in frames], [1, 3, 5])
+        self.assertEqual([len(frame_shapes) for _, frame_shapes in frames], [1, 2, 2])
+        for frame, frame_shapes in frames:
+            for shape in frame_shapes:
+                self.assertEqual(shape["frame"], frame)
+
+        skeleton = frames[1][1][0]
+        self.assertEqual(skeleton["type"], "skeleton")
+        self.assertEqual(
+            [element["label_id"] for element in skeleton["elements"]],
+            [element_label.id for element_label in self.element_labels],
+        )
+        self.assertEqual(
+            [element["points"] for element in skeleton["elements"]],
+            [[10, element_idx] for element_idx in range(len(self.element_labels))],
+        )
+
+    def test_can_read_skeleton_tracks_across_chunk_boundaries(self):
+        track_count = 5
+        self._save(tracks=[
+            self._generate_skeleton_track(track_idx, track_idx)
+            for track_idx in range(track_count)
+        ])
+
+        for chunk_size in [1, 2, 3, 7, 1000]:
+            with self.subTest(chunk_size=chunk_size), \
+                mock.patch.object(JobAnnotation, "READ_CHUNK_SIZE", chunk_size):
+                tracks = list(JobAnnotation(self.job_id).iterate_tracks())
+
+                self.assertEqual(len(tracks), track_count)
+                for track_idx, track in enumerate(tracks):
+                    self.assertEqual(track["label_id"], self.skeleton_label.id)
+                    self.assertEqual(
+                        [shape["frame"] for shape in track["shapes"]],
+                        [track_idx, track_idx + 2],
+                    )
+                    self.assertEqual(
+                        [element["label_id"] for element in track["elements"]],
+                        [element_label.id for element_label in self.element_labels],
+                    )
+
+                    for element_idx, element in enumerate(track["elements"]):
+                        self.assertEqual(
+                            [shape["points"] for shape in element["shapes"]],
+                            [[track_idx, element_idx], [track_idx, element_idx + 1]],
+                        )
+
+    def test_readers_match_init_from_db(self):
+        shapes = [
+            self._generate_shape(2, [0, 0, 1, 1]),
+            self._generate_skeleton_shape(2, 5),
+            self._generate_shape(4, [1, 1, 2, 2], occluded=True, z_order=2),
+        ]
+        tracks = [
+            self._generate_track(1, self.label.id, [
+                ("rectangle", 1, [0, 0, 1, 1]), ("rectangle", 3, [1, 1, 2, 2]),
+            ]),
+            self._generate_skeleton_track(2, 7),
+        ]
+        self._save(shapes=shapes, tracks=tracks)
+
+        job_annotation = JobAnnotation(self.job_id)
+        job_annotation.init_from_db()
+        data = job_annotation.data
+
+        with mock.patch.object(JobAnnotation, "READ_CHUNK_SIZE", 2):
+            reader = JobAnnotation(self.job_id)
+            read_shapes = [
+                shape
+                for _, frame_shapes in reader.iterate_shapes_by_frame()
+                for shape in frame_shapes
+            ]
+            read_tracks = list(reader.iterate_tracks())
+
+        self.assertEqual(read_shapes, data["shapes"])
+        self.assertEqual(read_tracks, data["tracks"])
+
+        for shape in shapes:
+            shape.setdefault("elements", [])
+        for track in tracks:
+            track.setdefault("elements", [])
+        self.assertEqual(self._strip_ids(data["shapes"]), shapes)
+        self.assertEqual(self._strip_ids(data["tracks"]), tracks)
+
+        export_annotation = JobAnnotation(self.job_id)
+        export_annotation.init_for_export()
+        self.assertEqual(export_annotation.data["tracks"], data["tracks"])
+
+    def _export_frames(self, job_annotation, **kwargs):
+        job_data = JobData(
+            annotation_ir=job_annotation.ir_data, db_job=job_annotation.db_job, **kwargs
+        )
+        return list(job_data.shapes), list(job_data.group_by_frame(include_empty=True))
+
+    def _check_export_matches_init_from_db(self, *, shapes=(), tracks=()):
+        self._save(shapes=shapes, tracks=tracks)
+        JobAnnotation(self.job_id).create({
+            "version": 0,
+            "tags": [{
+                "frame": 6, "label_id": self.label.id, "group": 0,
+                "source": "manual", "attributes": [],
+            }],
+            "shapes": [], "tracks": [],
+        })
+
+        db_data = Job.objects.get(id=self.job_id).segment.task.data
+        db_data.deleted_frames = [2]
+        db_data.save()
+
+        job_annotation = JobAnnotation(self.job_id)
+        job_annotation.init_from_db()
+        expected = self._export_frames(job_annotation)
+
+        export_annotation = JobAnnotation(self.job_id)
+        export_annotation.init_for_export()
+        with mock.patch.object(JobAnnotation, "READ_CHUNK_SIZE", 2):
+            actual = self._export_frames(export_annotation,
+                shape_reader=export_annotation.iterate_shapes_by_frame)
+
+        self.assertEqual(actual, expected)
+        self.assertEqual(
+            [frame.frame for frame in actual[1]], sorted(frame.frame for frame in actual[1])
+        )
+
+        return export_annotation
+
+    def test_can_export_shapes_frame_by_frame(self):
+        export_annotation = self._check_export_matches_init_from_db(shapes=[
+            self._generate_shape(5, [0, 0, 1, 1], z_order=3),
+            self._generate_shape(5, [1, 1, 2, 2], z_order=1),
+            self._generate_shape(2, [2, 2, 3, 3]),
+            self._generate_skeleton_shape(8, 10),
+        ])
+
+        # without tracks, the shapes are not loaded into memory
+        self.assertEqual(export_annotation.ir_data.shapes, [])
+
+    def test_can_export_shapes_with_tracks(self):
+        self._check_export_matches_init_from_db(
+            shapes=[
+                self._generate_shape(5, [0, 0, 1, 1]),
+                self._generate_skeleton_shape(8, 10),
+            ],
+            tracks=[
+                self._generate_track(1, self.label.id, [
+                    ("rectangle", 1, [0, 0, 1, 1]), ("rectangle", 3, [1, 1, 2, 2]),
+                ]),
+            ],
+        )
+
+
+class CopyValueFormatTest(SimpleTestCase):
+    def test_can_format_values(self):
+        self.assertEqual(_format_copy_value(None), '\\N')
+        self.assertEqual(_format_copy_value(True), 't')
+        self.assertEqual(_format_copy_value(False), 'f')
+        self.assertEqual(_format_copy_value(42), '42')
+        self.assertEqual(_format_copy_value(1.5), '1.5')
+        self.assertEqual(_format_copy_value(b'\x01\xff'), '\\\\x01ff')
+
+    def test_can_escape_special_characters(self):
+        self.assertEqual(_format_copy_value('a\tb\nc\rd\\e'), 'a\\tb\\nc\\rd\\\\e')
+
+
+@skipUnless(connection.vendor == 'postgresql', 'COPY is only supported by PostgreSQL')
+class AnnotationsCopyTest(_DbTestBase):
+    def setUp(self):
+        super().setUp()
+
+        task = self._create_task({
+            "name": "copy task",
+            "overlap": 0,
+            "segment_size": 100,
+            "labels": [{
+                "name": "car",
+                "attributes": [{
+                    "name": "text",
+                    "mutable": False,
+                    "input_type": "text",
+                    "values": [""],
+                }],
+            }],
+        }, {
+            "image_quality": 75,
+            **{
+                "client_files[%d]" % i: generate_image_file("image_%d.jpg" % i)
+                for i in range(10)
+            },
+        })
+
+        self.job_id = Job.objects.get(segment__task_id=task["id"]).id
+        self.label = Label.objects.get(task_id=task["id"])
+        self.attribute = self.label.attributespec_set.get()
+
+    def _generate_shapes(self, count):
+        return [
+            {
+                "type": "polygon",
+                "frame": i % 10,
+                "label_id": self.label.id,
+                "group": 0,
+                "source": "manual",
+                "occluded": bool(i % 2),
+                "outside": False,
+                "z_order": 0,
+                "rotation": 0,
+                "points": [i, 0.5, i + 1.25, 1e-7, i, 2 ** 20],
+                "attributes": [{
+                    "spec_id": self.attribute.id,
+                    "value": f"value\t{i}\\n",
+                }],
+            }
+            for i in range(count)
+        ]
+
+    def _save(self, shapes, *, use_copy):
+        with override_settings(ANNOTATION_COPY_THRESHOLD=1 if use_copy else 0):
+            job_annotation = JobAnnotation(self.job_id)
+            job_annotation.put({"version": 0, "tags": [], "shapes": shapes, "tracks": []})
+
+    def _read_shapes(self):
+        job_annotation = JobAnnotation(self.job_id)
+        job_annotation.init_from_db()
+        return [
+            {k: v for k, v in shape.items() if k != "id"}
+            for shape in job_annotation.data["shapes"]
+        ]
+
+    def test_can_save_same_shapes_as_orm(self):
+        self._save(self._generate_shapes(100), use_copy=False)
+        orm_shapes = self._read_shapes()
+
+        self._save(self._generate_shapes(100), use_copy=True)
+        copy_shapes = self._read_shapes()
+
+        self.assertEqual(orm_shapes, copy_shapes)
@@ -3,23 +3,35 @@
 #
 # SPDX-License-Identifier: MIT
 
+import hashlib
 import io
+import math
 import os
+import random
+import struct
+import threading
 import zipfile
 from datetime import datetime, timezone
 from io import BytesIO
 import shutil
 import tempfile
+import time
 import zlib
 
-from typing import Optional, Tuple
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+from uuid import uuid4
 
 import cv2
+import django_rq
 import PIL.Image
-import pickle # nosec
+import redis
 from django.conf import settings
 from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from redis.exceptions import RedisError, WatchError
 from rest_framework.exceptions import NotFound, ValidationError
+from rq.job import JobStatus as RQJobStatus
 
 from cvat.apps.engine.cloud_provider import (Credentials,
                                              db_storage_to_storage_instance,
@@ -32,53 +44,467 @@ from cvat.apps.engine.media_extractors import (ImageDatasetManifestReader,
                                                ZipChunkWriter,
                                                ZipCompressedChunkWriter)
 from cvat.apps.engine.mime_types import mimetypes
-from cvat.apps.engine.models import (DataChoice, DimensionType, Job, Image,
+from cvat.apps.engine.models import (Data, DataChoice, DimensionType, Job, Image,
                                      StorageChoice, CloudStorage)
 from cvat.apps.engine.utils import md5_hash, preload_images
 from utils.dataset_manifest import ImageManifestManager
 
 slogger = ServerLogManager(__name__)
 
+class _CacheTierStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+class _MemoryCacheTier:
+    """
+    A per-process LRU cache with a byte budget. Keeps raw item bytes
+    or numpy arrays, so hits don't require network access and unpickling.
+    """
+
+    def __init__(self, max_size: int, *, name: str = 'memory'):
+        self._max_size = max_size
+        self._name = name
+        self._size = 0
+        self._items: OrderedDict[Hashable, Tuple[Any, Optional[str]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = _CacheTierStats()
+
+    @staticmethod
+    def _get_size(data) -> int:
+        return memoryview(data).nbytes
+
+    def get(self, key: Hashable) -> Optional[Tuple[Any, Optional[str]]]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.stats.misses += 1
+                return None
+
+            self._items.move_to_end(key)
+            self.stats.hits += 1
+            return item
+
+    def has(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._items
+
+    def set(self, key: Hashable, data, mime: Optional[str]):
+        data_size = self._get_size(data)
+        if self._max_size < data_size:
+            return
+
+        with self._lock:
+            if previous := self._items.pop(key, None):
+                self._size -= self._get_size(previous[0])
+
+            self._items[key] = (data, mime)
+            self._size += data_size
+
+            evicted_count = 0
+            while self._max_size < self._size:
+                _, (evicted_data, _) = self._items.popitem(last=False)
+                self._size -= self._get_size(evicted_data)
+                evicted_count += 1
+            self.stats.evictions += evicted_count
+
+        if evicted_count:
+            slogger.glob.info(
+                f'Evicted {evicted_count} items from the {self._name} cache tier, '
+                f'tier stats: {self.stats.to_dict()}'
+            )
+
+class _DiskCacheTier:
+    """
+    A node-local file cache for large items with a byte budget.
+    The least recently used files are removed first.
+    """
+
+    # The directory is shared by the server processes on the node,
+    # so the index is periodically rebuilt to account for the files of other processes
+    _REINDEX_INTERVAL = 60
+
+    def __init__(self, root: str, max_size: int, min_item_size: int):
+        self._root = root
+        self._max_size = max_size
+        self._min_item_size = min_item_size
+        self._lock = threading.Lock()
+        self.stats = _CacheTierStats()
+
+        # file path -> file size, in the access order
+        self._index: OrderedDict[str, int] = OrderedDict()
+        self._size = 0
+        self._index_time = 0
+
+        os.makedirs(self._root, exist_ok=True)
+
+    def accepts(self, size: int) -> bool:
+        return self._min_item_size <= size <= self._max_size
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self._root, hashlib.sha1(key.encode()).hexdigest()) # nosec
+
+    def _reindex(self):
+        files = []
+        for entry in os.scandir(self._root):
+            if entry.name.endswith('.tmp') or not entry.is_file():
+                continue
+
+            try:
+                file_stat = entry.stat()
+            except FileNotFoundError:
+                continue
+
+            files.append((file_stat.st_mtime, entry.path, file_stat.st_size))
+
+        files.sort()
+        self._index = OrderedDict((path, size) for _, path, size in files)
+        self._size = sum(self._index.values())
+        self._index_time = time.monotonic()
+
+    def _update_index(self, path: str, size: Optional[int]):
+        if self._index_time + self._REINDEX_INTERVAL < time.monotonic():
+            self._reindex()
+
+        if (previous_size := self._index.pop(path, None)) is not None:
+            self._size -= previous_size
+
+        if size is not None:
+            self._index[path] = size
+            self._size += size
+
+    def has(self, key: str) -> bool:
+        return os.path.exists(self._get_path(key))
+
+    def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        path = self._get_path(key)
+        try:
+            with open(path, 'rb') as f:
+                mime = f.readline().decode().rstrip('\n')
+                data = f.read()
+            os.utime(path) # keep the eviction order for the other processes
+        except FileNotFoundError:
+            with self._lock:
+                self._update_index(path, None)
+            self.stats.misses += 1
+            return None
+
+        with self._lock:
+            self._update_index(path, len(mime.encode()) + 1 + len(data))
+        self.stats.hits += 1
+        return data, mime
+
+    def set(self, key: str, data: memoryview, mime: str):
+        path = self._get_path(key)
+        with tempfile.NamedTemporaryFile(dir=self._root, suffix='.tmp', delete=False) as f:
+            f.write(mime.encode() + b'\n')
+            f.write(data)
+            file_size = f.tell()
+        os.replace(f.name, path)
+
+        with self._lock:
+            self._update_index(path, file_size)
+            self._evict()
+
+    def _evict(self):
+        evicted_count = 0
+        while self._max_size < self._size and self._index:
+            path, file_size = self._index.popitem(last=False)
+            self._size -= file_size
+
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            evicted_count += 1
+
+        if evicted_count:
+            self.stats.evictions += evicted_count
+            slogger.glob.info(
+                f'Evicted {evicted_count} items from the disk cache tier, '
+                f'tier stats: {self.stats.to_dict()}'
+            )
+
+_memory_tier: Optional[_MemoryCacheTier] = None
+_disk_tier: Optional[_DiskCacheTier] = None
+_tiers_lock = threading.Lock()
+
+def _get_cache_tiers() -> Tuple[Optional[_MemoryCacheTier], Optional[_DiskCacheTier]]:
+    global _memory_tier, _disk_tier # pylint: disable=global-statement
+
+    with _tiers_lock:
+        if _memory_tier is None and settings.MEDIA_CACHE_MEMORY_TIER_SIZE:
+            _memory_tier = _MemoryCacheTier(settings.MEDIA_CACHE_MEMORY_TIER_SIZE)
+
+        if _disk_tier is None and settings.MEDIA_CACHE_DISK_TIER_SIZE:
+            _disk_tier = _DiskCacheTier(
+                settings.MEDIA_CACHE_DISK_TIER_ROOT,
+                max_size=settings.MEDIA_CACHE_DISK_TIER_SIZE,
+                min_item_size=settings.MEDIA_CACHE_DISK_TIER_MIN_ITEM_SIZE,
+            )
+
+    return _memory_tier, _disk_tier
+
+_media_redis_connection: Optional[redis.Redis] = None
+_media_redis_connection_lock = threading.Lock()
+
+def _get_media_redis_connection() -> redis.Redis:
+    # Items are kept as raw strings, without the pickling done by the Django cache API,
+    # so the Redis server of the media cache is accessed directly
+    global _media_redis_connection # pylint: disable=global-statement
+
+    with _media_redis_connection_lock:
+        if _media_redis_connection is None:
+            cache_config = settings.CACHES['media']
+            if cache_config['BACKEND'] != 'django.core.cache.backends.redis.RedisCache':
+                raise ImproperlyConfigured(
+                    "The 'media' cache must use the Redis backend, "
+                    f"got '{cache_config['BACKEND']}'"
+                )
+
+            location = cache_config['LOCATION']
+            if isinstance(location, str):
+                location = location.split(',')
+
+            # The first server is the primary one, the others are read replicas
+            _media_redis_connection = redis.Redis.from_url(location[0])
+
+    return _media_redis_connection
+
+
+class _CacheItemEnvelope:
+    """
+    The binary layout of media cache items in Redis. All numbers are little-endian.
+
+    | magic "CVMC" | version: u8 | reserved: u8 | mime length: u16 | data size: u64 |
+    | Adler-32 checksum of data: u32 | creation time, ms since epoch: u64 |
+    | mime: utf-8 | data |
+    """
+
+    MAGIC = b'CVMC'
+    VERSION = 1
+
+    _HEADER = struct.Struct('<4sBBHQIQ')
+
+    class InvalidItem(ValueError):
+        pass
+
+    @classmethod
+    def pack(cls, data: memoryview, mime: Optional[str]) -> bytes:
+        encoded_mime = (mime or '').encode()
+        header = cls._HEADER.pack(
+            cls.MAGIC, cls.VERSION, 0, len(encoded_mime), data.nbytes,
+            zlib.adler32(data), int(time.time() * 1000),
+        )
+        return b''.join((header, encoded_mime, data))
+
+    @classmethod
+    def unpack(cls, value: bytes, *, verify_checksum: bool = True) -> Tuple[memoryview, Optional[str]]:
+        if len(value) < cls._HEADER.size:
+            raise cls.InvalidItem('The item is too short')
+
+        magic, version, _, mime_size, data_size, checksum, _ = cls._HEADER.unpack_from(value)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise cls.InvalidItem('Unknown item format')
+
+        data_offset = cls._HEADER.size + mime_size
+        if len(value) != data_offset + data_size:
+            raise cls.InvalidItem('Unexpected item size')
+
+        data = memoryview(value)[data_offset:]
+        if verify_checksum and checksum != zlib.adler32(data):
+            raise cls.InvalidItem('Checksum mismatch')
+
+        mime = value[cls._HEADER.size:data_offset].decode() or None
+        return data, mime
+
 class MediaCache:
+    _PREWARM_JOB_PREFIX = 'prewarm-chunk-'
+    _LOCK_KEY_PREFIX = 'media-cache-lock-'
+    _AVOIDED_BUILDS_COUNTER_KEY = 'media-cache-avoided-builds'
+
     def __init__(self, dimension=DimensionType.DIM_2D):
         self._dimension = dimension
         self._cache = caches['media']
+        self._memory_tier, self._disk_tier = _get_cache_tiers()
 
-    def _get_or_set_cache_item(self, key, create_function):
-        def create_item():
-            slogger.glob.info(f'Starting to prepare chunk: key {key}')
-            item = create_function()
-            slogger.glob.info(f'Ending to prepare chunk: key {key}')
+    @staticmethod
+    def _get_lock_connection():
+        # Locks are kept in the in-memory Redis, next to the RQ queues
+        return django_rq.get_connection(settings.CVAT_QUEUES.CHUNKS.value)
+
+    def _acquire_lock(self, key) -> Optional[str]:
+        token = uuid4().hex
+        acquired = self._get_lock_connection().set(
+            f'{self._LOCK_KEY_PREFIX}{key}', token,
+            nx=True, px=int(settings.MEDIA_CACHE_LOCK_TIMEOUT * 1000),
+        )
+        return token if acquired else None
+
+    def _release_lock(self, key, token: str):
+        lock_key = f'{self._LOCK_KEY_PREFIX}{key}'
+        with self._get_lock_connection().pipeline() as pipe:
+            # The check and the removal must be atomic, otherwise the lock
+            # can expire and be taken by another worker in between.
+            # WATCH makes the transaction fail if the lock is changed after the check.
+            try:
+                pipe.watch(lock_key)
+                owner = pipe.get(lock_key)
+                if owner is not None and owner.decode() == token:
+                    pipe.multi()
+                    pipe.delete(lock_key)
+                    pipe.execute()
+                    return
+            except WatchError:
+                pass
+
+        # The lock has expired while the item was being prepared
+        # and could be taken by another worker
+        slogger.glob.warning(f'The cache lock has expired before release: key {key}')
+
+    def _report_avoided_build(self, key):
+        avoided_count = self._get_lock_connection().incr(self._AVOIDED_BUILDS_COUNTER_KEY)
+        slogger.glob.info(
+            f'Got chunk prepared by another worker: key {key}, '
+            f'avoided duplicate builds in total: {avoided_count}'
+        )
 
-            if item[0]:
-                item = (item[0], item[1], zlib.crc32(item[0].getbuffer()))
-                self._cache.set(key, item)
+    def _has_item(self, key) -> bool:
+        return (
+            self._memory_tier and self._memory_tier.has(key) or
+            self._cache.has_key(key) or
+            self._disk_tier and self._disk_tier.has(key)
+        )
 
-            return item
+    def _set_redis_item(self, key, data: memoryview, mime: Optional[str]):
+        redis_key = self._cache.make_and_validate_key(key)
+        _get_media_redis_connection().set(
+            redis_key, _CacheItemEnvelope.pack(data, mime),
+            ex=self._cache.get_backend_timeout(),
+        )
+
+    def _create_cache_item(self, key, create_function):
+        slogger.glob.info(f'Starting to prepare chunk: key {key}')
+        item = create_function()
+        slogger.glob.info(f'Ending to prepare chunk: key {key}')
+
+        if item[0]:
+            item_data = item[0].getbuffer()
+            stored_in_disk_tier = False
+            if self._disk_tier and self._disk_tier.accepts(item_data.nbytes):
+                # Large items also get a local copy, which is cheaper to read on this node
+                self._disk_tier.set(key, item_data, item[1])
+                stored_in_disk_tier = True
+
+            try:
+                # Redis is shared by all the nodes, so the item is always put there,
+                # otherwise workers on the other nodes would wait for it and rebuild it
+                self._set_redis_item(key, item_data, item[1])
+            except RedisError as ex:
+                if not stored_in_disk_tier and self._disk_tier:
+                    # The item is spilled to the disk, if Redis can't keep it
+                    self._disk_tier.set(key, item_data, item[1])
+                    stored_in_disk_tier = True
+
+                if not stored_in_disk_tier:
+                    raise
+
+                slogger.glob.warning(
+                    f'Failed to put cache item {key} to Redis, kept it on the local disk: {ex}'
+                )
+            del item_data # release the buffer export
+
+            if self._memory_tier:
+                self._memory_tier.set(key, item[0].getvalue(), item[1])
 
+        return item
+
+    def _get_redis_item(self, key):
         slogger.glob.info(f'Starting to get chunk from cache: key {key}')
+        redis_key = self._cache.make_and_validate_key(key)
+        value = _get_media_redis_connection().get(redis_key)
+        slogger.glob.info(f'Ending to get chunk from cache: key {key}, is_cached {bool(value)}')
+
+        if not value:
+            return None
+
+        verify_checksum = random.random() < settings.MEDIA_CACHE_CHECKSUM_VERIFICATION_RATE # nosec
         try:
-            item = self._cache.get(key)
-        except pickle.UnpicklingError:
-            slogger.glob.error(f'Unable to get item from cache: key {key}', exc_info=True)
-            item = None
-        slogger.glob.info(f'Ending to get chunk from cache: key {key}, is_cached {bool(item)}')
+            data, mime = _CacheItemEnvelope.unpack(value, verify_checksum=verify_checksum)
+        except _CacheItemEnvelope.InvalidItem as ex:
+            # Items in an unknown format, including the ones from the previous versions,
+            # are also recreated
+            slogger.glob.info(f'Recreating cache item {key}: {ex}')
+            return None
+
+        return BytesIO(data), mime
+
+    def _get_cache_item(self, key):
+        if self._memory_tier and (item := self._memory_tier.get(key)):
+            return BytesIO(item[0]), item[1]
+
+        if item := self._get_redis_item(key):
+            if self._memory_tier:
+                self._memory_tier.set(key, item[0].getvalue(), item[1])
+            return item
+
+        if self._disk_tier and (item := self._disk_tier.get(key)):
+            if self._memory_tier:
+                self._memory_tier.set(key, item[0], item[1])
+            return BytesIO(item[0]), item[1]
+
+        return None
+
+    def _create_cache_item_once(self, key, create_function):
+        # Only one worker prepares the item, others wait for the result to appear in the cache.
+        # If the owner dies, its lock expires after MEDIA_CACHE_LOCK_TIMEOUT
+        # and one of the waiting workers takes over.
+        deadline = time.monotonic() + settings.MEDIA_CACHE_LOCK_WAIT_TIMEOUT
+        while time.monotonic() < deadline:
+            token = self._acquire_lock(key)
+            if token:
+                try:
+                    # The previous owner could release the lock right after
+                    # finishing the item, so the cache is checked once more
+                    if item := self._get_cache_item(key):
+                        self._report_avoided_build(key)
+                        return item
+
+                    return self._create_cache_item(key, create_function)
+                finally:
+                    self._release_lock(key, token)
+
+            time.sleep(settings.MEDIA_CACHE_LOCK_POLL_INTERVAL)
+
+            if item := self._get_cache_item(key):
+                self._report_avoided_build(key)
+                return item
+
+        slogger.glob.warning(f'Timed out waiting for the cache item, preparing it locally: key {key}')
+        return self._create_cache_item(key, create_function)
 
+    def _get_or_set_cache_item(self, key, create_function):
+        item = self._get_cache_item(key)
         if not item:
-            item = create_item()
-        else:
-            # compare checksum
-            item_data = item[0].getbuffer() if isinstance(item[0], io.BytesIO) else item[0]
-            item_checksum = item[2] if len(item) == 3 else None
-            if item_checksum != zlib.crc32(item_data):
-                slogger.glob.info(f'Recreating cache item {key} due to checksum mismatch')
-                item = create_item()
+            item = self._create_cache_item_once(key, create_function)
 
         return item[0], item[1]
 
+    @staticmethod
+    def _make_task_chunk_key(db_data_id, chunk_number, quality):
+        return f'{db_data_id}_{chunk_number}_{quality}'
+
+    @staticmethod
+    def _make_selective_job_chunk_key(db_job_id, chunk_number, quality):
+        return f'job_{db_job_id}_{chunk_number}_{quality}'
+
     def get_task_chunk_data_with_mime(self, chunk_number, quality, db_data):
         item = self._get_or_set_cache_item(
-            key=f'{db_data.id}_{chunk_number}_{quality}',
+            key=self._make_task_chunk_key(db_data.id, chunk_number, quality),
             create_function=lambda: self._prepare_task_chunk(db_data, quality, chunk_number),
         )
 
@@ -86,12 +512,90 @@ class MediaCache:
 
     def get_selective_job_chunk_data_with_mime(self, chunk_number, quality, job):
         item = self._get_or_set_cache_item(
-            key=f'job_{job.id}_{chunk_number}_{quality}',
+            key=self._make_selective_job_chunk_key(job.id, chunk_number, quality),
             create_function=lambda: self.prepare_selective_job_chunk(job, quality, chunk_number),
         )
 
         return item
 
+    @staticmethod
+    def _get_prewarm_queue():
+        return django_rq.get_queue(settings.CVAT_QUEUES.CHUNKS.value)
+
+    @staticmethod
+    def _get_prewarm_chunk_numbers(chunk_number, start_chunk, stop_chunk):
+        # The requested chunk is prepared by the request itself. Warm up the chunks
+        # the user is likely to visit next: the following ones and the previous one.
+        count = settings.CVAT_CHUNK_PREWARM_COUNT
+        candidates = [chunk_number - 1] + list(range(chunk_number + 1, chunk_number + count + 1))
+        return [c for c in candidates if start_chunk <= c <= stop_chunk]
+
+    def _enqueue_prewarm(self, key, func, *args):
+        if self._has_item(key):
+            return
+
+        # The RQ job id is derived from the cache key, so the same chunk
+        # can't be scheduled twice while the previous request is not finished
+        queue = self._get_prewarm_queue()
+        rq_id = f'{self._PREWARM_JOB_PREFIX}{key}'
+        rq_job = queue.fetch_job(rq_id)
+        if rq_job and rq_job.get_status(refresh=False) in (
+            RQJobStatus.QUEUED, RQJobStatus.STARTED,
+            RQJobStatus.DEFERRED, RQJobStatus.SCHEDULED,
+        ):
+            return
+
+        queue.enqueue(func, *args, job_id=rq_id, result_ttl=0, failure_ttl=3600)
+
+    def prewarm_task_chunks(self, db_data, quality, chunk_number, *, start_chunk=None, stop_chunk=None):
+        """
+        Schedules background preparation of the chunks around the requested one.
+        Does nothing if CVAT_CHUNK_PREWARM_COUNT is 0.
+        """
+
+        if not settings.CVAT_CHUNK_PREWARM_COUNT:
+            return
+
+        if start_chunk is None:
+            start_chunk = 0
+        if stop_chunk is None:
+            stop_chunk = math.ceil(db_data.size / db_data.chunk_size) - 1
+
+        for prewarmed_chunk in self._get_prewarm_chunk_numbers(chunk_number, start_chunk, stop_chunk):
+            self._enqueue_prewarm(
+                self._make_task_chunk_key(db_data.id, prewarmed_chunk, quality),
+                _prewarm_task_chunk, db_data.id, prewarmed_chunk, quality, self._dimension,
+            )
+
+    def prewarm_selective_job_chunks(self, db_job, quality, chunk_number, *, start_chunk, stop_chunk):
+        """
+        Schedules background preparation of the job chunks around the requested one.
+        Does nothing if CVAT_CHUNK_PREWARM_COUNT is 0.
+        """
+
+        if not settings.CVAT_CHUNK_PREWARM_COUNT:
+            return
+
+        for prewarmed_chunk in self._get_prewarm_chunk_numbers(chunk_number, start_chunk, stop_chunk):
+            self._enqueue_prewarm(
+                self._make_selective_job_chunk_key(db_job.id, prewarmed_chunk, quality),
+                _prewarm_selective_job_chunk, db_job.id, prewarmed_chunk, quality, self._dimension,
+            )
+
+    def _prewarm_cache_item(self, key, create_function):
+        if self._has_item(key):
+            return
+
+        token = self._acquire_lock(key)
+        if not token:
+            # the item is being prepared by another worker
+            return
+
+        try:
+            self._create_cache_item(key, create_function)
+        finally:
+            self._release_lock(key, token)
+
     def get_local_preview_with_mime(self, frame_number, db_data):
         item = self._get_or_set_cache_item(
             key=f'data_{db_data.id}_{frame_number}_preview',
@@ -105,7 +609,7 @@ class MediaCache:
         db_storage: CloudStorage,
     ) -> Optional[Tuple[io.BytesIO, str]]:
         key = f'cloudstorage_{db_storage.id}_preview'
-        return self._cache.get(key)
+        return self._get_cache_item(key)
 
     def get_or_set_cloud_preview_with_mime(
         self,
@@ -347,3 +851,27 @@ class MediaCache:
         mime_type = 'application/zip'
         zip_buffer.seek(0)
         return zip_buffer, mime_type
+
+
+def _prewarm_task_chunk(db_data_id, chunk_number, quality, dimension):
+    db_data = Data.objects.filter(id=db_data_id).first()
+    if not db_data:
+        # the task could be removed while the request was in the queue
+        return
+
+    cache = MediaCache(dimension)
+    cache._prewarm_cache_item(
+        key=cache._make_task_chunk_key(db_data.id, chunk_number, quality),
+        create_function=lambda: cache._prepare_task_chunk(db_data, quality, chunk_number),
+    )
+
+def _prewarm_selective_job_chunk(db_job_id, chunk_number, quality, dimension):
+    db_job = Job.objects.select_related('segment__task__data').filter(id=db_job_id).first()
+    if not db_job:
+        return
+
+    cache = MediaCache(dimension)
+    cache._prewarm_cache_item(
+        key=cache._make_selective_job_chunk_key(db_job.id, chunk_number, quality),
+        create_function=lambda: cache.prepare_selective_job_chunk(db_job, quality, chunk_number),
+    )
@@ -7,12 +7,14 @@ import math
 from enum import Enum
 from io import BytesIO
 import os
+from typing import Iterable, Iterator, Optional, Tuple
 
 import cv2
 import numpy as np
+from django.conf import settings
 from PIL import Image, ImageOps
 
-from cvat.apps.engine.cache import MediaCache
+from cvat.apps.engine.cache import MediaCache, _MemoryCacheTier
 from cvat.apps.engine.media_extractors import VideoReader, ZipReader
 from cvat.apps.engine.mime_types import mimetypes
 from cvat.apps.engine.models import DataChoice, StorageMethodChoice, DimensionType
@@ -52,6 +54,23 @@ class RandomAccessIterator:
         self.iterator = None
         self.pos = -1
 
+_decoded_frame_cache: Optional[_MemoryCacheTier] = None
+
+def get_decoded_frame_cache() -> Optional[_MemoryCacheTier]:
+    """
+    Returns a per-process LRU cache of decoded video frames with a byte budget.
+    Allows to avoid chunk re-decoding on backward seeks.
+    """
+
+    global _decoded_frame_cache # pylint: disable=global-statement
+
+    if _decoded_frame_cache is None and settings.DECODED_FRAME_CACHE_SIZE:
+        _decoded_frame_cache = _MemoryCacheTier(
+            settings.DECODED_FRAME_CACHE_SIZE, name='decoded frame'
+        )
+
+    return _decoded_frame_cache
+
 class FrameProvider:
     VIDEO_FRAME_EXT = '.PNG'
     VIDEO_FRAME_MIME = 'image/png'
@@ -160,13 +179,26 @@ class FrameProvider:
 
     @classmethod
     def _av_frame_to_png_bytes(cls, av_frame):
+        return cls._bgr_array_to_png_bytes(av_frame.to_ndarray(format='bgr24'))
+
+    @classmethod
+    def _bgr_array_to_png_bytes(cls, image):
         ext = cls.VIDEO_FRAME_EXT
-        image = av_frame.to_ndarray(format='bgr24')
         success, result = cv2.imencode(ext, image)
         if not success:
             raise RuntimeError("Failed to encode image to '%s' format" % (ext))
         return BytesIO(result.tobytes())
 
+    def _convert_decoded_video_frame(self, image: np.ndarray, out_type):
+        if out_type == self.Type.BUFFER:
+            return self._bgr_array_to_png_bytes(image)
+        elif out_type == self.Type.PIL:
+            return Image.fromarray(image[:, :, ::-1]) # BGR to RGB
+        elif out_type == self.Type.NUMPY_ARRAY:
+            return image.copy() # the cached frame must not be changed
+        else:
+            raise RuntimeError('unsupported output type')
+
     def _convert_frame(self, frame, reader_class, out_type):
         if out_type == self.Type.BUFFER:
             return self._av_frame_to_png_bytes(frame) if reader_class is VideoReader else frame
@@ -207,22 +239,62 @@ class FrameProvider:
             return self._loaders[quality].get_chunk_path(chunk_number, quality, self._db_data)
         return self._loaders[quality].get_chunk_path(chunk_number)
 
+    def _get_decoded_video_frame(self, frame_number, chunk_number, frame_offset, quality):
+        frame_cache = get_decoded_frame_cache()
+        if not frame_cache:
+            chunk_reader = self._loaders[quality].load(chunk_number)
+            av_frame, _, _ = chunk_reader[frame_offset]
+            return av_frame.to_ndarray(format='bgr24')
+
+        if cached_frame := frame_cache.get((self._db_data.id, quality, frame_number)):
+            return cached_frame[0]
+
+        # The frames before the requested one are decoded anyway while the reader
+        # skips ahead, so they are cached too
+        chunk_reader = self._loaders[quality].load(chunk_number)
+        first_offset = chunk_reader.pos + 1 if chunk_reader.pos < frame_offset else 0
+        chunk_start = frame_number - frame_offset
+        for offset in range(first_offset, frame_offset + 1):
+            av_frame, _, _ = chunk_reader[offset]
+
+            cache_key = (self._db_data.id, quality, chunk_start + offset)
+            if offset == frame_offset or not frame_cache.has(cache_key):
+                image = av_frame.to_ndarray(format='bgr24')
+                image.flags.writeable = False
+                frame_cache.set(cache_key, image, None)
+
+        return image
+
     def get_frame(self, frame_number, quality=Quality.ORIGINAL,
             out_type=Type.BUFFER):
-        _, chunk_number, frame_offset = self._validate_frame_number(frame_number)
+        frame_number, chunk_number, frame_offset = self._validate_frame_number(frame_number)
         loader = self._loaders[quality]
+
+        if loader.reader_class is VideoReader:
+            image = self._get_decoded_video_frame(frame_number, chunk_number, frame_offset, quality)
+            return (self._convert_decoded_video_frame(image, out_type), self.VIDEO_FRAME_MIME)
+
         chunk_reader = loader.load(chunk_number)
         frame, frame_name, _ = chunk_reader[frame_offset]
 
         frame = self._convert_frame(frame, loader.reader_class, out_type)
-        if loader.reader_class is VideoReader:
-            return (frame, self.VIDEO_FRAME_MIME)
         return (frame, mimetypes.guess_type(frame_name)[0])
 
     def get_frames(self, start_frame, stop_frame, quality=Quality.ORIGINAL, out_type=Type.BUFFER):
         for idx in range(start_frame, stop_frame):
             yield self.get_frame(idx, quality=quality, out_type=out_type)
 
+    def iterate_frames(
+        self, frame_numbers: Iterable[int], quality=Quality.ORIGINAL, out_type=Type.BUFFER
+    ) -> Iterator[Tuple[int, Tuple[object, str]]]:
+        """
+        Yields (frame number, (frame, mime)) for the requested frames in the ascending order.
+        The frames are read in a single forward pass, so each chunk is decoded at most once.
+        """
+
+        for frame_number in sorted(set(map(int, frame_numbers))):
+            yield frame_number, self.get_frame(frame_number, quality=quality, out_type=out_type)
+
     @property
     def data_id(self):
         return self._db_data.id
@@ -527,8 +527,12 @@ class ImageDatasetManifestReader(FragmentMediaReader):
         self._manifest.init_index()
 
     def __iter__(self):
-        for idx in self._frame_range:
-            yield self._manifest[idx]
+        if not self._frame_range:
+            return
+
+        yield from self._manifest.get_range(
+            self._frame_range[0], self._frame_range[-1] + 1, self._step
+        )
 
 class VideoDatasetManifestReader(FragmentMediaReader):
     def __init__(self, manifest_path, **kwargs):
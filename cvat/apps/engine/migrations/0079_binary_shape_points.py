@@ -0,0 +1,135 @@
+from django.db import migrations
+
+import cvat.apps.engine.models
+
+BATCH_SIZE = 5000
+SHAPE_MODELS = ("labeledshape", "trackedshape")
+
+
+def _copy_points(apps, *, src_field: str, dst_field: str):
+    for model_name in SHAPE_MODELS:
+        Model = apps.get_model("engine", model_name)
+
+        rows = Model.objects.values_list("id", src_field).order_by("id").iterator(
+            chunk_size=BATCH_SIZE
+        )
+
+        batch = []
+        for shape_id, points in rows:
+            batch.append(Model(id=shape_id, **{dst_field: points}))
+
+            if len(batch) == BATCH_SIZE:
+                Model.objects.bulk_update(batch, [dst_field])
+                batch = []
+
+        if batch:
+            Model.objects.bulk_update(batch, [dst_field])
+
+
+# Packs the text points in the BinaryFloatArrayField format. Integer coordinates
+# get the narrowest integer type, the other values are stored as float64.
+# The float32 check is skipped, such values take more space until they are saved again.
+# The send functions return values in the network byte order, so the bytes are reversed.
+PACK_POINTS_FUNCTION = """
+CREATE FUNCTION pg_temp.cvat_pack_points(points text) RETURNS bytea
+LANGUAGE plpgsql IMMUTABLE STRICT AS $$
+DECLARE
+    point_values float8[];
+    point_value float8;
+    code text;
+    value_hex text;
+    result text := '';
+BEGIN
+    IF points = '' THEN
+        RETURN ''::bytea;
+    END IF;
+
+    point_values := string_to_array(points, ',')::float8[];
+
+    IF (SELECT bool_and(v = trunc(v) AND abs(v) <= 32767) FROM unnest(point_values) AS v) THEN
+        code := 'h';
+    ELSIF (
+        SELECT bool_and(v = trunc(v) AND abs(v) <= 2147483647) FROM unnest(point_values) AS v
+    ) THEN
+        code := 'i';
+    ELSE
+        code := 'd';
+    END IF;
+
+    FOREACH point_value IN ARRAY point_values LOOP
+        value_hex := encode(CASE code
+            WHEN 'h' THEN int2send(point_value::int2)
+            WHEN 'i' THEN int4send(point_value::int4)
+            ELSE float8send(point_value)
+        END, 'hex');
+
+        FOR i IN REVERSE length(value_hex) / 2 .. 1 LOOP
+            result := result || substr(value_hex, 2 * i - 1, 2);
+        END LOOP;
+    END LOOP;
+
+    RETURN decode(encode(convert_to(code, 'UTF8'), 'hex') || result, 'hex');
+END
+$$
+"""
+
+
+def _pack_points_in_db(apps, schema_editor):
+    # Converts the rows on the DB side, without moving all the points through Python
+    quote_name = schema_editor.quote_name
+
+    schema_editor.execute(PACK_POINTS_FUNCTION)
+    for model_name in SHAPE_MODELS:
+        Model = apps.get_model("engine", model_name)
+        schema_editor.execute(
+            "UPDATE {table} SET {dst} = pg_temp.cvat_pack_points({src})".format(
+                table=quote_name(Model._meta.db_table),
+                dst=quote_name("binary_points"),
+                src=quote_name("points"),
+            )
+        )
+    schema_editor.execute("DROP FUNCTION pg_temp.cvat_pack_points(text)")
+
+
+def convert_points_to_binary(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        _pack_points_in_db(apps, schema_editor)
+    else:
+        _copy_points(apps, src_field="points", dst_field="binary_points")
+
+
+def convert_points_to_text(apps, schema_editor):
+    _copy_points(apps, src_field="binary_points", dst_field="points")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("engine", "0078_alter_cloudstorage_credentials"),
+    ]
+
+    operations = [
+        *(
+            migrations.AddField(
+                model_name=model_name,
+                name="binary_points",
+                field=cvat.apps.engine.models.BinaryFloatArrayField(default=list),
+            )
+            for model_name in SHAPE_MODELS
+        ),
+        migrations.RunPython(convert_points_to_binary, convert_points_to_text),
+        *(
+            migrations.RemoveField(
+                model_name=model_name,
+                name="points",
+            )
+            for model_name in SHAPE_MODELS
+        ),
+        *(
+            migrations.RenameField(
+                model_name=model_name,
+                old_name="binary_points",
+                new_name="points",
+            )
+            for model_name in SHAPE_MODELS
+        ),
+    ]
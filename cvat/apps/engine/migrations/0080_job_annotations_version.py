@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("engine", "0079_binary_shape_points"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="job",
+            name="annotations_version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
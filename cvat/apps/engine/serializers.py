@@ -1605,11 +1605,18 @@ class SubLabeledTrackSerializer(AnnotationSerializer):
 class LabeledTrackSerializer(SubLabeledTrackSerializer):
     elements = SubLabeledTrackSerializer(many=True, required=False)
 
+class AnnotationIdsSerializer(serializers.Serializer):
+    tags = serializers.ListField(child=serializers.IntegerField(min_value=0), default=[])
+    shapes = serializers.ListField(child=serializers.IntegerField(min_value=0), default=[])
+    tracks = serializers.ListField(child=serializers.IntegerField(min_value=0), default=[])
+
 class LabeledDataSerializer(serializers.Serializer):
-    version = serializers.IntegerField(default=0) # TODO: remove
+    version = serializers.IntegerField(default=0)
     tags   = LabeledImageSerializer(many=True, default=[])
     shapes = LabeledShapeSerializer(many=True, default=[])
     tracks = LabeledTrackSerializer(many=True, default=[])
+    deleted = AnnotationIdsSerializer(required=False,
+        help_text="Ids of the removed annotations, only used with action=delta")
 
 class FileInfoSerializer(serializers.Serializer):
     name = serializers.CharField(max_length=1024)
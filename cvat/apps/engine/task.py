@@ -5,8 +5,13 @@
 
 import itertools
 import fnmatch
+import io
+import multiprocessing
 import os
-from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Union, Iterable
+from contextlib import nullcontext
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union, Iterable
 from rest_framework.serializers import ValidationError
 import rq
 import re
@@ -17,6 +22,9 @@ import django_rq
 import concurrent.futures
 import queue
 
+import av
+import django
+import numpy as np
 from django.conf import settings
 from django.db import transaction
 from datetime import datetime, timezone
@@ -56,6 +64,109 @@ def create(db_task, data, request):
 
 JobFileMapping = List[List[str]]
 
+# Decoded video frames in these pixel formats are passed to the chunk worker processes as is,
+# frames in other formats are converted to RGB
+_SHARED_VIDEO_FRAME_FORMATS = ('yuv420p', 'yuvj420p', 'rgb24', 'bgr24')
+
+def _get_shared_video_frame_format(frame: av.VideoFrame) -> str:
+    frame_format = frame.format.name
+    if frame_format not in _SHARED_VIDEO_FRAME_FORMATS:
+        return 'rgb24'
+
+    if frame_format in ('yuv420p', 'yuvj420p') and (frame.width % 2 or frame.height % 2):
+        # PyAV converts 4:2:0 frames to arrays only if the frame sizes are even
+        return 'rgb24'
+
+    return frame_format
+
+def _pack_chunk_data(
+    chunk_data: Iterable[tuple[Any, str, Any]]
+) -> Tuple[Optional[SharedMemory], list[tuple]]:
+    """
+    Prepares chunk frames to be sent to a worker process.
+    File paths are passed as is, in-memory images and decoded video frames
+    are placed into a single shared memory block.
+    """
+
+    descriptors = []
+    buffers = []
+    total_size = 0
+    for image, path, frame_id in chunk_data:
+        if isinstance(image, str):
+            descriptors.append(('path', image, path, frame_id))
+            continue
+
+        if isinstance(image, av.VideoFrame):
+            frame_format = _get_shared_video_frame_format(image)
+            data = np.ascontiguousarray(image.to_ndarray(format=frame_format))
+            descriptors.append(
+                ('video_frame', (total_size, data.shape, frame_format), path, frame_id)
+            )
+        elif isinstance(image, io.BytesIO):
+            data = image.getbuffer()
+            descriptors.append(('bytes', (total_size, data.nbytes), path, frame_id))
+        elif isinstance(image, io.IOBase):
+            data = memoryview(image.read())
+            descriptors.append(('bytes', (total_size, data.nbytes), path, frame_id))
+        else:
+            raise TypeError(f'Unexpected chunk frame type {type(image)}')
+
+        buffers.append((total_size, data))
+        total_size += data.nbytes
+
+    if not buffers:
+        return None, descriptors
+
+    shared_memory = SharedMemory(create=True, size=total_size)
+    for offset, data in buffers:
+        shared_memory.buf[offset : offset + data.nbytes] = memoryview(data).cast('B')
+    del buffers
+
+    return shared_memory, descriptors
+
+def _save_chunk_in_process(
+    shared_memory_name: Optional[str],
+    descriptors: list[tuple],
+    writers: list[tuple[Any, str]],
+    preload: bool,
+) -> list[tuple[int, int]]:
+    shared_memory = None
+    if shared_memory_name:
+        shared_memory = SharedMemory(name=shared_memory_name)
+        # The block is owned and removed by the parent process
+        resource_tracker.unregister(shared_memory._name, 'shared_memory') # pylint: disable=protected-access
+
+    try:
+        images = []
+        for kind, value, path, frame_id in descriptors:
+            if kind == 'path':
+                image = value
+            elif kind == 'bytes':
+                offset, size = value
+                image = io.BytesIO(bytes(shared_memory.buf[offset : offset + size]))
+            elif kind == 'video_frame':
+                offset, shape, frame_format = value
+                frame_data = np.ndarray(shape, dtype=np.uint8, buffer=shared_memory.buf, offset=offset)
+                image = av.VideoFrame.from_ndarray(frame_data, format=frame_format) # copies the data
+                del frame_data
+            else:
+                raise TypeError(f'Unexpected chunk frame kind {kind}')
+
+            images.append((image, path, frame_id))
+
+        if preload:
+            images = preload_images(images)
+
+        image_sizes = []
+        for writer, chunk_path in writers:
+            image_sizes = writer.save_as_chunk(images=images, chunk_path=chunk_path)
+
+        # the last writer is the compressed one, it returns the image sizes
+        return image_sizes
+    finally:
+        if shared_memory:
+            shared_memory.close()
+
 class SegmentParams(NamedTuple):
     start_frame: int
     stop_frame: int
@@ -1005,8 +1116,17 @@ def _create_thread(
                     chunk_paths = [(extractor.get_path(i), i) for i in chunk_frames]
                     img_sizes = []
 
-                    for chunk_path, frame_id in chunk_paths:
-                        properties = manifest[manifest_index(frame_id)]
+                    # chunk frames go with a constant step, so their manifest items can be read at once
+                    chunk_manifest_indices = [manifest_index(frame_id) for _, frame_id in chunk_paths]
+                    chunk_properties = manifest.get_range(
+                        chunk_manifest_indices[0], chunk_manifest_indices[-1] + 1,
+                        chunk_manifest_indices[1] - chunk_manifest_indices[0]
+                            if len(chunk_manifest_indices) > 1 else 1
+                    )
+                    if len(chunk_properties) != len(chunk_paths):
+                        raise Exception('Incorrect file mapping to manifest content')
+
+                    for (chunk_path, frame_id), properties in zip(chunk_paths, chunk_properties):
 
                         # check mapping
                         if not chunk_path.endswith(f"{properties['name']}{properties['extension']}"):
@@ -1037,32 +1157,61 @@ def _create_thread(
         generator = itertools.groupby(extractor, lambda _: next(counter) // db_data.chunk_size)
         generator = ((idx, list(chunk_data)) for idx, chunk_data in generator)
 
+        should_preload_images = db_task.dimension == models.DimensionType.DIM_2D and \
+            isinstance(extractor, (
+                MEDIA_TYPES['image']['extractor'],
+                MEDIA_TYPES['zip']['extractor'],
+                MEDIA_TYPES['pdf']['extractor'],
+                MEDIA_TYPES['archive']['extractor'],
+            ))
+
+        def save_chunks_in_process(
+                process_executor: concurrent.futures.ProcessPoolExecutor,
+                chunk_idx: int,
+                chunk_data: Iterable[tuple[str, str, str]]) -> list[tuple[int, int]]:
+            nonlocal db_data, original_chunk_writer, compressed_chunk_writer
+
+            shared_memory, descriptors = _pack_chunk_data(chunk_data)
+            try:
+                return process_executor.submit(
+                    _save_chunk_in_process,
+                    shared_memory.name if shared_memory else None,
+                    descriptors,
+                    [
+                        (original_chunk_writer, db_data.get_original_chunk_path(chunk_idx)),
+                        (compressed_chunk_writer, db_data.get_compressed_chunk_path(chunk_idx)),
+                    ],
+                    should_preload_images,
+                ).result()
+            finally:
+                if shared_memory:
+                    shared_memory.close()
+                    shared_memory.unlink()
+
         def save_chunks(
                 executor: concurrent.futures.ThreadPoolExecutor,
+                process_executor: Optional[concurrent.futures.ProcessPoolExecutor],
                 chunk_idx: int,
                 chunk_data: Iterable[tuple[str, str, str]]) -> list[tuple[str, int, tuple[int, int]]]:
             nonlocal db_data, db_task, extractor, original_chunk_writer, compressed_chunk_writer
-            if (db_task.dimension == models.DimensionType.DIM_2D and
-                isinstance(extractor, (
-                    MEDIA_TYPES['image']['extractor'],
-                    MEDIA_TYPES['zip']['extractor'],
-                    MEDIA_TYPES['pdf']['extractor'],
-                    MEDIA_TYPES['archive']['extractor'],
-                ))):
-                chunk_data = preload_images(chunk_data)
-
-            fs_original = executor.submit(
-                original_chunk_writer.save_as_chunk,
-                images=chunk_data,
-                chunk_path=db_data.get_original_chunk_path(chunk_idx)
-            )
-            fs_compressed = executor.submit(
-                compressed_chunk_writer.save_as_chunk,
-                images=chunk_data,
-                chunk_path=db_data.get_compressed_chunk_path(chunk_idx),
-            )
-            fs_original.result()
-            image_sizes = fs_compressed.result()
+            if process_executor:
+                image_sizes = save_chunks_in_process(process_executor, chunk_idx, chunk_data)
+            else:
+                if should_preload_images:
+                    chunk_data = preload_images(chunk_data)
+
+                fs_original = executor.submit(
+                    original_chunk_writer.save_as_chunk,
+                    images=chunk_data,
+                    chunk_path=db_data.get_original_chunk_path(chunk_idx)
+                )
+                fs_compressed = executor.submit(
+                    compressed_chunk_writer.save_as_chunk,
+                    images=chunk_data,
+                    chunk_path=db_data.get_compressed_chunk_path(chunk_idx),
+                )
+                fs_original.result()
+                image_sizes = fs_compressed.result()
 
             # (path, frame, size)
             return list((i[0][1], i[0][2], i[1]) for i in zip(chunk_data, image_sizes))
@@ -1086,13 +1235,30 @@ def _create_thread(
             progress = extractor.get_progress(img_meta[-1][1])
             update_progress(progress)
 
+        # In the "process" mode, chunks are encoded in worker processes, which allows
+        # to avoid the GIL limitations. The threads only send the data and wait for results.
+        if settings.CVAT_CHUNK_PROCESSING_EXECUTOR == 'process':
+            # The workers are started lazily from the threads below, and forking
+            # a multithreaded process is unsafe, so they are started by a fork server.
+            # The workers need Django set up to unpickle the chunk writers.
+            process_executor_context = concurrent.futures.ProcessPoolExecutor(
+                max_workers=settings.CVAT_CONCURRENT_CHUNK_PROCESSING,
+                mp_context=multiprocessing.get_context('forkserver'),
+                initializer=django.setup,
+            )
+        else:
+            process_executor_context = nullcontext()
+
         futures = queue.Queue(maxsize=settings.CVAT_CONCURRENT_CHUNK_PROCESSING)
-        with concurrent.futures.ThreadPoolExecutor(max_workers=2*settings.CVAT_CONCURRENT_CHUNK_PROCESSING) as executor:
+        with (
+            concurrent.futures.ThreadPoolExecutor(max_workers=2*settings.CVAT_CONCURRENT_CHUNK_PROCESSING) as executor,
+            process_executor_context as process_executor,
+        ):
             for chunk_idx, chunk_data in generator:
                 db_data.size += len(chunk_data)
                 if futures.full():
                     process_results(futures.get().result())
-                futures.put(executor.submit(save_chunks, executor, chunk_idx, chunk_data))
+                futures.put(executor.submit(save_chunks, executor, process_executor, chunk_idx, chunk_data))
 
             while not futures.empty():
                 process_results(futures.get().result())
@@ -0,0 +1,318 @@
+# Copyright (C) 2024 CVAT.ai Corporation
+#
+# SPDX-License-Identifier: MIT
+
+import os
+from io import BytesIO
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+from fakeredis import FakeStrictRedis
+
+from redis.exceptions import RedisError
+
+from cvat.apps.engine import cache as cache_module
+from cvat.apps.engine.cache import (
+    MediaCache, _CacheItemEnvelope, _DiskCacheTier, _MemoryCacheTier, _get_media_redis_connection
+)
+
+
+class CacheItemEnvelopeTest(SimpleTestCase):
+    def test_can_pack_and_unpack_item(self):
+        data = bytes(range(256)) * 100
+
+        packed = _CacheItemEnvelope.pack(memoryview(data), 'application/zip')
+        unpacked_data, mime = _CacheItemEnvelope.unpack(packed)
+
+        self.assertEqual(bytes(unpacked_data), data)
+        self.assertEqual(mime, 'application/zip')
+
+    def test_can_pack_item_without_mime(self):
+        packed = _CacheItemEnvelope.pack(memoryview(b'data'), None)
+        _, mime = _CacheItemEnvelope.unpack(packed)
+
+        self.assertIsNone(mime)
+
+    def test_cannot_unpack_corrupted_item(self):
+        packed = bytearray(_CacheItemEnvelope.pack(memoryview(b'some data'), 'image/jpeg'))
+        packed[-1] ^= 0xff
+
+        with self.assertRaises(_CacheItemEnvelope.InvalidItem):
+            _CacheItemEnvelope.unpack(bytes(packed))
+
+    def test_can_skip_checksum_verification(self):
+        packed = bytearray(_CacheItemEnvelope.pack(memoryview(b'some data'), 'image/jpeg'))
+        packed[-1] ^= 0xff
+
+        data, _ = _CacheItemEnvelope.unpack(bytes(packed), verify_checksum=False)
+        self.assertEqual(len(data), len(b'some data'))
+
+    def test_cannot_unpack_unknown_format(self):
+        with self.assertRaises(_CacheItemEnvelope.InvalidItem):
+            _CacheItemEnvelope.unpack(b'\x80\x04' + b'\x00' * 64)
+
+
+class MemoryCacheTierTest(SimpleTestCase):
+    def test_evicts_least_recently_used_items(self):
+        tier = _MemoryCacheTier(max_size=10)
+        tier.set('a', b'1234', 'mime')
+        tier.set('b', b'1234', 'mime')
+        tier.get('a')
+        tier.set('c', b'1234', 'mime')
+
+        self.assertTrue(tier.has('a'))
+        self.assertFalse(tier.has('b'))
+        self.assertTrue(tier.has('c'))
+        self.assertEqual(tier.stats.evictions, 1)
+
+    def test_skips_items_larger_than_budget(self):
+        tier = _MemoryCacheTier(max_size=10)
+        tier.set('a', b'x' * 11, 'mime')
+
+        self.assertIsNone(tier.get('a'))
+        self.assertEqual(tier.stats.misses, 1)
+
+
+class MediaRedisConnectionTest(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(cache_module, '_media_redis_connection', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @override_settings(CACHES={'media': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://primary:6379/1,redis://replica:6379/1',
+    }})
+    def test_connects_to_primary_server(self):
+        connection_kwargs = _get_media_redis_connection().connection_pool.connection_kwargs
+
+        self.assertEqual(connection_kwargs['host'], 'primary')
+        self.assertEqual(connection_kwargs['db'], 1)
+
+    @override_settings(CACHES={'media': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }})
+    def test_fails_if_backend_is_not_redis(self):
+        with self.assertRaises(ImproperlyConfigured):
+            _get_media_redis_connection()
+
+
+class MediaCacheLockingTest(SimpleTestCase):
+    def setUp(self):
+        # The tiers are not needed, as all the cache accesses are mocked
+        self.cache = MediaCache.__new__(MediaCache)
+
+        for method_name in [
+            '_acquire_lock', '_release_lock', '_get_cache_item',
+            '_create_cache_item', '_report_avoided_build',
+        ]:
+            patcher = mock.patch.object(self.cache, method_name)
+            setattr(self, method_name, patcher.start())
+            self.addCleanup(patcher.stop)
+
+        self._acquire_lock.return_value = 'token'
+
+    def test_uses_item_created_before_lock_is_acquired(self):
+        # The previous lock owner has saved the item and released the lock
+        # between the cache miss and the lock acquisition
+        item = (BytesIO(b'chunk'), 'application/zip')
+        self._get_cache_item.return_value = item
+        create_function = mock.Mock()
+
+        result = self.cache._create_cache_item_once('key', create_function)
+
+        self.assertIs(result, item)
+        self._create_cache_item.assert_not_called()
+        create_function.assert_not_called()
+        self._release_lock.assert_called_once_with('key', 'token')
+        self._report_avoided_build.assert_called_once_with('key')
+
+    def test_creates_item_if_missing_after_lock_is_acquired(self):
+        item = (BytesIO(b'chunk'), 'application/zip')
+        self._get_cache_item.return_value = None
+        self._create_cache_item.return_value = item
+        create_function = mock.Mock()
+
+        result = self.cache._create_cache_item_once('key', create_function)
+
+        self.assertIs(result, item)
+        self._create_cache_item.assert_called_once_with('key', create_function)
+        self._release_lock.assert_called_once_with('key', 'token')
+        self._report_avoided_build.assert_not_called()
+
+
+class MediaCacheLockTest(SimpleTestCase):
+    def setUp(self):
+        self.cache = MediaCache.__new__(MediaCache)
+        self.connection = FakeStrictRedis()
+
+        patcher = mock.patch.object(
+            MediaCache, '_get_lock_connection', return_value=self.connection
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_can_acquire_and_release_lock(self):
+        token = self.cache._acquire_lock('key')
+
+        self.assertIsNotNone(token)
+        self.assertIsNone(self.cache._acquire_lock('key'))
+
+        self.cache._release_lock('key', token)
+
+        self.assertIsNotNone(self.cache._acquire_lock('key'))
+
+    def test_keeps_lock_taken_by_another_worker(self):
+        token = self.cache._acquire_lock('key')
+
+        # The lock has expired and another worker has taken it
+        lock_key = f'{MediaCache._LOCK_KEY_PREFIX}key'
+        self.connection.delete(lock_key)
+        other_token = self.cache._acquire_lock('key')
+
+        self.cache._release_lock('key', token)
+
+        self.assertEqual(self.connection.get(lock_key).decode(), other_token)
+
+
+class DiskCacheTierTest(SimpleTestCase):
+    def setUp(self):
+        self._tmp_dir = TemporaryDirectory()
+        self.addCleanup(self._tmp_dir.cleanup)
+
+    def _make_tier(self, max_size=100, min_item_size=10):
+        return _DiskCacheTier(self._tmp_dir.name, max_size=max_size, min_item_size=min_item_size)
+
+    def test_can_set_and_get_item(self):
+        tier = self._make_tier()
+
+        tier.set('key', memoryview(b'x' * 20), 'image/jpeg')
+
+        self.assertTrue(tier.has('key'))
+        self.assertEqual(tier.get('key'), (b'x' * 20, 'image/jpeg'))
+        self.assertIsNone(tier.get('unknown'))
+        self.assertEqual(tier.stats.to_dict(), {'hits': 1, 'misses': 1, 'evictions': 0})
+
+    def test_accepts_only_items_of_allowed_sizes(self):
+        tier = self._make_tier(max_size=100, min_item_size=10)
+
+        self.assertFalse(tier.accepts(9))
+        self.assertTrue(tier.accepts(10))
+        self.assertTrue(tier.accepts(100))
+        self.assertFalse(tier.accepts(101))
+
+    def test_evicts_least_recently_used_items(self):
+        # each file takes 1 byte for the empty mime line and 30 bytes of data
+        tier = self._make_tier(max_size=100)
+
+        tier.set('a', memoryview(b'a' * 30), '')
+        tier.set('b', memoryview(b'b' * 30), '')
+        tier.set('c', memoryview(b'c' * 30), '')
+        tier.get('a')
+        tier.set('d', memoryview(b'd' * 30), '')
+
+        self.assertTrue(tier.has('a'))
+        self.assertFalse(tier.has('b'))
+        self.assertTrue(tier.has('c'))
+        self.assertTrue(tier.has('d'))
+        self.assertEqual(tier.stats.evictions, 1)
+        self.assertLessEqual(
+            sum(entry.stat().st_size for entry in os.scandir(self._tmp_dir.name)), 100
+        )
+
+    def test_can_evict_files_of_other_processes(self):
+        other_tier = self._make_tier(max_size=100)
+        other_tier.set('a', memoryview(b'a' * 60), '')
+
+        tier = self._make_tier(max_size=100)
+        tier.set('b', memoryview(b'b' * 60), '')
+
+        self.assertFalse(tier.has('a'))
+        self.assertTrue(tier.has('b'))
+
+    def test_does_not_rescan_directory_on_each_set(self):
+        tier = self._make_tier(max_size=1000)
+        tier.set('a', memoryview(b'a' * 10), '')
+
+        with mock.patch('cvat.apps.engine.cache.os.scandir') as scandir:
+            for i in range(10):
+                tier.set(f'key{i}', memoryview(b'x' * 10), '')
+
+        scandir.assert_not_called()
+
+
+class MediaCacheTiersTest(SimpleTestCase):
+    def setUp(self):
+        self._tmp_dir = TemporaryDirectory()
+        self.addCleanup(self._tmp_dir.cleanup)
+
+        # Redis is replaced with a dict
+        self.cache = MediaCache.__new__(MediaCache)
+        self.cache._memory_tier = _MemoryCacheTier(1000)
+        self.cache._disk_tier = _DiskCacheTier(self._tmp_dir.name, max_size=1000, min_item_size=50)
+
+        self.redis_items = {}
+        for method_name, side_effect in [
+            ('_set_redis_item', self._set_redis_item),
+            ('_get_redis_item', self._get_redis_item),
+        ]:
+            patcher = mock.patch.object(self.cache, method_name, side_effect=side_effect)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _set_redis_item(self, key, data, mime):
+        self.redis_items[key] = (bytes(data), mime)
+
+    def _get_redis_item(self, key):
+        if item := self.redis_items.get(key):
+            return BytesIO(item[0]), item[1]
+        return None
+
+    def _create_item(self, key, data):
+        return self.cache._create_cache_item(key, lambda: (BytesIO(data), 'application/zip'))
+
+    def test_puts_large_items_to_redis_and_disk(self):
+        self._create_item('key', b'x' * 100)
+
+        self.assertEqual(self.redis_items['key'], (b'x' * 100, 'application/zip'))
+        self.assertTrue(self.cache._disk_tier.has('key'))
+        self.assertTrue(self.cache._memory_tier.has('key'))
+
+    def test_puts_small_items_only_to_redis(self):
+        self._create_item('key', b'x' * 10)
+
+        self.assertIn('key', self.redis_items)
+        self.assertFalse(self.cache._disk_tier.has('key'))
+
+    def test_spills_items_rejected_by_redis_to_disk(self):
+        self.cache._set_redis_item.side_effect = RedisError('the item is too large')
+
+        self._create_item('key', b'x' * 10)
+
+        self.assertNotIn('key', self.redis_items)
+        self.assertEqual(self.cache._disk_tier.get('key'), (b'x' * 10, 'application/zip'))
+
+    def test_raises_redis_error_without_disk_tier(self):
+        self.cache._disk_tier = None
+        self.cache._set_redis_item.side_effect = RedisError('the item is too large')
+
+        with self.assertRaises(RedisError):
+            self._create_item('key', b'x' * 10)
+
+    def test_can_read_item_from_redis(self):
+        self.redis_items['key'] = (b'data', 'image/jpeg')
+
+        data, mime = self.cache._get_cache_item('key')
+
+        self.assertEqual((data.getvalue(), mime), (b'data', 'image/jpeg'))
+        self.assertTrue(self.cache._memory_tier.has('key'))
+
+    def test_can_read_item_from_disk(self):
+        self.cache._disk_tier.set('key', memoryview(b'x' * 100), 'image/jpeg')
+
+        data, mime = self.cache._get_cache_item('key')
+
+        self.assertEqual((data.getvalue(), mime), (b'x' * 100, 'image/jpeg'))
+        self.assertTrue(self.cache._memory_tier.has('key'))
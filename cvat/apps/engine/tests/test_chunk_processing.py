@@ -0,0 +1,118 @@
+# Copyright (C) 2024 CVAT.ai Corporation
+#
+# SPDX-License-Identifier: MIT
+
+import math
+import zipfile
+from multiprocessing.shared_memory import SharedMemory
+from unittest import mock
+
+import av
+from django.contrib.auth.models import Group, User
+from django.test import override_settings
+from rest_framework import status
+
+from cvat.apps.engine import task as task_module
+from cvat.apps.engine.models import Task, Video
+from cvat.apps.engine.tests.utils import (
+    ApiTestBase, ForceLogin, generate_image_file, generate_video_file
+)
+
+
+def _fail_to_save_chunk(*args, **kwargs):
+    # Runs in a worker process, so it must be importable by name
+    raise RuntimeError("Failed to save the chunk")
+
+
+class ChunkProcessingExecutorTest(ApiTestBase):
+    @classmethod
+    def setUpTestData(cls):
+        group, _ = Group.objects.get_or_create(name="admin")
+        cls.admin = User.objects.create_superuser(username="admin", email="", password="admin")
+        cls.admin.groups.add(group)
+
+    def _create_task(self, executor, media):
+        with (
+            override_settings(CVAT_CHUNK_PROCESSING_EXECUTOR=executor),
+            ForceLogin(self.admin, self.client),
+        ):
+            response = self.client.post("/api/tasks", data={
+                "name": f"{executor} task",
+                "labels": [{ "name": "car" }],
+            }, format="json")
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            task_id = response.data["id"]
+
+            response = self.client.post(f"/api/tasks/{task_id}/data", data={
+                "image_quality": 70,
+                "chunk_size": 4,
+                **{ f"client_files[{i}]": f for i, f in enumerate(media) },
+            })
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        return Task.objects.get(id=task_id)
+
+    @staticmethod
+    def _read_chunk(chunk_path):
+        if zipfile.is_zipfile(chunk_path):
+            with zipfile.ZipFile(chunk_path) as chunk:
+                return [(name, chunk.read(name)) for name in sorted(chunk.namelist())]
+
+        with av.open(chunk_path) as container:
+            return [
+                frame.to_ndarray(format="rgb24").tobytes()
+                for frame in container.decode(video=0)
+            ]
+
+    def _read_chunks(self, db_task):
+        db_data = db_task.data
+        self.assertGreater(db_data.size, 0)
+
+        return [
+            (
+                self._read_chunk(db_data.get_original_chunk_path(chunk_idx)),
+                self._read_chunk(db_data.get_compressed_chunk_path(chunk_idx)),
+            )
+            for chunk_idx in range(math.ceil(db_data.size / db_data.chunk_size))
+        ]
+
+    def _check_chunks_match_thread_mode(self, make_media):
+        thread_task = self._create_task("thread", make_media())
+        process_task = self._create_task("process", make_media())
+
+        self.assertEqual(process_task.data.size, thread_task.data.size)
+        self.assertEqual(self._read_chunks(process_task), self._read_chunks(thread_task))
+
+    def test_image_chunks_match_thread_mode(self):
+        self._check_chunks_match_thread_mode(lambda: [
+            generate_image_file(f"image_{i}.jpg", size=(50 + i, 40)) for i in range(6)
+        ])
+
+    def test_video_chunks_match_thread_mode(self):
+        self._check_chunks_match_thread_mode(lambda: [
+            generate_video_file("video.mp4", width=64, height=64, duration=1, fps=10)[1]
+        ])
+
+    def test_shared_memory_is_released_on_worker_failure(self):
+        shared_memory_names = []
+        pack_chunk_data = task_module._pack_chunk_data
+
+        def pack_and_record_chunk_data(chunk_data):
+            shared_memory, descriptors = pack_chunk_data(chunk_data)
+            if shared_memory:
+                shared_memory_names.append(shared_memory.name)
+            return shared_memory, descriptors
+
+        with (
+            mock.patch.object(task_module, "_pack_chunk_data", pack_and_record_chunk_data),
+            mock.patch.object(task_module, "_save_chunk_in_process", _fail_to_save_chunk),
+        ):
+            db_task = self._create_task("process", [
+                generate_video_file("video.mp4", width=64, height=64, duration=1, fps=10)[1]
+            ])
+
+        self.assertFalse(Video.objects.filter(data=db_task.data).exists())
+        self.assertNotEqual(shared_memory_names, [])
+        for name in shared_memory_names:
+            with self.assertRaises(FileNotFoundError):
+                SharedMemory(name=name)
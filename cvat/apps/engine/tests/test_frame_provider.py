@@ -0,0 +1,131 @@
+# Copyright (C) 2024 CVAT.ai Corporation
+#
+# SPDX-License-Identifier: MIT
+
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from cvat.apps.engine import frame_provider
+from cvat.apps.engine.cache import _MemoryCacheTier
+from cvat.apps.engine.frame_provider import FrameProvider, RandomAccessIterator
+from cvat.apps.engine.media_extractors import VideoReader
+
+CHUNK_SIZE = 4
+FRAME_SHAPE = (2, 2, 3)
+FRAME_SIZE = int(np.prod(FRAME_SHAPE))
+
+
+class _FakeAVFrame:
+    def __init__(self, frame_number):
+        self.frame_number = frame_number
+
+    def to_ndarray(self, format): # pylint: disable=redefined-builtin
+        assert format == 'bgr24'
+        return np.full(FRAME_SHAPE, self.frame_number, dtype=np.uint8)
+
+
+class _FakeVideoChunk:
+    def __init__(self, loader, chunk_id):
+        self._loader = loader
+        self._chunk_id = chunk_id
+
+    def __iter__(self):
+        return self._loader.decode_chunk(self._chunk_id)
+
+
+class _FakeVideoChunkLoader(FrameProvider.ChunkLoader):
+    def __init__(self):
+        super().__init__(VideoReader, None)
+        self.decoded_frames = []
+
+    def decode_chunk(self, chunk_id):
+        for offset in range(CHUNK_SIZE):
+            frame_number = chunk_id * CHUNK_SIZE + offset
+            self.decoded_frames.append(frame_number)
+            yield _FakeAVFrame(frame_number), f'frame_{frame_number}', frame_number
+
+    def load(self, chunk_id):
+        if self.chunk_id != chunk_id:
+            self.chunk_id = chunk_id
+            self.chunk_reader = RandomAccessIterator(_FakeVideoChunk(self, chunk_id))
+        return self.chunk_reader
+
+
+class DecodedFrameCacheTest(SimpleTestCase):
+    def _make_provider(self, cache_size):
+        patcher = mock.patch.object(frame_provider, '_decoded_frame_cache',
+            _MemoryCacheTier(cache_size, name='decoded frame') if cache_size else None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        provider = FrameProvider.__new__(FrameProvider)
+        provider._db_data = SimpleNamespace(id=1, size=3 * CHUNK_SIZE, chunk_size=CHUNK_SIZE)
+        provider._dimension = None
+        self.loader = _FakeVideoChunkLoader()
+        provider._loaders = { FrameProvider.Quality.ORIGINAL: self.loader }
+        return provider
+
+    def _get_frame(self, provider, frame_number):
+        frame, _ = provider.get_frame(frame_number,
+            quality=FrameProvider.Quality.ORIGINAL, out_type=FrameProvider.Type.NUMPY_ARRAY)
+        return int(frame[0, 0, 0])
+
+    def test_caches_frames_decoded_while_seeking(self):
+        provider = self._make_provider(cache_size=CHUNK_SIZE * FRAME_SIZE)
+
+        self.assertEqual(self._get_frame(provider, 2), 2)
+        self.assertEqual(self.loader.decoded_frames, [0, 1, 2])
+
+        # backward seeks are served from the cache
+        self.assertEqual(self._get_frame(provider, 0), 0)
+        self.assertEqual(self._get_frame(provider, 1), 1)
+        self.assertEqual(self.loader.decoded_frames, [0, 1, 2])
+
+    def test_evicts_least_recently_used_frames(self):
+        provider = self._make_provider(cache_size=2 * FRAME_SIZE)
+
+        self.assertEqual(self._get_frame(provider, 2), 2)
+        self.assertEqual(self._get_frame(provider, 0), 0)
+        self.assertEqual(self.loader.decoded_frames, [0, 1, 2, 0])
+
+        cache = frame_provider.get_decoded_frame_cache()
+        self.assertTrue(cache.has((1, FrameProvider.Quality.ORIGINAL, 0)))
+        self.assertFalse(cache.has((1, FrameProvider.Quality.ORIGINAL, 1)))
+        self.assertTrue(cache.has((1, FrameProvider.Quality.ORIGINAL, 2)))
+
+    def test_skips_frames_larger_than_budget(self):
+        provider = self._make_provider(cache_size=FRAME_SIZE - 1)
+
+        self.assertEqual(self._get_frame(provider, 1), 1)
+        self.assertEqual(self._get_frame(provider, 1), 1)
+
+        self.assertEqual(self.loader.decoded_frames, [0, 1, 0, 1])
+        self.assertFalse(frame_provider.get_decoded_frame_cache().has(
+            (1, FrameProvider.Quality.ORIGINAL, 1)
+        ))
+
+    def test_cached_frames_are_not_changed_by_callers(self):
+        provider = self._make_provider(cache_size=CHUNK_SIZE * FRAME_SIZE)
+
+        frame, _ = provider.get_frame(1, out_type=FrameProvider.Type.NUMPY_ARRAY)
+        frame[:] = 100
+
+        self.assertEqual(self._get_frame(provider, 1), 1)
+
+    def test_can_iterate_frames_in_single_pass(self):
+        provider = self._make_provider(cache_size=0)
+
+        frame_numbers = [9, 1, 3, 1, 8, 2]
+        frames = [
+            (frame_number, int(frame[0, 0, 0]))
+            for frame_number, (frame, _) in provider.iterate_frames(
+                frame_numbers, out_type=FrameProvider.Type.NUMPY_ARRAY
+            )
+        ]
+
+        self.assertEqual(frames, [(1, 1), (2, 2), (3, 3), (8, 8), (9, 9)])
+        # each frame is decoded once, the chunks are read forward
+        self.assertEqual(self.loader.decoded_frames, [0, 1, 2, 3, 8, 9])
@@ -0,0 +1,160 @@
+# Copyright (C) 2024 CVAT.ai Corporation
+#
+# SPDX-License-Identifier: MIT
+
+import json
+import os
+import os.path as osp
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from utils.dataset_manifest.core import ImageManifestManager, _Index
+
+
+class ManifestIndexTest(SimpleTestCase):
+    def setUp(self):
+        self._tmp_dir = TemporaryDirectory()
+        self.addCleanup(self._tmp_dir.cleanup)
+        self.index_dir = self._tmp_dir.name
+
+    def _write_manifest(self, lines):
+        manifest_path = osp.join(self.index_dir, 'manifest.jsonl')
+        offsets = []
+        with open(manifest_path, 'w') as manifest_file:
+            for line in lines:
+                offsets.append(manifest_file.tell())
+                manifest_file.write(line + '\n')
+
+        return manifest_path, offsets
+
+    def _write_legacy_index(self, offsets):
+        with open(osp.join(self.index_dir, _Index.LEGACY_FILE_NAME), 'w') as index_file:
+            json.dump({str(i): offset for i, offset in enumerate(offsets)}, index_file)
+
+    def _create_index(self, lines):
+        manifest_path, offsets = self._write_manifest(lines)
+
+        index = _Index(self.index_dir)
+        index.create(manifest_path, skip=0)
+        index.dump()
+
+        return offsets
+
+    def _load_index(self):
+        index = _Index(self.index_dir)
+        index.load()
+        return index
+
+    def test_can_dump_and_load_index(self):
+        offsets = self._create_index(['{"name": "image_%d"}' % i for i in range(10)])
+
+        index = self._load_index()
+
+        self.assertEqual(list(index), offsets)
+        self.assertEqual(os.path.getsize(index.path), 8 * len(offsets))
+        self.assertEqual(
+            sorted(os.listdir(self.index_dir)), sorted([_Index.FILE_NAME, 'manifest.jsonl'])
+        )
+
+    def test_can_access_loaded_index_items(self):
+        offsets = self._create_index(['{"name": "image_%d"}' % i for i in range(5)])
+
+        index = self._load_index()
+
+        self.assertEqual(len(index), len(offsets))
+        self.assertFalse(index.is_empty())
+        for i, offset in enumerate(offsets):
+            self.assertEqual(index[i], offset)
+
+        with self.assertRaises(IndexError):
+            index[len(offsets)] # pylint: disable=pointless-statement
+
+    def test_can_load_empty_index(self):
+        self._create_index([])
+
+        index = self._load_index()
+
+        self.assertEqual(len(index), 0)
+        self.assertTrue(index.is_empty())
+        self.assertEqual(list(index), [])
+
+    def test_can_migrate_legacy_index(self):
+        offsets = [0, 15, 31, 48]
+        self._write_legacy_index(offsets)
+
+        index = self._load_index()
+
+        self.assertEqual(list(index), offsets)
+        self.assertFalse(osp.exists(osp.join(self.index_dir, _Index.LEGACY_FILE_NAME)))
+        self.assertEqual(list(self._load_index()), offsets)
+
+    def test_can_load_index_migrated_concurrently(self):
+        legacy_offsets = [0, 10, 20]
+        self._write_legacy_index(legacy_offsets)
+
+        migrated_offsets = [0, 11, 22]
+        original_json_load = json.load
+
+        def json_load_with_concurrent_migration(*args, **kwargs):
+            result = original_json_load(*args, **kwargs)
+
+            # another process finishes the migration while the legacy file is being read
+            concurrent_index = _Index(self.index_dir)
+            concurrent_index._index = migrated_offsets
+            concurrent_index.dump()
+            os.remove(osp.join(self.index_dir, _Index.LEGACY_FILE_NAME))
+
+            return result
+
+        with mock.patch('utils.dataset_manifest.core.json.load',
+            side_effect=json_load_with_concurrent_migration
+        ):
+            index = self._load_index()
+
+        self.assertEqual(list(index), migrated_offsets)
+        self.assertEqual(os.listdir(self.index_dir), [_Index.FILE_NAME])
+
+
+class ManifestRangeTest(SimpleTestCase):
+    def setUp(self):
+        self._tmp_dir = TemporaryDirectory()
+        self.addCleanup(self._tmp_dir.cleanup)
+
+        self.manifest = ImageManifestManager(osp.join(self._tmp_dir.name, 'manifest.jsonl'))
+        self.manifest.create([
+            {'name': 'image_%d' % i, 'extension': '.jpg', 'width': 10 + i, 'height': 20}
+            for i in range(10)
+        ])
+
+    def _check_range(self, start, stop, step=1):
+        expected = [
+            self.manifest[i] for i in range(start, min(stop, len(self.manifest)), step)
+        ]
+
+        self.assertEqual(self.manifest.get_range(start, stop, step), expected)
+
+    def test_can_get_range(self):
+        self._check_range(0, 10)
+        self._check_range(3, 7)
+        self._check_range(9, 10)
+
+    def test_can_get_range_with_step(self):
+        self._check_range(0, 10, 3)
+        self._check_range(1, 8, 2)
+        self._check_range(2, 9, 4)
+
+    def test_range_stop_is_clamped_at_manifest_end(self):
+        self._check_range(6, 100)
+        self._check_range(5, 100, 2)
+
+        self.assertEqual(len(self.manifest.get_range(6, 100)), 4)
+
+    def test_can_get_empty_range(self):
+        self.assertEqual(self.manifest.get_range(4, 4), [])
+        self.assertEqual(self.manifest.get_range(7, 3), [])
+        self.assertEqual(self.manifest.get_range(10, 12), [])
+
+    def test_can_get_range_by_slice(self):
+        self.assertEqual(self.manifest[2:9:3], [self.manifest[i] for i in range(2, 9, 3)])
@@ -0,0 +1,52 @@
+# Copyright (C) 2024 CVAT.ai Corporation
+#
+# SPDX-License-Identifier: MIT
+
+import math
+
+from django.test import SimpleTestCase
+
+from cvat.apps.engine.models import BinaryFloatArrayField
+
+
+class BinaryFloatArrayFieldTest(SimpleTestCase):
+    def setUp(self):
+        self.field = BinaryFloatArrayField()
+
+    def _roundtrip(self, values):
+        packed = self.field.get_prep_value(values)
+        return packed, self.field.from_db_value(memoryview(packed), None, None)
+
+    def test_can_store_values_exactly(self):
+        for values in [
+            [],
+            [0, 1, 2, 3],
+            [-32768, 32767, 100000, -2147483647],
+            [0.5, 1.25, -3.75],
+            [123.456, 1e-7, 1e30, 2 ** 40],
+        ]:
+            with self.subTest(values=values):
+                _, unpacked = self._roundtrip(values)
+                self.assertEqual(unpacked, values)
+                self.assertTrue(all(type(v) is float for v in unpacked))
+
+    def test_can_store_non_finite_values(self):
+        _, unpacked = self._roundtrip([math.inf, -math.inf, math.nan])
+
+        self.assertEqual(unpacked[:2], [math.inf, -math.inf])
+        self.assertTrue(math.isnan(unpacked[2]))
+
+    def test_uses_narrowest_exact_type(self):
+        for values, code, item_size in [
+            ([1, 500, 32000], b'h', 2),
+            ([1, 500, 64000], b'i', 4),
+            ([1.5, 2.25], b'f', 4),
+            ([1.1, 2.2], b'd', 8),
+        ]:
+            with self.subTest(values=values):
+                packed, _ = self._roundtrip(values)
+                self.assertEqual(packed[:1], code)
+                self.assertEqual(len(packed), 1 + len(values) * item_size)
+
+    def test_can_parse_text_values(self):
+        self.assertEqual(self.field.to_python('1.5,2,3'), [1.5, 2.0, 3.0])
@@ -5340,6 +5340,86 @@ class JobAnnotationAPITestCase(ApiTestBase):
     def test_api_v2_jobs_id_annotations_no_auth(self):
         self._run_api_v2_jobs_id_annotations(self.user, self.user, None)
 
+    def test_api_v2_jobs_id_annotations_delta(self):
+        task, jobs = self._create_task(self.user, self.user)
+        job = jobs[0]
+
+        def make_shape(frame, points):
+            return {
+                "frame": frame,
+                "label_id": task["labels"][1]["id"],
+                "group": None,
+                "source": "manual",
+                "attributes": [],
+                "points": points,
+                "type": "rectangle",
+                "occluded": False,
+            }
+
+        response = self._put_api_v2_jobs_id_data(job["id"], self.user, {
+            "version": 0,
+            "tags": [],
+            "shapes": [make_shape(0, [1, 2, 3, 4]), make_shape(1, [5, 6, 7, 8])],
+            "tracks": [],
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        version = response.data["version"]
+        changed_shape, deleted_shape = response.data["shapes"]
+
+        changed_shape["points"] = [10, 20, 30, 40]
+        delta = {
+            "version": version,
+            "shapes": [changed_shape, make_shape(2, [0, 0, 1, 1])],
+            "deleted": { "shapes": [deleted_shape["id"]] },
+        }
+        response = self._patch_api_v2_jobs_id_data(job["id"], self.user, "delta", delta)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(response.data["version"], version)
+
+        response = self._get_api_v2_jobs_id_data(job["id"], self.user)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        shapes = {shape["frame"]: shape for shape in response.data["shapes"]}
+        self.assertEqual(sorted(shapes), [0, 2])
+        self.assertEqual(shapes[0]["id"], changed_shape["id"])
+        self.assertEqual(shapes[0]["points"], [10, 20, 30, 40])
+
+        # the same delta is based on an outdated version now
+        response = self._patch_api_v2_jobs_id_data(job["id"], self.user, "delta", delta)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_api_v2_jobs_id_annotations_etag(self):
+        task, jobs = self._create_task(self.user, self.user)
+        job = jobs[0]
+
+        response = self._get_api_v2_jobs_id_data(job["id"], self.user)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response["ETag"]
+
+        with ForceLogin(self.user, self.client):
+            response = self.client.get("/api/jobs/{}/annotations".format(job["id"]),
+                HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+        response = self._patch_api_v2_jobs_id_data(job["id"], self.user, "create", {
+            "version": 0,
+            "tags": [{
+                "frame": 0,
+                "label_id": task["labels"][0]["id"],
+                "group": None,
+                "source": "manual",
+                "attributes": [],
+            }],
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with ForceLogin(self.user, self.client):
+            response = self.client.get("/api/jobs/{}/annotations".format(job["id"]),
+                HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(len(response.data["tags"]), 1)
+
 class TaskAnnotationAPITestCase(JobAnnotationAPITestCase):
     def _put_api_v2_tasks_id_annotations(self, pk, user, data):
         with ForceLogin(user, self.client):
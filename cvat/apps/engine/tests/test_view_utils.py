@@ -0,0 +1,116 @@
+# Copyright (C) 2024 CVAT.ai Corporation
+#
+# SPDX-License-Identifier: MIT
+
+import io
+import tracemalloc
+import zipfile
+
+from django.test import RequestFactory, SimpleTestCase
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+
+from cvat.apps.engine.views import DataChunkGetter
+from cvat.apps.engine.view_utils import (
+    PrerenderedResponse, make_buffer_response, make_zip_stream_response
+)
+
+
+class BufferResponseTest(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.data = bytes(range(256)) * 4096
+
+    def _get(self, **headers):
+        request = self.factory.get('/', headers=headers)
+        return make_buffer_response(request, io.BytesIO(self.data), 'application/zip')
+
+    def test_can_stream_full_buffer(self):
+        response = self._get()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Length'], str(len(self.data)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(b''.join(response.streaming_content), self.data)
+
+    def test_can_get_byte_range(self):
+        response = self._get(Range='bytes=100-299999')
+
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(response['Content-Range'], f'bytes 100-299999/{len(self.data)}')
+        self.assertEqual(b''.join(response.streaming_content), self.data[100:300000])
+
+    def test_can_get_open_and_suffix_ranges(self):
+        response = self._get(Range='bytes=1000-')
+        self.assertEqual(b''.join(response.streaming_content), self.data[1000:])
+
+        response = self._get(Range='bytes=-10')
+        self.assertEqual(b''.join(response.streaming_content), self.data[-10:])
+
+    def test_cannot_get_unsatisfiable_range(self):
+        response = self._get(Range=f'bytes={len(self.data)}-')
+
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.data)}')
+
+    def test_ignores_multiple_ranges(self):
+        response = self._get(Range='bytes=0-10,20-30')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), self.data)
+
+
+class ZipStreamResponseTest(SimpleTestCase):
+    def test_can_stream_zip(self):
+        files = [('frame_000000.png', b'a' * 1000), ('frame_000002.png', memoryview(b'b' * 10))]
+
+        response = make_zip_stream_response(iter(files))
+
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as zip_file:
+            self.assertEqual(zip_file.namelist(), ['frame_000000.png', 'frame_000002.png'])
+            self.assertEqual(zip_file.read('frame_000002.png'), b'b' * 10)
+
+
+class PrerenderedResponseTest(SimpleTestCase):
+    def test_can_return_prerendered_content(self):
+        response = PrerenderedResponse(b'{"version":1,"tags":[]}')
+        response.accepted_media_type = 'application/vnd.cvat+json'
+        response.render()
+
+        self.assertEqual(response.content, b'{"version":1,"tags":[]}')
+        self.assertEqual(response['Content-Type'], 'application/vnd.cvat+json')
+        self.assertEqual(response.data, {"version": 1, "tags": []})
+
+
+class FrameNumbersParsingTest(SimpleTestCase):
+    def test_can_parse_frames_and_ranges(self):
+        self.assertEqual(
+            DataChunkGetter._parse_frame_numbers('7, 1,3-5,4'), [1, 3, 4, 5, 7]
+        )
+
+    def test_cannot_parse_reversed_range(self):
+        with self.assertRaises(ValidationError) as ctx:
+            DataChunkGetter._parse_frame_numbers('5-3')
+
+        self.assertEqual(ctx.exception.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cannot_request_huge_range(self):
+        tracemalloc.start()
+        try:
+            with self.assertRaises(ValidationError) as ctx:
+                DataChunkGetter._parse_frame_numbers('0-2000000000')
+
+            _, peak_memory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertEqual(ctx.exception.status_code, status.HTTP_400_BAD_REQUEST)
+        # the range must be rejected before it is expanded into a set
+        self.assertLess(peak_memory, 1024 * 1024)
+
+    def test_cannot_exceed_limit_with_several_ranges(self):
+        limit = DataChunkGetter.MAX_FRAMES_PER_REQUEST
+
+        with self.assertRaises(ValidationError):
+            DataChunkGetter._parse_frame_numbers(f'0-{limit - 1},{limit}')
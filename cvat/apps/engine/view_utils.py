@@ -4,13 +4,18 @@
 
 # NOTE: importing in the utils.py header leads to circular importing
 
-from typing import Optional, Type
+import io
+import json
+import re
+import zipfile
+from typing import Iterable, Iterator, List, Optional, Tuple, Type, Union
 
 from django.db.models.query import QuerySet
 from django.http.request import HttpRequest
-from django.http.response import HttpResponse
+from django.http.response import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from rest_framework.decorators import action
+from rest_framework import status
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
 from rest_framework.serializers import Serializer
@@ -111,3 +116,148 @@ def tus_chunk_action(*, detail: bool, suffix_base: str):
         return f
 
     return decorator
+
+_BYTE_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+_STREAMING_BLOCK_SIZE = 256 * 1024
+
+def _parse_byte_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parses a single-range "Range" header value.
+    Returns the [start, stop) range, None if the header should be ignored,
+    or raises ValueError if the range can't be satisfied.
+    """
+
+    match = _BYTE_RANGE_RE.match(header.strip())
+    if not match:
+        # Multiple ranges and unknown units are not supported, the full content is returned
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:
+        # suffix range: the last N bytes
+        start = max(size - int(last), 0)
+        stop = size
+    else:
+        start = int(first)
+        stop = min(int(last) + 1, size) if last else size
+
+    if size <= start or stop <= start:
+        raise ValueError('Unsatisfiable range')
+
+    return start, stop
+
+def _iterate_buffer(data: memoryview, start: int, stop: int) -> Iterator[memoryview]:
+    for offset in range(start, stop, _STREAMING_BLOCK_SIZE):
+        yield data[offset : min(offset + _STREAMING_BLOCK_SIZE, stop)]
+
+def make_buffer_response(
+    request: HttpRequest,
+    buffer: Union[io.BytesIO, bytes, memoryview],
+    content_type: str,
+) -> HttpResponse:
+    """
+    Streams an in-memory buffer without copying it as a whole.
+    Single-range "Range" requests are supported.
+    """
+
+    if isinstance(buffer, io.BytesIO):
+        data = buffer.getbuffer()
+    else:
+        data = memoryview(buffer)
+
+    if data.ndim != 1 or data.itemsize != 1:
+        data = data.cast('B')
+
+    size = data.nbytes
+    start, stop = 0, size
+    response_status = status.HTTP_200_OK
+
+    range_header = request.headers.get('Range')
+    if range_header:
+        try:
+            byte_range = _parse_byte_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        if byte_range:
+            start, stop = byte_range
+            response_status = status.HTTP_206_PARTIAL_CONTENT
+
+    response = StreamingHttpResponse(
+        _iterate_buffer(data, start, stop), content_type=content_type, status=response_status,
+    )
+    response['Content-Length'] = str(stop - start)
+    response['Accept-Ranges'] = 'bytes'
+    if response_status == status.HTTP_206_PARTIAL_CONTENT:
+        response['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+
+    return response
+
+class _ZipStreamBuffer(io.RawIOBase):
+    # A write-only, non-seekable output for ZipFile, which collects written data
+    def __init__(self):
+        super().__init__()
+        self._parts: List[bytes] = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def pop(self) -> bytes:
+        data = b''.join(self._parts)
+        self._parts.clear()
+        return data
+
+def _iterate_zip(files: Iterable[Tuple[str, Union[bytes, memoryview]]]) -> Iterator[bytes]:
+    output = _ZipStreamBuffer()
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_STORED) as zip_file:
+        for name, data in files:
+            zip_file.writestr(name, data)
+            yield output.pop()
+
+    yield output.pop()
+
+def make_zip_stream_response(
+    files: Iterable[Tuple[str, Union[bytes, memoryview]]],
+) -> StreamingHttpResponse:
+    """
+    Streams a zip archive, the files are produced and added to the archive
+    one by one, while the response is being sent.
+    """
+
+    return StreamingHttpResponse(_iterate_zip(files), content_type='application/zip')
+
+
+class PrerenderedResponse(Response):
+    """
+    A JSON response with the content rendered in advance, e.g. taken from a cache.
+    The data is only parsed on access, which is needed in tests mostly.
+    """
+
+    def __init__(self, content: bytes, **kwargs):
+        self._prerendered_content = content
+        self._data = None
+        super().__init__(**kwargs)
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = json.loads(self._prerendered_content)
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
+    @property
+    def rendered_content(self):
+        self['Content-Type'] = self.content_type or self.accepted_media_type
+        return self._prerendered_content
@@ -24,6 +24,7 @@ from django.db.models import Count
 from django.db.models.query import Prefetch
 from django.http import HttpResponse, HttpRequest, HttpResponseNotFound, HttpResponseBadRequest
 from django.utils import timezone
+from django.utils.http import parse_etags
 
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import (
@@ -37,6 +38,7 @@ from rest_framework.decorators import action
 from rest_framework.exceptions import APIException, NotFound, ValidationError, PermissionDenied
 from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import SAFE_METHODS
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
@@ -48,6 +50,7 @@ from cvat.apps.dataset_manager.bindings import CvatImportError
 from cvat.apps.dataset_manager.serializers import DatasetFormatsSerializer
 from cvat.apps.engine.frame_provider import FrameProvider
 from cvat.apps.engine.media_extractors import get_mime
+from cvat.apps.engine.mime_types import mimetypes
 from cvat.apps.engine.models import (
     ClientFile, Job, JobType, Label, SegmentType, Task, Project, Issue, Data,
     Comment, StorageMethodChoice, StorageChoice,
@@ -87,7 +90,9 @@ from cvat.apps.engine.cache import MediaCache
 from cvat.apps.engine.permissions import (CloudStoragePermission,
     CommentPermission, IssuePermission, JobPermission, LabelPermission, ProjectPermission,
     TaskPermission, UserPermission)
-from cvat.apps.engine.view_utils import tus_chunk_action
+from cvat.apps.engine.view_utils import (
+    PrerenderedResponse, make_buffer_response, make_zip_stream_response, tus_chunk_action
+)
 
 slogger = ServerLogManager(__name__)
 
@@ -606,8 +611,10 @@ class ProjectViewSet(viewsets.GenericViewSet, mixins.ListModelMixin,
         return response
 
 class DataChunkGetter:
-    def __init__(self, data_type, data_num, data_quality, task_dim):
-        possible_data_type_values = ('chunk', 'frame', 'preview', 'context_image')
+    MAX_FRAMES_PER_REQUEST = 10000
+
+    def __init__(self, data_type, data_num, data_quality, task_dim, data_frames=None):
+        possible_data_type_values = ('chunk', 'frame', 'frames', 'preview', 'context_image')
         possible_quality_values = ('compressed', 'original')
 
         if not data_type or data_type not in possible_data_type_values:
@@ -617,14 +624,46 @@ class DataChunkGetter:
                 raise ValidationError('Number is not specified')
             elif data_quality not in possible_quality_values:
                 raise ValidationError('Wrong quality value')
+        elif data_type == 'frames':
+            if not data_frames:
+                raise ValidationError('Frames are not specified')
+            elif data_quality not in possible_quality_values:
+                raise ValidationError('Wrong quality value')
 
         self.type = data_type
         self.number = int(data_num) if data_num is not None else None
+        self.frames = self._parse_frame_numbers(data_frames) if data_type == 'frames' else None
         self.quality = FrameProvider.Quality.COMPRESSED \
             if data_quality == 'compressed' else FrameProvider.Quality.ORIGINAL
 
         self.dimension = task_dim
 
+    @classmethod
+    def _parse_frame_numbers(cls, value: str) -> List[int]:
+        # The expected format is a comma-separated list of frame numbers
+        # and inclusive frame ranges, e.g. "1,5,10-20"
+        frames = set()
+        try:
+            for part in value.split(','):
+                start, _, stop = part.strip().partition('-')
+                start = int(start)
+                stop = int(stop) if stop else start
+                if stop < start:
+                    raise ValueError(f'Invalid frame range "{part}"')
+
+                # The limit is checked before the range is expanded,
+                # so that huge ranges are not materialized
+                if cls.MAX_FRAMES_PER_REQUEST < len(frames) + (stop - start + 1):
+                    raise ValidationError(
+                        f'Too many frames requested, the limit is {cls.MAX_FRAMES_PER_REQUEST}'
+                    )
+
+                frames.update(range(start, stop + 1))
+        except ValueError as ex:
+            raise ValidationError(f'Invalid frames value: {ex}') from ex
+
+        return sorted(frames)
+
     def _check_frame_range(self, frame: int):
         frame_range = range(self._start, self._stop + 1, self._db_data.get_frame_step())
         if frame not in frame_range:
@@ -632,6 +671,14 @@ class DataChunkGetter:
                 f'The frame number should be in the [{self._start}, {self._stop}] range'
             )
 
+    def _iterate_frame_files(self, frame_provider: FrameProvider):
+        # Frames are read in the ascending order, so each chunk is decoded once
+        for frame_number, (frame, mime) in frame_provider.iterate_frames(
+            self.frames, quality=self.quality
+        ):
+            ext = (mime and mimetypes.guess_extension(mime)) or ''
+            yield f'frame_{frame_number:06d}{ext}', frame.getbuffer()
+
     def __call__(self, request, start: int, stop: int, db_data: Optional[Data]):
         if not db_data:
             raise NotFound(detail='Cannot find requested data')
@@ -654,7 +701,9 @@ class DataChunkGetter:
                 # TODO: av.FFmpegError processing
                 if settings.USE_CACHE and db_data.storage_method == StorageMethodChoice.CACHE:
                     buff, mime_type = frame_provider.get_chunk(self.number, self.quality)
-                    return HttpResponse(buff.getvalue(), content_type=mime_type)
+                    MediaCache(self.dimension).prewarm_task_chunks(db_data, self.quality,
+                        self.number, start_chunk=start_chunk, stop_chunk=stop_chunk)
+                    return make_buffer_response(request, buff, mime_type)
 
                 # Follow symbol links if the chunk is a link on a real image otherwise
                 # mimetype detection inside sendfile will work incorrectly.
@@ -666,10 +715,24 @@ class DataChunkGetter:
                 if self.type == 'preview':
                     cache = MediaCache(self.dimension)
                     buf, mime = cache.get_local_preview_with_mime(self.number, db_data)
+                    return HttpResponse(buf.getvalue(), content_type=mime)
                 else:
                     buf, mime = frame_provider.get_frame(self.number, self.quality)
 
-                return HttpResponse(buf.getvalue(), content_type=mime)
+                    if settings.USE_CACHE and db_data.storage_method == StorageMethodChoice.CACHE:
+                        # the user might have jumped to this frame, warm up its neighbourhood
+                        MediaCache(self.dimension).prewarm_task_chunks(db_data, self.quality,
+                            frame_provider.get_chunk_number(self.number),
+                            start_chunk=frame_provider.get_chunk_number(start),
+                            stop_chunk=frame_provider.get_chunk_number(stop))
+
+                    return make_buffer_response(request, buf, mime)
+
+            elif self.type == 'frames':
+                for frame in self.frames:
+                    self._check_frame_range(frame)
+
+                return make_zip_stream_response(self._iterate_frame_files(frame_provider))
 
             elif self.type == 'context_image':
                 self._check_frame_range(self.number)
@@ -689,8 +752,9 @@ class DataChunkGetter:
 
 
 class JobDataGetter(DataChunkGetter):
-    def __init__(self, job: Job, data_type, data_num, data_quality):
-        super().__init__(data_type, data_num, data_quality, task_dim=job.segment.task.dimension)
+    def __init__(self, job: Job, data_type, data_num, data_quality, data_frames=None):
+        super().__init__(data_type, data_num, data_quality, task_dim=job.segment.task.dimension,
+            data_frames=data_frames)
         self.job = job
 
     def _check_frame_range(self, frame: int):
@@ -715,12 +779,14 @@ class JobDataGetter(DataChunkGetter):
                 buf, mime = cache.get_selective_job_chunk_data_with_mime(
                     chunk_number=self.number, quality=self.quality, job=self.job
                 )
+                cache.prewarm_selective_job_chunks(self.job, self.quality, self.number,
+                    start_chunk=start_chunk, stop_chunk=stop_chunk)
             else:
                 buf, mime = cache.prepare_selective_job_chunk(
                     chunk_number=self.number, quality=self.quality, db_job=self.job
                 )
 
-            return HttpResponse(buf.getvalue(), content_type=mime)
+            return make_buffer_response(request, buf, mime)
 
         else:
             return super().__call__(request, start, stop, db_data)
@@ -1181,13 +1247,18 @@ class TaskViewSet(viewsets.GenericViewSet, mixins.ListModelMixin,
         summary='Get data of a task',
         parameters=[
             OpenApiParameter('type', location=OpenApiParameter.QUERY, required=False,
-                type=OpenApiTypes.STR, enum=['chunk', 'frame', 'context_image'],
+                type=OpenApiTypes.STR, enum=['chunk', 'frame', 'frames', 'context_image'],
                 description='Specifies the type of the requested data'),
             OpenApiParameter('quality', location=OpenApiParameter.QUERY, required=False,
                 type=OpenApiTypes.STR, enum=['compressed', 'original'],
                 description="Specifies the quality level of the requested data"),
             OpenApiParameter('number', location=OpenApiParameter.QUERY, required=False, type=OpenApiTypes.INT,
                 description="A unique number value identifying chunk or frame"),
+            OpenApiParameter('frames', location=OpenApiParameter.QUERY, required=False, type=OpenApiTypes.STR,
+                description=textwrap.dedent("""\
+                    Frame numbers and inclusive frame ranges for the "frames" data type,
+                    e.g. "1,5,10-20". The frames are returned as a zip archive
+                """)),
         ],
         responses={
             '200': OpenApiResponse(description='Data of a specific type'),
@@ -1220,9 +1291,10 @@ class TaskViewSet(viewsets.GenericViewSet, mixins.ListModelMixin,
             data_type = request.query_params.get('type', None)
             data_num = request.query_params.get('number', None)
             data_quality = request.query_params.get('quality', 'compressed')
+            data_frames = request.query_params.get('frames', None)
 
             data_getter = DataChunkGetter(data_type, data_num, data_quality,
-                self._object.dimension)
+                self._object.dimension, data_frames=data_frames)
 
             return data_getter(request, self._object.data.start_frame,
                 self._object.data.stop_frame, self._object.data)
@@ -1384,7 +1456,10 @@ class TaskViewSet(viewsets.GenericViewSet, mixins.ListModelMixin,
             return Response(status=status.HTTP_204_NO_CONTENT)
         elif request.method == 'PATCH':
             action = self.request.query_params.get("action", None)
-            if action not in dm.task.PatchAction.values():
+            if (
+                action not in dm.task.PatchAction.values() or
+                action == dm.task.PatchAction.DELTA
+            ):
                 raise serializers.ValidationError(
                     "Please specify a correct 'action' for the request")
             serializer = LabeledDataSerializer(data=request.data)
@@ -1671,6 +1746,8 @@ class JobViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixins.CreateMo
         description=textwrap.dedent("""\
             If format is specified, a ZIP archive will be returned. Otherwise,
             the annotations will be returned as a JSON document.
+            The JSON document has an ETag, which can be sent in the If-None-Match header
+            to get 304 if the annotations have not been changed.
         """),
         parameters=[
             OpenApiParameter('format', location=OpenApiParameter.QUERY,
@@ -1698,6 +1775,7 @@ class JobViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixins.CreateMo
             ), description='Download of file started'),
             '201': OpenApiResponse(description='Output file is ready for downloading'),
             '202': OpenApiResponse(description='Exporting has been started'),
+            '304': OpenApiResponse(description='The annotations have not been changed'),
             '405': OpenApiResponse(description='Format is not available'),
         })
     @extend_schema(methods=['POST'],
@@ -1763,13 +1841,20 @@ class JobViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixins.CreateMo
             '405': OpenApiResponse(description='Format is not available'),
         })
     @extend_schema(methods=['PATCH'], summary='Update job annotations',
+        description=textwrap.dedent("""
+            With action=delta, only the changed annotations are sent: objects with ids
+            replace the existing ones, objects without ids are created, and ids in "deleted"
+            are removed. The "version" field must contain the annotations version received
+            from the server last time, otherwise the request is rejected with 409.
+        """),
         parameters=[
             OpenApiParameter('action', location=OpenApiParameter.QUERY, type=OpenApiTypes.STR,
-                required=True, enum=['create', 'update', 'delete'])
+                required=True, enum=['create', 'update', 'delete', 'delta'])
         ],
         request=LabeledDataSerializer,
         responses={
             '200': OpenApiResponse(description='Annotations successfully uploaded'),
+            '409': OpenApiResponse(description='The annotations version is outdated'),
         })
     @extend_schema(methods=['DELETE'], summary='Delete job annotations',
         responses={
@@ -1780,6 +1865,19 @@ class JobViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixins.CreateMo
     def annotations(self, request, pk):
         self._object = self.get_object() # force call of check_object_permissions()
         if request.method == 'GET':
+            if (
+                not request.query_params.get('format', '') and
+                isinstance(request.accepted_renderer, JSONRenderer)
+            ):
+                known_etags = [
+                    etag.removeprefix('W/')
+                    for etag in parse_etags(request.headers.get('If-None-Match', ''))
+                ]
+                etag, payload = dm.task.get_job_data_payload(pk, known_etags=known_etags)
+                if payload is None:
+                    return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+                return PrerenderedResponse(payload, headers={'ETag': etag})
+
             return self.export_annotations(
                 request=request,
                 db_obj=self._object.segment.task,
@@ -1836,6 +1934,8 @@ class JobViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixins.CreateMo
             if serializer.is_valid(raise_exception=True):
                 try:
                     data = dm.task.patch_job_data(pk, serializer.data, action)
+                except dm.task.StaleAnnotationsVersionError as e:
+                    return Response(data=str(e), status=status.HTTP_409_CONFLICT)
                 except (AttributeError, IntegrityError) as e:
                     return Response(data=str(e), status=status.HTTP_400_BAD_REQUEST)
                 return Response(data)
@@ -1888,12 +1988,17 @@ class JobViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixins.CreateMo
         parameters=[
             OpenApiParameter('type', description='Specifies the type of the requested data',
                 location=OpenApiParameter.QUERY, required=False, type=OpenApiTypes.STR,
-                enum=['chunk', 'frame', 'context_image']),
+                enum=['chunk', 'frame', 'frames', 'context_image']),
             OpenApiParameter('quality', location=OpenApiParameter.QUERY, required=False,
                 type=OpenApiTypes.STR, enum=['compressed', 'original'],
                 description="Specifies the quality level of the requested data"),
             OpenApiParameter('number', location=OpenApiParameter.QUERY, required=False, type=OpenApiTypes.INT,
                 description="A unique number value identifying chunk or frame"),
+            OpenApiParameter('frames', location=OpenApiParameter.QUERY, required=False, type=OpenApiTypes.STR,
+                description=textwrap.dedent("""\
+                    Frame numbers and inclusive frame ranges for the "frames" data type,
+                    e.g. "1,5,10-20". The frames are returned as a zip archive
+                """)),
             ],
         responses={
             '200': OpenApiResponse(OpenApiTypes.BINARY, description='Data of a specific type'),
@@ -1906,8 +2011,10 @@ class JobViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixins.CreateMo
         data_type = request.query_params.get('type', None)
         data_num = request.query_params.get('number', None)
         data_quality = request.query_params.get('quality', 'compressed')
+        data_frames = request.query_params.get('frames', None)
 
-        data_getter = JobDataGetter(db_job, data_type, data_num, data_quality)
+        data_getter = JobDataGetter(db_job, data_type, data_num, data_quality,
+            data_frames=data_frames)
 
         return data_getter(request, db_job.segment.start_frame,
             db_job.segment.stop_frame, db_job.segment.task.data)
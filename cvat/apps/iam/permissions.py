@@ -5,24 +5,33 @@
 
 from __future__ import annotations
 
+import hashlib
 import importlib
+import json
 import operator
+import threading
+import time
 from abc import ABCMeta, abstractmethod
+from collections import OrderedDict
 from enum import Enum
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Sequence, TypeVar
+from typing import Any, Dict, List, Optional, Sequence, Tuple, TypeVar
 
+import requests
 from attrs import define, field
 from django.apps import AppConfig
 from django.conf import settings
 from django.db.models import Q, Model
 from rest_framework.permissions import BasePermission
 
+from cvat.apps.engine.log import ServerLogManager
 from cvat.apps.organizations.models import Membership, Organization
 from cvat.utils.http import make_requests_session
 
 from .utils import add_opa_rules_path
 
+slogger = ServerLogManager(__name__)
+
 class StrEnum(str, Enum):
     def __str__(self) -> str:
         return self.value
@@ -84,6 +93,137 @@ def get_iam_context(request, obj) -> Dict[str, Any]:
     return build_iam_context(request, organization, membership)
 
 
+@define
+class OpaDecisionStats:
+    requests: int = 0
+    cache_hits: int = 0
+    total_latency: float = 0 # seconds, for the requests sent to OPA
+    max_latency: float = 0
+
+    @property
+    def cache_hit_rate(self) -> float:
+        return self.cache_hits / self.requests if self.requests else 0
+
+    @property
+    def mean_latency(self) -> float:
+        opa_requests = self.requests - self.cache_hits
+        return self.total_latency / opa_requests if opa_requests else 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'requests': self.requests,
+            'cache_hits': self.cache_hits,
+            'cache_hit_rate': self.cache_hit_rate,
+            'mean_latency': self.mean_latency,
+            'max_latency': self.max_latency,
+        }
+
+class _OpaDecisionCache:
+    """
+    A per-process cache of OPA decisions with a short TTL. The OPA input contains
+    everything the decision depends on, so the key is the normalized input.
+    The cache is also cleared on membership and organization ownership changes.
+    """
+
+    def __init__(self, *, ttl: float, max_size: int):
+        self._ttl = ttl
+        self._max_size = max_size
+        self._items: OrderedDict[str, Tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = OpaDecisionStats()
+
+    @staticmethod
+    def make_key(url: str, payload: Dict[str, Any]) -> str:
+        normalized_payload = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha1(f"{url}\n{normalized_payload}".encode()).hexdigest()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            self.stats.requests += 1
+
+            item = self._items.get(key)
+            if item is None:
+                return False, None
+
+            expires_at, result = item
+            if expires_at < time.monotonic():
+                del self._items[key]
+                return False, None
+
+            self._items.move_to_end(key)
+            self.stats.cache_hits += 1
+            return True, result
+
+    def set(self, key: str, result: Any):
+        if not self._ttl:
+            return
+
+        with self._lock:
+            self._items[key] = (time.monotonic() + self._ttl, result)
+            self._items.move_to_end(key)
+
+            evicted_count = 0
+            while self._max_size < len(self._items):
+                self._items.popitem(last=False)
+                evicted_count += 1
+
+            if evicted_count:
+                slogger.glob.info(
+                    f'Evicted {evicted_count} items from the OPA decision cache, '
+                    f'cache stats: {self.stats.to_dict()}'
+                )
+
+    def report_latency(self, latency: float):
+        with self._lock:
+            self.stats.total_latency += latency
+            self.stats.max_latency = max(self.stats.max_latency, latency)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+_opa_decision_cache: Optional[_OpaDecisionCache] = None
+_opa_sessions = threading.local()
+
+def _get_opa_decision_cache() -> _OpaDecisionCache:
+    global _opa_decision_cache # pylint: disable=global-statement
+    if _opa_decision_cache is None:
+        _opa_decision_cache = _OpaDecisionCache(
+            ttl=settings.IAM_OPA_DECISION_CACHE_TTL,
+            max_size=settings.IAM_OPA_DECISION_CACHE_SIZE,
+        )
+
+    return _opa_decision_cache
+
+def _get_opa_session() -> requests.Session:
+    # The session keeps the connections to OPA alive between the requests.
+    # A session is not guaranteed to be thread-safe, so there is one per thread.
+    session = getattr(_opa_sessions, 'session', None)
+    if session is None:
+        session = make_requests_session()
+        _opa_sessions.session = session
+
+    return session
+
+def invalidate_opa_decisions():
+    _get_opa_decision_cache().clear()
+
+def request_opa_decision(url: str, payload: Dict[str, Any]) -> Any:
+    cache = _get_opa_decision_cache()
+    key = cache.make_key(url, payload)
+
+    found, result = cache.get(key)
+    if found:
+        return result
+
+    start_time = time.perf_counter()
+    response = _get_opa_session().post(url, json=payload)
+    result = response.json()['result']
+    cache.report_latency(time.perf_counter() - start_time)
+
+    cache.set(key, result)
+    return result
+
 class OpenPolicyAgentPermission(metaclass=ABCMeta):
     url: str
     user_id: int
@@ -147,9 +287,7 @@ class OpenPolicyAgentPermission(metaclass=ABCMeta):
         return None
 
     def check_access(self) -> PermissionResult:
-        with make_requests_session() as session:
-            response = session.post(self.url, json=self.payload)
-            output = response.json()['result']
+        output = request_opa_decision(self.url, self.payload)
 
         allow = False
         reasons = []
@@ -166,8 +304,7 @@ class OpenPolicyAgentPermission(metaclass=ABCMeta):
     def filter(self, queryset):
         url = self.url.replace('/allow', '/filter')
 
-        with make_requests_session() as session:
-            r = session.post(url, json=self.payload).json()['result']
+        r = request_opa_decision(url, self.payload)
 
         q_objects = []
         ops_dict = {
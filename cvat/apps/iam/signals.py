@@ -4,7 +4,7 @@
 
 from django.conf import settings
 from django.contrib.auth.models import User, Group
-from django.db.models.signals import post_save, post_migrate
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save
 
 
 def register_groups(sender, **kwargs):
@@ -51,8 +51,20 @@ elif settings.IAM_TYPE == 'LDAP':
         user.groups.set(user_groups)
 
 
+def clear_opa_decision_cache(sender, **kwargs):
+    from .permissions import invalidate_opa_decisions
+    invalidate_opa_decisions()
+
 def register_signals(app_config):
+    from cvat.apps.organizations.models import Membership, Organization
+
     post_migrate.connect(register_groups, app_config)
+
+    # Cached OPA decisions can depend on memberships, organization owners and user groups
+    for sender in (Membership, Organization):
+        post_save.connect(clear_opa_decision_cache, sender=sender)
+        post_delete.connect(clear_opa_decision_cache, sender=sender)
+    m2m_changed.connect(clear_opa_decision_cache, sender=User.groups.through)
     if settings.IAM_TYPE == 'BASIC':
         # Add default groups and add admin rights to super users.
         post_save.connect(create_user, sender=User)
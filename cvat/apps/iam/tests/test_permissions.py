@@ -0,0 +1,72 @@
+# Copyright (C) 2024 CVAT.ai Corporation
+#
+# SPDX-License-Identifier: MIT
+
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from cvat.apps.iam import permissions
+from cvat.apps.iam.permissions import _OpaDecisionCache
+
+
+class OpaDecisionCacheTest(SimpleTestCase):
+    def test_key_does_not_depend_on_key_order(self):
+        self.assertEqual(
+            _OpaDecisionCache.make_key('url', {'a': 1, 'b': {'c': 2, 'd': None}}),
+            _OpaDecisionCache.make_key('url', {'b': {'d': None, 'c': 2}, 'a': 1}),
+        )
+        self.assertNotEqual(
+            _OpaDecisionCache.make_key('url', {'a': 1}),
+            _OpaDecisionCache.make_key('url', {'a': 2}),
+        )
+
+    def test_can_expire_decisions(self):
+        cache = _OpaDecisionCache(ttl=10, max_size=10)
+
+        with mock.patch('cvat.apps.iam.permissions.time.monotonic', return_value=100):
+            cache.set('key', True)
+            self.assertEqual(cache.get('key'), (True, True))
+
+        with mock.patch('cvat.apps.iam.permissions.time.monotonic', return_value=111):
+            self.assertEqual(cache.get('key'), (False, None))
+
+        self.assertEqual(cache.stats.requests, 2)
+        self.assertEqual(cache.stats.cache_hits, 1)
+
+    def test_evicts_least_recently_used_decisions(self):
+        cache = _OpaDecisionCache(ttl=10, max_size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), (True, 1))
+        self.assertEqual(cache.get('b'), (False, None))
+        self.assertEqual(cache.get('c'), (True, 3))
+
+    def test_can_disable_cache(self):
+        cache = _OpaDecisionCache(ttl=0, max_size=10)
+        cache.set('key', True)
+
+        self.assertEqual(cache.get('key'), (False, None))
+
+    def test_can_request_decision_once(self):
+        cache = _OpaDecisionCache(ttl=10, max_size=10)
+        session = mock.Mock()
+        session.post.return_value.json.return_value = {'result': {'allow': True}}
+
+        with (
+            mock.patch.object(permissions, '_get_opa_decision_cache', return_value=cache),
+            mock.patch.object(permissions, '_get_opa_session', return_value=session),
+        ):
+            for _ in range(3):
+                result = permissions.request_opa_decision('url', {'input': {'scope': 'view'}})
+                self.assertEqual(result, {'allow': True})
+
+            permissions.invalidate_opa_decisions()
+            permissions.request_opa_decision('url', {'input': {'scope': 'view'}})
+
+        self.assertEqual(session.post.call_count, 2)
+        self.assertEqual(cache.stats.cache_hits, 2)
+        self.assertEqual(cache.stats.requests, 4)
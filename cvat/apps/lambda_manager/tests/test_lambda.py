@@ -4,21 +4,29 @@
 # SPDX-License-Identifier: MIT
 
 from collections import OrderedDict
+from copy import deepcopy
 from itertools import groupby
 from io import BytesIO
 from typing import Dict, Optional
 from unittest import mock, skip
 import json
 import os
+import random
+import threading
+import time
 
 import requests
 from django.contrib.auth.models import Group, User
+from django.core.exceptions import ValidationError
 from django.http import HttpResponseNotFound, HttpResponseServerError
+from django.test import SimpleTestCase
 from PIL import Image
 from rest_framework import status
 from rest_framework.test import APIClient, APITestCase
 
 from cvat.apps.engine.tests.utils import filter_dict, get_paginated_collection
+from cvat.apps.lambda_manager.transport import decode_binary_payload, encode_binary_payload
+from cvat.apps.lambda_manager.views import LambdaFunction, LambdaGateway, _iterate_pipelined
 
 LAMBDA_ROOT_PATH = '/api/lambda'
 LAMBDA_FUNCTIONS_PATH = f'{LAMBDA_ROOT_PATH}/functions'
@@ -1193,6 +1201,15 @@ class TestComplexFrameSetupCases(_LambdaTestCaseBase):
             }
         )
 
+    def test_can_resolve_mapping_once_for_offline_detector_function(self):
+        with mock.patch.object(LambdaFunction, '_resolve_mapping', autospec=True,
+            side_effect=LambdaFunction._resolve_mapping
+        ) as resolve_mapping:
+            data = self.common_request_data.copy()
+            self._run_offline_function(self.detector_function_id, data, self.user)
+
+        self.assertEqual(resolve_mapping.call_count, 1)
+
     def test_can_run_offline_reid_function_on_whole_task(self):
         # Add starting shapes to be tracked on following frames
         requested_frame_range = self.task_rel_frame_range
@@ -1677,3 +1694,183 @@ class Issue4996_Cases(_LambdaTestCaseBase):
             response = self._post_request(self.function_url, self.user, data,
                 org_id=self.org['id'])
             self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+
+class PipelinedInvocationTest(SimpleTestCase):
+    def test_can_keep_item_order(self):
+        def call(value):
+            time.sleep(random.uniform(0, 0.01))
+            return value * 2
+
+        results = list(_iterate_pipelined(range(50),
+            prepare=lambda item: item + 1, call=call, prefetch_size=4, concurrency=8))
+
+        self.assertEqual(results, [(item, (item + 1) * 2) for item in range(50)])
+
+    def test_can_limit_concurrent_calls(self):
+        lock = threading.Lock()
+        active_calls = 0
+        max_active_calls = 0
+
+        def call(value):
+            nonlocal active_calls, max_active_calls
+            with lock:
+                active_calls += 1
+                max_active_calls = max(max_active_calls, active_calls)
+            time.sleep(0.005)
+            with lock:
+                active_calls -= 1
+            return value
+
+        list(_iterate_pipelined(range(30),
+            prepare=lambda item: item, call=call, prefetch_size=2, concurrency=3))
+
+        self.assertLessEqual(max_active_calls, 3)
+
+    def test_can_raise_preparation_errors(self):
+        def prepare(item):
+            if item == 5:
+                raise ValueError("can't prepare")
+            return item
+
+        with self.assertRaises(ValueError):
+            list(_iterate_pipelined(range(10),
+                prepare=prepare, call=lambda value: value, prefetch_size=2, concurrency=2))
+
+    def test_can_raise_call_errors(self):
+        def call(value):
+            if value == 5:
+                raise ValueError("can't call")
+            return value
+
+        with self.assertRaises(ValueError):
+            list(_iterate_pipelined(range(10),
+                prepare=lambda item: item, call=call, prefetch_size=2, concurrency=2))
+
+    def test_can_stop_early(self):
+        prepared_items = []
+
+        def prepare(item):
+            prepared_items.append(item)
+            return item
+
+        results = _iterate_pipelined(range(1000),
+            prepare=prepare, call=lambda value: value, prefetch_size=2, concurrency=2)
+        for item, _ in results:
+            if item == 3:
+                break
+        results.close()
+
+        self.assertLess(len(prepared_items), 1000)
+
+
+class _StubDetectorGateway:
+    """
+    A local stand-in for a deployed detector. Each call costs a fixed latency
+    plus a per-input cost, which resembles a GPU-backed model. Can be used to
+    benchmark batched invocations without real hardware.
+    """
+
+    def __init__(self, *, call_latency=0.0, input_latency=0.0, supports_batches=True):
+        self.call_latency = call_latency
+        self.input_latency = input_latency
+        self.supports_batches = supports_batches
+        self.calls = []
+
+    def _detect(self, payload):
+        return [{"label": "car", "type": "rectangle", "points": [0, 0, 1, payload["image"]]}]
+
+    def invoke(self, func, payload):
+        self.calls.append(payload)
+
+        inputs = payload["batch"] if "batch" in payload else [payload]
+        time.sleep(self.call_latency + self.input_latency * len(inputs))
+
+        if "batch" in payload:
+            assert self.supports_batches
+            return [self._detect(item) for item in payload["batch"]]
+
+        return self._detect(payload)
+
+
+class BatchedInvocationTest(SimpleTestCase):
+    def _make_function(self, gateway, *, max_batch_size=None):
+        data = deepcopy(functions["positive"][id_function_detector])
+        if max_batch_size:
+            data["metadata"]["annotations"]["max_batch_size"] = str(max_batch_size)
+
+        return LambdaFunction(gateway, data)
+
+    def test_can_call_function_in_batches(self):
+        gateway = _StubDetectorGateway()
+        function = self._make_function(gateway, max_batch_size=4)
+
+        responses = function._call_batch([{"image": i} for i in range(10)])
+
+        self.assertEqual([len(call["batch"]) for call in gateway.calls], [4, 4, 2])
+        self.assertEqual([response[0]["points"][-1] for response in responses], list(range(10)))
+
+    def test_can_call_function_without_batch_support(self):
+        gateway = _StubDetectorGateway(supports_batches=False)
+        function = self._make_function(gateway)
+
+        responses = function._call_batch([{"image": i} for i in range(3)])
+
+        self.assertEqual(len(gateway.calls), 3)
+        self.assertFalse(any("batch" in call for call in gateway.calls))
+        self.assertEqual([response[0]["points"][-1] for response in responses], [0, 1, 2])
+
+    def test_cannot_accept_wrong_number_of_batch_results(self):
+        gateway = _StubDetectorGateway()
+        gateway.invoke = lambda func, payload: []
+        function = self._make_function(gateway, max_batch_size=4)
+
+        with self.assertRaises(ValidationError):
+            function._call_batch([{"image": i} for i in range(3)])
+
+    def test_batched_calls_have_higher_throughput(self):
+        payloads = [{"image": i} for i in range(32)]
+
+        def measure(max_batch_size):
+            gateway = _StubDetectorGateway(call_latency=0.01, input_latency=0.001)
+            function = self._make_function(gateway, max_batch_size=max_batch_size)
+
+            start = time.perf_counter()
+            function._call_batch(payloads)
+            return time.perf_counter() - start
+
+        self.assertLess(measure(max_batch_size=16), measure(max_batch_size=None))
+
+
+class BinaryTransportTest(SimpleTestCase):
+    def test_can_encode_and_decode_payload(self):
+        payload = {
+            "batch": [
+                {"image": b"\x00\x01image", "threshold": 0.5},
+                {"image": b"", "boxes0": [[1, 2, 3, 4]]},
+            ],
+            "max_distance": 10,
+        }
+
+        self.assertEqual(decode_binary_payload(encode_binary_payload(payload)), payload)
+
+    def test_cannot_decode_unknown_format(self):
+        with self.assertRaises(ValueError):
+            decode_binary_payload(b'{"image": ""}')
+
+    def test_can_send_binary_payload_for_binary_transport_function(self):
+        data = deepcopy(functions["positive"][id_function_detector])
+        data["metadata"]["annotations"]["transport"] = "binary"
+        function = LambdaFunction(LambdaGateway(), data)
+
+        body = LambdaGateway._encode_payload(function, {"image": b"image"})
+
+        self.assertEqual(decode_binary_payload(body), {"image": b"image"})
+
+    def test_can_send_json_payload_by_default(self):
+        function = LambdaFunction(LambdaGateway(), functions["positive"][id_function_detector])
+
+        body = LambdaGateway._encode_payload(function, {"image": "aW1hZ2U="})
+
+        self.assertEqual(body, {"image": "aW1hZ2U="})
@@ -0,0 +1,67 @@
+# Copyright (C) 2024 CVAT.ai Corporation
+#
+# SPDX-License-Identifier: MIT
+
+"""
+The binary request format for serverless functions.
+
+The request body is laid out as:
+    MAGIC | header size (uint32, big-endian) | header | blobs
+
+The header is a UTF-8 JSON document with the request payload, where each bytes
+value is replaced with {"$blob": [offset, size]} pointing into the blob section.
+This allows sending images as is, without base64 encoding.
+"""
+
+import json
+import struct
+from typing import Any, List
+
+MAGIC = b'CVLB'
+CONTENT_TYPE = 'application/octet-stream'
+
+_HEADER_SIZE = struct.Struct('>I')
+_BLOB_KEY = '$blob'
+
+def encode_binary_payload(payload: Any) -> bytes:
+    blobs: List[bytes] = []
+    blobs_size = 0
+
+    def _replace_blobs(value):
+        nonlocal blobs_size
+
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            blob = bytes(value)
+            blobs.append(blob)
+            blobs_size += len(blob)
+            return {_BLOB_KEY: [blobs_size - len(blob), len(blob)]}
+        elif isinstance(value, dict):
+            return {k: _replace_blobs(v) for k, v in value.items()}
+        elif isinstance(value, (list, tuple)):
+            return [_replace_blobs(v) for v in value]
+        else:
+            return value
+
+    header = json.dumps(_replace_blobs(payload)).encode('utf-8')
+    return b''.join([MAGIC, _HEADER_SIZE.pack(len(header)), header, *blobs])
+
+def decode_binary_payload(body: bytes) -> Any:
+    if body[:len(MAGIC)] != MAGIC:
+        raise ValueError("The body is not a binary payload")
+
+    header_start = len(MAGIC) + _HEADER_SIZE.size
+    header_size, = _HEADER_SIZE.unpack_from(body, len(MAGIC))
+    blobs = memoryview(body)[header_start + header_size:]
+
+    def _restore_blobs(value):
+        if isinstance(value, dict):
+            if value.keys() == {_BLOB_KEY}:
+                offset, size = value[_BLOB_KEY]
+                return bytes(blobs[offset : offset + size])
+            return {k: _restore_blobs(v) for k, v in value.items()}
+        elif isinstance(value, list):
+            return [_restore_blobs(v) for v in value]
+        else:
+            return value
+
+    return _restore_blobs(json.loads(body[header_start : header_start + header_size]))
@@ -8,12 +8,17 @@ from __future__ import annotations
 import base64
 import json
 import os
+import queue
 import textwrap
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
 from copy import deepcopy
 from datetime import timedelta
 from enum import Enum
 from functools import wraps
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
 
 import datumaro.util.mask_tools as mask_tools
 import django_rq
@@ -22,6 +27,7 @@ import requests
 import rq
 from cvat.apps.lambda_manager.signals import interactive_function_call_signal
 from django.conf import settings
+from django import db
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import (OpenApiParameter, OpenApiResponse,
@@ -39,11 +45,17 @@ from cvat.apps.lambda_manager.permissions import LambdaPermission
 from cvat.apps.lambda_manager.serializers import (
     FunctionCallRequestSerializer, FunctionCallSerializer
 )
+from cvat.apps.lambda_manager.transport import (
+    CONTENT_TYPE as BINARY_PAYLOAD_CONTENT_TYPE, encode_binary_payload
+)
 from cvat.apps.engine.utils import define_dependent_job, get_rq_job_meta, get_rq_lock_by_user
 from cvat.utils.http import make_requests_session
 from cvat.apps.iam.filters import ORGANIZATION_OPEN_API_PARAMETERS
 
 
+_T = TypeVar('_T')
+_R = TypeVar('_R')
+
 class LambdaType(Enum):
     DETECTOR = "detector"
     INTERACTOR = "interactor"
@@ -54,9 +66,43 @@ class LambdaType(Enum):
     def __str__(self):
         return self.value
 
+class LambdaTransport(Enum):
+    JSON = "json"
+    BINARY = "binary"
+
+    def __str__(self):
+        return self.value
+
 class LambdaGateway:
     NUCLIO_ROOT_URL = '/api/functions'
 
+    # Sessions keep the connections alive between the calls.
+    # A session is not guaranteed to be thread-safe, so there is one per thread.
+    _sessions = threading.local()
+
+    @classmethod
+    def _get_session(cls) -> requests.Session:
+        session = getattr(cls._sessions, 'session', None)
+        if session is None:
+            session = make_requests_session()
+            cls._sessions.session = session
+
+        return session
+
+    @staticmethod
+    def _encode_payload(func, payload):
+        if func.transport == LambdaTransport.BINARY:
+            return encode_binary_payload(payload)
+
+        return payload
+
+    @staticmethod
+    def _make_request_body(data) -> Dict[str, Any]:
+        if isinstance(data, bytes):
+            return {'data': data, 'headers': {'Content-Type': BINARY_PAYLOAD_CONTENT_TYPE}}
+
+        return {'json': data}
+
     def _http(self, method="get", scheme=None, host=None, port=None,
         function_namespace=None, url=None, headers=None, data=None):
         NUCLIO_GATEWAY = '{}://{}:{}'.format(
@@ -79,11 +125,13 @@ class LambdaGateway:
         else:
             url = NUCLIO_GATEWAY
 
-        with make_requests_session() as session:
-            reply = session.request(method, url, headers=extra_headers,
-                timeout=NUCLIO_TIMEOUT, json=data)
-            reply.raise_for_status()
-            response = reply.json()
+        body = self._make_request_body(data)
+        extra_headers.update(body.pop('headers', {}))
+
+        reply = self._get_session().request(method, url, headers=extra_headers,
+            timeout=NUCLIO_TIMEOUT, **body)
+        reply.raise_for_status()
+        response = reply.json()
 
         return response
 
@@ -107,7 +155,7 @@ class LambdaGateway:
 
     def _invoke_via_dashboard(self, func, payload):
         return self._http(method="post", url='/api/function_invocations',
-            data=payload, headers={
+            data=self._encode_payload(func, payload), headers={
                 'x-nuclio-function-name': func.id,
                 'x-nuclio-path': '/'
             })
@@ -120,13 +168,82 @@ class LambdaGateway:
         else:
             url = f'http://localhost:{func.port}'
 
-        with make_requests_session() as session:
-            reply = session.post(url, timeout=NUCLIO_TIMEOUT, json=payload)
-            reply.raise_for_status()
-            response = reply.json()
+        reply = self._get_session().post(url, timeout=NUCLIO_TIMEOUT,
+            **self._make_request_body(self._encode_payload(func, payload)))
+        reply.raise_for_status()
+        response = reply.json()
 
         return response
 
+def _iterate_pipelined(
+    items: Iterable[_T],
+    *,
+    prepare: Callable[[_T], Any],
+    call: Callable[[Any], _R],
+    prefetch_size: int,
+    concurrency: int,
+) -> Iterator[Tuple[_T, _R]]:
+    """
+    Prepares the items in a background thread, keeping up to `prefetch_size`
+    prepared items in a queue, and runs up to `concurrency` calls at the same time.
+    Yields (item, call result) pairs in the order of the input items.
+    """
+
+    prepared_items = queue.Queue(maxsize=max(1, prefetch_size))
+    stop_event = threading.Event()
+    end_marker = object()
+
+    def put(value) -> bool:
+        while not stop_event.is_set():
+            try:
+                prepared_items.put(value, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+
+        return False
+
+    def prepare_items():
+        try:
+            for item in items:
+                if not put((item, prepare(item), None)):
+                    return
+
+            put((end_marker, None, None))
+        except Exception as ex:
+            put((end_marker, None, ex))
+        finally:
+            # the items can be prepared using the DB, the connections are per-thread
+            db.connections.close_all()
+
+    producer = threading.Thread(target=prepare_items, daemon=True)
+    in_flight = deque()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        producer.start()
+
+        try:
+            while True:
+                item, prepared_item, error = prepared_items.get()
+                if error is not None:
+                    raise error
+                elif item is end_marker:
+                    break
+
+                in_flight.append((item, executor.submit(call, prepared_item)))
+                if len(in_flight) >= concurrency:
+                    item, future = in_flight.popleft()
+                    yield item, future.result()
+
+            while in_flight:
+                item, future = in_flight.popleft()
+                yield item, future.result()
+        finally:
+            stop_event.set()
+            for _, future in in_flight:
+                future.cancel()
+            producer.join()
+
 class LambdaFunction:
     def __init__(self, gateway, data):
         # ID of the function (e.g. omz.public.yolo-v3)
@@ -138,6 +255,11 @@ class LambdaFunction:
             self.kind = LambdaType(kind)
         except ValueError:
             self.kind = LambdaType.UNKNOWN
+        # the request format, images are sent as raw bytes in the binary one
+        try:
+            self.transport = LambdaTransport(meta_anno.get('transport', 'json'))
+        except ValueError:
+            self.transport = LambdaTransport.JSON
         # dictionary of labels for the function (e.g. car, person)
         spec = json.loads(meta_anno.get('spec') or '[]')
 
@@ -201,6 +323,12 @@ class LambdaFunction:
         self.animated_gif = meta_anno.get('animated_gif', '')
         self.version = int(meta_anno.get('version', '1'))
         self.help_message = meta_anno.get('help_message', '')
+        # number of concurrent invocations allowed in the pipelined mode
+        self.concurrency = max(1, int(
+            meta_anno.get('concurrency', settings.NUCLIO['INVOCATION_CONCURRENCY'])
+        ))
+        # the max number of inputs the function accepts in a single batched call
+        self.max_batch_size = max(1, int(meta_anno.get('max_batch_size', 1)))
         self.gateway = gateway
 
     def to_dict(self):
@@ -244,6 +372,61 @@ class LambdaFunction:
         is_interactive: Optional[bool] = False,
         request: Optional[Request] = None
     ):
+        payload, mapping = self._prepare_invocation(db_task, data, db_job=db_job)
+
+        if is_interactive and request:
+            interactive_function_call_signal.send(sender=self, request=request)
+
+        response = self.gateway.invoke(self, payload)
+
+        return self._transform_response(response, mapping)
+
+    def invoke_batch(
+        self,
+        db_task: Task,
+        data: List[Dict[str, Any]],
+        *,
+        db_job: Optional[Job] = None,
+    ) -> List[Any]:
+        """
+        Invokes the function on several inputs. If the function supports batching,
+        the inputs are sent in batches of up to `max_batch_size` items.
+        """
+
+        invocations = [self._prepare_invocation(db_task, item, db_job=db_job) for item in data]
+        responses = self._call_batch([payload for payload, _ in invocations])
+
+        return [
+            self._transform_response(response, mapping)
+            for response, (_, mapping) in zip(responses, invocations)
+        ]
+
+    def _call_batch(self, payloads: List[Dict[str, Any]]) -> List[Any]:
+        if self.max_batch_size == 1:
+            return [self.gateway.invoke(self, payload) for payload in payloads]
+
+        responses = []
+        for batch_start in range(0, len(payloads), self.max_batch_size):
+            batch = payloads[batch_start : batch_start + self.max_batch_size]
+            batch_responses = self.gateway.invoke(self, {"batch": batch})
+
+            if not isinstance(batch_responses, list) or len(batch_responses) != len(batch):
+                raise ValidationError(
+                    '`{}` lambda function returned a wrong number of results '
+                    'for a batch of {} inputs'.format(self.id, len(batch)),
+                    code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+            responses.extend(batch_responses)
+
+        return responses
+
+    def _prepare_invocation(
+        self,
+        db_task: Task,
+        data: Dict[str, Any],
+        *,
+        db_job: Optional[Job] = None,
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         if db_job is not None and db_job.get_task_id() != db_task.id:
             raise ValidationError("Job task id does not match task id",
                 code=status.HTTP_400_BAD_REQUEST
@@ -265,8 +448,72 @@ class LambdaFunction:
         if threshold:
             payload.update({ "threshold": threshold })
         quality = data.get("quality")
-        mapping = data.get("mapping", {})
+        mapping = self._resolve_mapping(db_task, data.get("mapping"))
+
+        # Check job frame boundaries
+        if db_job:
+            task_data = db_task.data
+            data_start_frame = task_data.start_frame
+            step = task_data.get_frame_step()
+
+            for key, desc in (
+                ('frame', 'frame'),
+                ('frame0', 'start frame'),
+                ('frame1', 'end frame'),
+            ):
+                if key not in data:
+                    continue
+
+                abs_frame_id = data_start_frame + data[key] * step
+                if not db_job.segment.contains_frame(abs_frame_id):
+                    raise ValidationError(f"The {desc} is outside the job range",
+                        code=status.HTTP_400_BAD_REQUEST)
+
 
+        if self.kind == LambdaType.DETECTOR:
+            payload.update({
+                "image": self._get_image(db_task, mandatory_arg("frame"), quality)
+            })
+        elif self.kind == LambdaType.INTERACTOR:
+            payload.update({
+                "image": self._get_image(db_task, mandatory_arg("frame"), quality),
+                "pos_points": mandatory_arg("pos_points")[2:] if self.startswith_box else mandatory_arg("pos_points"),
+                "neg_points": mandatory_arg("neg_points"),
+                "obj_bbox": mandatory_arg("pos_points")[0:2] if self.startswith_box else None
+            })
+        elif self.kind == LambdaType.REID:
+            payload.update({
+                "image0": self._get_image(db_task, mandatory_arg("frame0"), quality),
+                "image1": self._get_image(db_task, mandatory_arg("frame1"), quality),
+                "boxes0": mandatory_arg("boxes0"),
+                "boxes1": mandatory_arg("boxes1")
+            })
+            max_distance = data.get("max_distance")
+            if max_distance:
+                payload.update({
+                    "max_distance": max_distance
+                })
+        elif self.kind == LambdaType.TRACKER:
+            payload.update({
+                "image": self._get_image(db_task, mandatory_arg("frame"), quality),
+                "shapes": data.get("shapes", []),
+                "states": data.get("states", [])
+            })
+        else:
+            raise ValidationError(
+                '`{}` lambda function has incorrect type: {}'
+                .format(self.id, self.kind),
+                code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return payload, mapping
+
+    def _transform_response(self, response, mapping: Dict[str, Any]):
+        if self.kind == LambdaType.DETECTOR:
+            response = self._transform_detections(response, mapping)
+
+        return response
+
+    def _resolve_mapping(self, db_task: Task, mapping: Optional[Dict[str, Any]]) -> Dict[str, Any]:
         model_labels = self.labels
         task_labels = db_task.get_labels().prefetch_related('attributespec_set')
 
@@ -371,66 +618,9 @@ class LambdaFunction:
 
         mapping = update_mapping(mapping, self.labels, task_labels)
 
-        # Check job frame boundaries
-        if db_job:
-            task_data = db_task.data
-            data_start_frame = task_data.start_frame
-            step = task_data.get_frame_step()
-
-            for key, desc in (
-                ('frame', 'frame'),
-                ('frame0', 'start frame'),
-                ('frame1', 'end frame'),
-            ):
-                if key not in data:
-                    continue
-
-                abs_frame_id = data_start_frame + data[key] * step
-                if not db_job.segment.contains_frame(abs_frame_id):
-                    raise ValidationError(f"The {desc} is outside the job range",
-                        code=status.HTTP_400_BAD_REQUEST)
-
-
-        if self.kind == LambdaType.DETECTOR:
-            payload.update({
-                "image": self._get_image(db_task, mandatory_arg("frame"), quality)
-            })
-        elif self.kind == LambdaType.INTERACTOR:
-            payload.update({
-                "image": self._get_image(db_task, mandatory_arg("frame"), quality),
-                "pos_points": mandatory_arg("pos_points")[2:] if self.startswith_box else mandatory_arg("pos_points"),
-                "neg_points": mandatory_arg("neg_points"),
-                "obj_bbox": mandatory_arg("pos_points")[0:2] if self.startswith_box else None
-            })
-        elif self.kind == LambdaType.REID:
-            payload.update({
-                "image0": self._get_image(db_task, mandatory_arg("frame0"), quality),
-                "image1": self._get_image(db_task, mandatory_arg("frame1"), quality),
-                "boxes0": mandatory_arg("boxes0"),
-                "boxes1": mandatory_arg("boxes1")
-            })
-            max_distance = data.get("max_distance")
-            if max_distance:
-                payload.update({
-                    "max_distance": max_distance
-                })
-        elif self.kind == LambdaType.TRACKER:
-            payload.update({
-                "image": self._get_image(db_task, mandatory_arg("frame"), quality),
-                "shapes": data.get("shapes", []),
-                "states": data.get("states", [])
-            })
-        else:
-            raise ValidationError(
-                '`{}` lambda function has incorrect type: {}'
-                .format(self.id, self.kind),
-                code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-        if is_interactive and request:
-            interactive_function_call_signal.send(sender=self, request=request)
-
-        response = self.gateway.invoke(self, payload)
+        return mapping
 
+    def _transform_detections(self, response, mapping: Dict[str, Any]):
         response_filtered = []
 
         def check_attr_value(value, db_attr):
@@ -463,37 +653,90 @@ class LambdaFunction:
                     })
             return attributes
 
-        if self.kind == LambdaType.DETECTOR:
-            for item in response:
-                item_label = item['label']
-                if item_label not in mapping:
-                    continue
-                db_label = mapping[item_label]['db_label']
-                item['label'] = db_label.name
-                item['attributes'] = transform_attributes(
-                    item.get('attributes', {}),
-                    mapping[item_label]['attributes'],
-                    db_label.attributespec_set.values()
-                )
+        for item in response:
+            item_label = item['label']
+            if item_label not in mapping:
+                continue
+            db_label = mapping[item_label]['db_label']
+            item['label'] = db_label.name
+            item['attributes'] = transform_attributes(
+                item.get('attributes', {}),
+                mapping[item_label]['attributes'],
+                db_label.attributespec_set.values()
+            )
 
-                if 'elements' in item:
-                    sublabels = mapping[item_label]['sublabels']
-                    item['elements'] = [x for x in item['elements'] if x['label'] in sublabels]
-                    for element in item['elements']:
-                        element_label = element['label']
-                        db_label = sublabels[element_label]['db_label']
-                        element['label'] = db_label.name
-                        element['attributes'] = transform_attributes(
-                            element.get('attributes', {}),
-                            sublabels[element_label]['attributes'],
-                            db_label.attributespec_set.values()
-                        )
-                response_filtered.append(item)
-                response = response_filtered
+            if 'elements' in item:
+                sublabels = mapping[item_label]['sublabels']
+                item['elements'] = [x for x in item['elements'] if x['label'] in sublabels]
+                for element in item['elements']:
+                    element_label = element['label']
+                    db_label = sublabels[element_label]['db_label']
+                    element['label'] = db_label.name
+                    element['attributes'] = transform_attributes(
+                        element.get('attributes', {}),
+                        sublabels[element_label]['attributes'],
+                        db_label.attributespec_set.values()
+                    )
+            response_filtered.append(item)
+            response = response_filtered
 
         return response
 
-    def _get_image(self, db_task, frame, quality):
+    def iterate_detections(
+        self,
+        db_task: Task,
+        frames: Iterable[int],
+        *,
+        quality: Optional[str] = None,
+        threshold: Optional[float] = None,
+        mapping: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+        """
+        Runs the detector on the frames. The label mapping is resolved once for all the frames.
+        If the function allows concurrent or batched calls, the frames are processed
+        in the pipelined mode: they are decoded ahead of time in the background,
+        and up to `concurrency` invocations are in flight at the same time.
+        If the function supports batching, each invocation processes up to
+        `max_batch_size` frames. The results are yielded in the order of the frames.
+        """
+
+        assert self.kind == LambdaType.DETECTOR
+
+        mapping = self._resolve_mapping(db_task, mapping)
+        frame_provider = FrameProvider(db_task.data)
+
+        def make_payload(frame: int) -> Dict[str, Any]:
+            payload = {
+                "image": self._get_image(db_task, frame, quality, frame_provider=frame_provider)
+            }
+            if threshold:
+                payload["threshold"] = threshold
+            return payload
+
+        if self.concurrency == 1 and self.max_batch_size == 1:
+            for frame in frames:
+                response = self.gateway.invoke(self, make_payload(frame))
+                yield frame, self._transform_detections(response, mapping)
+
+            return
+
+        frames = list(frames)
+        frame_batches = [
+            frames[batch_start : batch_start + self.max_batch_size]
+            for batch_start in range(0, len(frames), self.max_batch_size)
+        ]
+
+        with closing(_iterate_pipelined(frame_batches,
+            prepare=lambda frame_batch: [make_payload(frame) for frame in frame_batch],
+            call=self._call_batch,
+            prefetch_size=settings.NUCLIO['FRAME_PREFETCH_SIZE'],
+            concurrency=self.concurrency,
+        )) as batch_responses:
+            for frame_batch, responses in batch_responses:
+                for frame, response in zip(frame_batch, responses):
+                    yield frame, self._transform_detections(response, mapping)
+
+    def _get_image(self, db_task, frame, quality, *, frame_provider: Optional[FrameProvider] = None):
         if quality is None or quality == "original":
             quality = FrameProvider.Quality.ORIGINAL
         elif  quality == "compressed":
@@ -504,9 +747,13 @@ class LambdaFunction:
                 'with wrong arguments (quality={})'.format(quality),
                 code=status.HTTP_400_BAD_REQUEST)
 
-        frame_provider = FrameProvider(db_task.data)
+        if frame_provider is None:
+            frame_provider = FrameProvider(db_task.data)
         image = frame_provider.get_frame(frame, quality=quality)
 
+        if self.transport == LambdaTransport.BINARY:
+            return image[0].getvalue()
+
         return base64.b64encode(image[0].getvalue()).decode('utf-8')
 
 class LambdaQueue:
@@ -783,32 +1030,31 @@ class LambdaJob:
 
         frame_set = cls._get_frame_set(db_task, db_job)
 
-        for frame in frame_set:
-            if frame in db_task.data.deleted_frames:
-                continue
+        deleted_frames = set(db_task.data.deleted_frames)
+        frame_set = [frame for frame in frame_set if frame not in deleted_frames]
 
-            annotations = function.invoke(db_task, db_job=db_job, data={
-                "frame": frame, "quality": quality, "mapping": mapping,
-                "threshold": threshold
-            })
+        annotations_per_frame = function.iterate_detections(db_task, frame_set,
+            quality=quality, threshold=threshold, mapping=mapping)
 
-            progress = (frame + 1) / db_task.data.size
-            if not cls._update_progress(progress):
-                break
+        with closing(annotations_per_frame):
+            for frame, annotations in annotations_per_frame:
+                progress = (frame + 1) / db_task.data.size
+                if not cls._update_progress(progress):
+                    break
 
-            for anno in annotations:
-                parsed = parse_anno(anno, labels)
-                if parsed is not None:
-                    if anno["type"].lower() == "tag":
-                        results.append_tag(parsed)
-                    else:
-                        results.append_shape(parsed)
+                for anno in annotations:
+                    parsed = parse_anno(anno, labels)
+                    if parsed is not None:
+                        if anno["type"].lower() == "tag":
+                            results.append_tag(parsed)
+                        else:
+                            results.append_shape(parsed)
 
-            # Accumulate data during 100 frames before submitting results.
-            # It is optimization to make fewer calls to our server. Also
-            # it isn't possible to keep all results in memory.
-            if frame and frame % 100 == 0:
-                results.submit()
+                # Accumulate data during 100 frames before submitting results.
+                # It is optimization to make fewer calls to our server. Also
+                # it isn't possible to keep all results in memory.
+                if frame and frame % 100 == 0:
+                    results.submit()
 
         results.submit()
 
@@ -864,8 +1110,33 @@ class LambdaJob:
             else:
                 shapes_without_boxes.append(shape)
 
+        def iterate_matchings(frame_pairs):
+            # The function is called only for frame pairs with boxes on both frames.
+            # The requests don't depend on the previous results, so they can be batched.
+            for batch_start in range(0, len(frame_pairs), function.max_batch_size):
+                batch = frame_pairs[batch_start : batch_start + function.max_batch_size]
+                requested_pairs = [
+                    (frame0, frame1) for frame0, frame1 in batch
+                    if boxes_by_frame[frame0] and boxes_by_frame[frame1]
+                ]
+                matchings = dict(zip(requested_pairs, function.invoke_batch(db_task, db_job=db_job,
+                    data=[
+                        {
+                            "frame0": frame0, "frame1": frame1, "quality": quality,
+                            "boxes0": boxes_by_frame[frame0], "boxes1": boxes_by_frame[frame1],
+                            "threshold": threshold, "max_distance": max_distance
+                        }
+                        for frame0, frame1 in requested_pairs
+                    ]
+                )))
+
+                for frame_pair in batch:
+                    yield frame_pair, matchings.get(frame_pair)
+
         paths = {}
-        for i, (frame0, frame1) in enumerate(zip(frame_set[:-1], frame_set[1:])):
+        for i, ((frame0, frame1), matching) in enumerate(
+            iterate_matchings(list(zip(frame_set[:-1], frame_set[1:])))
+        ):
             boxes0 = boxes_by_frame[frame0]
             for box in boxes0:
                 if "path_id" not in box:
@@ -874,12 +1145,7 @@ class LambdaJob:
                     box["path_id"] = path_id
 
             boxes1 = boxes_by_frame[frame1]
-            if boxes0 and boxes1:
-                matching = function.invoke(db_task, db_job=db_job, data={
-                    "frame0": frame0, "frame1": frame1, "quality": quality,
-                    "boxes0": boxes0, "boxes1": boxes1, "threshold": threshold,
-                    "max_distance": max_distance})
-
+            if matching is not None:
                 for idx0, idx1 in enumerate(matching):
                     if idx1 >= 0:
                         path_id = boxes0[idx0]["path_id"]
@@ -6,3 +6,6 @@ import os
 
 QUALITY_CHECK_JOB_DELAY = int(os.getenv("CVAT_QUALITY_CHECK_JOB_DELAY", 15 * 60))
 "The delay before the next quality check job is queued, in seconds"
+
+QUALITY_CHECK_WORKERS = int(os.getenv("CVAT_QUALITY_CHECK_WORKERS", 1))
+"The number of worker processes for job comparisons in quality checks, 1 to disable"
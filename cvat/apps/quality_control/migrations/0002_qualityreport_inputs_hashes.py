@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("quality_control", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="qualityreport",
+            name="inputs_hash",
+            field=models.CharField(blank=True, default=None, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name="qualityreport",
+            name="frame_inputs_hashes",
+            field=models.JSONField(blank=True, default=None, null=True),
+        ),
+    ]
@@ -88,6 +88,11 @@ class QualityReport(models.Model):
 
     data = models.JSONField()
 
+    # Hashes of the comparison inputs, used to reuse the results in the next reports.
+    # Only available in job reports.
+    inputs_hash = models.CharField(max_length=64, null=True, blank=True, default=None)
+    frame_inputs_hashes = models.JSONField(null=True, blank=True, default=None)
+
     conflicts: Sequence[AnnotationConflict]
 
     @property
@@ -4,8 +4,12 @@
 
 from __future__ import annotations
 
+import concurrent.futures
+import gc
+import hashlib
 import itertools
 import math
+import multiprocessing
 from collections import Counter
 from copy import deepcopy
 from datetime import timedelta
@@ -19,6 +23,7 @@ import django_rq
 import numpy as np
 from attrs import asdict, define, fields_dict
 from datumaro.util import dump_json, parse_json
+from django import db
 from django.conf import settings
 from django.db import transaction
 from django.utils import timezone
@@ -43,6 +48,7 @@ from cvat.apps.engine.models import (
     StatusChoice,
     Task,
 )
+from cvat.apps.engine.log import ServerLogManager
 from cvat.apps.profiler import silk_profile
 from cvat.apps.quality_control import models
 from cvat.apps.quality_control.models import (
@@ -52,6 +58,8 @@ from cvat.apps.quality_control.models import (
 )
 from cvat.utils.background_jobs import schedule_job_with_throttling
 
+slogger = ServerLogManager(__name__)
+
 
 class _Serializable:
     def _value_serializer(self, v):
@@ -553,14 +561,36 @@ class JobDataProvider:
         self.job_id = job_id
         self.job_annotation = JobAnnotation(job_id, queryset=queryset)
         self.job_annotation.init_from_db()
-        self.job_data = JobData(
+        self.job_data = self._make_job_data(included_frames)
+
+        self._annotation_memo = _MemoizingAnnotationConverterFactory()
+
+    def _make_job_data(self, included_frames: Optional[Sequence[int]]) -> JobData:
+        return JobData(
             annotation_ir=self.job_annotation.ir_data,
             db_job=self.job_annotation.db_job,
             use_server_track_ids=True,
             included_frames=included_frames,
         )
 
-        self._annotation_memo = _MemoizingAnnotationConverterFactory()
+    def restrict_frames(self, included_frames: Sequence[int]):
+        """
+        Limits the dataset to the specified frames. The loaded annotations are reused.
+        """
+
+        self.job_data = self._make_job_data(included_frames)
+        self._annotation_memo.clear()
+        self.__dict__.pop("dm_dataset", None)
+
+    def get_frame_inputs_hashes(self) -> Dict[int, str]:
+        """
+        Returns content hashes of the job data on each included frame.
+        """
+
+        return {
+            frame.idx: hashlib.sha1(repr(frame).encode()).hexdigest()
+            for frame in self.job_data.group_by_frame(include_empty=True)
+        }
 
     @cached_property
     def dm_dataset(self):
@@ -639,26 +669,117 @@ class _MemoizingAnnotationConverter(CvatToDmAnnotationConverter):
         return converted
 
 
+def _find_candidate_pairs(
+    a_extents: np.ndarray, b_extents: np.ndarray, *, max_cells_per_object: int = 64
+) -> List[Tuple[int, int]]:
+    """
+    Finds the object pairs with intersecting extents. Returns sorted index pairs.
+
+    The extents are (x0, y0, x1, y1) rows, the borders are included.
+    Objects with non-finite extents are paired with all the objects.
+
+    A uniform grid is used to avoid testing all the possible pairs. Objects covering
+    too many grid cells are tested against all the objects directly.
+    """
+
+    a_extents = np.asarray(a_extents, dtype=float).reshape((-1, 4))
+    b_extents = np.asarray(b_extents, dtype=float).reshape((-1, 4))
+
+    a_bounded = np.isfinite(a_extents).all(axis=1)
+    b_bounded = np.isfinite(b_extents).all(axis=1)
+
+    pairs = set()
+    for a_idx in np.flatnonzero(~a_bounded).tolist():
+        pairs.update((a_idx, b_idx) for b_idx in range(len(b_extents)))
+    for b_idx in np.flatnonzero(~b_bounded).tolist():
+        pairs.update((a_idx, b_idx) for a_idx in range(len(a_extents)))
+
+    a_bounded = np.flatnonzero(a_bounded)
+    b_bounded = np.flatnonzero(b_bounded)
+    if not len(a_bounded) or not len(b_bounded):
+        return sorted(pairs)
+
+    bounded_extents = np.concatenate((a_extents[a_bounded], b_extents[b_bounded]))
+    extent_sizes = bounded_extents[:, 2:] - bounded_extents[:, :2]
+    cell_size = max(float(np.median(extent_sizes.max(axis=1))), 1)
+    grid_origin = np.tile(bounded_extents[:, :2].min(axis=0), 2)
+
+    def _get_cells(extents: np.ndarray) -> List[List[int]]:
+        return np.floor((extents - grid_origin) / cell_size).astype(int).tolist()
+
+    def _is_large(cells: List[int]) -> bool:
+        x0, y0, x1, y1 = cells
+        return max_cells_per_object < (x1 - x0 + 1) * (y1 - y0 + 1)
+
+    grid = {}
+    large_b_objects = []
+    for b_idx, b_cells in zip(b_bounded.tolist(), _get_cells(b_extents[b_bounded])):
+        if _is_large(b_cells):
+            large_b_objects.append(b_idx)
+            continue
+
+        x0, y0, x1, y1 = b_cells
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                grid.setdefault((x, y), []).append(b_idx)
+
+    for a_idx, a_cells in zip(a_bounded.tolist(), _get_cells(a_extents[a_bounded])):
+        if _is_large(a_cells):
+            candidates = b_bounded
+        else:
+            candidates = set(large_b_objects)
+            x0, y0, x1, y1 = a_cells
+            for x in range(x0, x1 + 1):
+                for y in range(y0, y1 + 1):
+                    candidates.update(grid.get((x, y), []))
+
+            candidates = np.fromiter(candidates, dtype=int, count=len(candidates))
+
+        a_x0, a_y0, a_x1, a_y1 = a_extents[a_idx]
+        candidate_extents = b_extents[candidates]
+        intersecting = (
+            (candidate_extents[:, 0] <= a_x1)
+            & (a_x0 <= candidate_extents[:, 2])
+            & (candidate_extents[:, 1] <= a_y1)
+            & (a_y0 <= candidate_extents[:, 3])
+        )
+        pairs.update((a_idx, b_idx) for b_idx in candidates[intersecting].tolist())
+
+    return sorted(pairs)
+
+
 def _match_segments(
     a_segms,
     b_segms,
     distance=dm.ops.segment_iou,
     dist_thresh=1.0,
     label_matcher=lambda a, b: a.label == b.label,
+    *,
+    candidate_pairs: Optional[Sequence[Tuple[int, int]]] = None,
 ):
+    """
+    If candidate_pairs are specified, the distance is only computed for these pairs,
+    the other pairs are considered not matching.
+    """
+
     assert callable(distance), distance
     assert callable(label_matcher), label_matcher
 
     max_anns = max(len(a_segms), len(b_segms))
-    distances = np.array(
-        [
+    if candidate_pairs is not None:
+        distances = np.ones((max_anns, max_anns))
+        for a_idx, b_idx in candidate_pairs:
+            distances[a_idx, b_idx] = 1 - distance(a_segms[a_idx], b_segms[b_idx])
+    else:
+        distances = np.array(
             [
-                1 - distance(a, b) if a is not None and b is not None else 1
-                for b, _ in itertools.zip_longest(b_segms, range(max_anns), fillvalue=None)
+                [
+                    1 - distance(a, b) if a is not None and b is not None else 1
+                    for b, _ in itertools.zip_longest(b_segms, range(max_anns), fillvalue=None)
+                ]
+                for a, _ in itertools.zip_longest(a_segms, range(max_anns), fillvalue=None)
             ]
-            for a, _ in itertools.zip_longest(a_segms, range(max_anns), fillvalue=None)
-        ]
-    )
+        )
     distances[~np.isfinite(distances)] = 1
     distances[distances > 1 - dist_thresh] = 1
 
@@ -786,6 +907,18 @@ def _segment_iou(a: dm.Annotation, b: dm.Annotation, *, img_h: int, img_w: int)
     return float(mask_utils.iou(b, a, [0]))
 
 
+def _get_segment_extent(
+    bbox: Tuple[float, float, float, float]
+) -> Tuple[float, float, float, float]:
+    """
+    Returns the (x0, y0, x1, y1) extent of the pixels, which can be covered
+    by the rasterized segment with the specified (x, y, w, h) bbox.
+    """
+
+    x, y, w, h = bbox
+    return (math.floor(x) - 1, math.floor(y) - 1, math.ceil(x + w) + 1, math.ceil(y + h) + 1)
+
+
 @define(kw_only=True)
 class _LineMatcher(dm.ops.LineMatcher):
     EPSILON = 1e-7
@@ -1030,7 +1163,14 @@ class _DistanceComparator(dm.ops.DistanceComparator):
         a_objs: Optional[Sequence[dm.Annotation]] = None,
         b_objs: Optional[Sequence[dm.Annotation]] = None,
         dist_thresh: Optional[float] = None,
+        a_extents: Optional[Sequence[Tuple[float, float, float, float]]] = None,
+        b_extents: Optional[Sequence[Tuple[float, float, float, float]]] = None,
     ):
+        """
+        If the object extents are specified, the distance is only computed for the objects
+        with intersecting extents. The distance must be non-positive for the other objects.
+        """
+
         if a_objs is None:
             a_objs = self._get_ann_type(t, item_a)
         if b_objs is None:
@@ -1046,6 +1186,8 @@ class _DistanceComparator(dm.ops.DistanceComparator):
             extra_args = {}
             if label_matcher:
                 extra_args["label_matcher"] = label_matcher
+            if a_extents is not None and b_extents is not None:
+                extra_args["candidate_pairs"] = _find_candidate_pairs(a_extents, b_extents)
 
             returned_values = _match_segments(
                 a_objs,
@@ -1083,12 +1225,29 @@ class _DistanceComparator(dm.ops.DistanceComparator):
             else:
                 return _segment_iou(_to_polygon(a), _to_polygon(b), img_h=img_h, img_w=img_w)
 
+        def _get_extent(bbox_ann: dm.Bbox) -> Tuple[float, float, float, float]:
+            # Rotated boxes are compared as rasterized polygons
+            # or as the original boxes, if the rotations are the same
+            points = np.reshape(
+                np.concatenate((bbox_ann.as_polygon(), _to_polygon(bbox_ann).points)), (-1, 2)
+            )
+            x0, y0 = points.min(axis=0)
+            x1, y1 = points.max(axis=0)
+            return _get_segment_extent((x0, y0, x1 - x0, y1 - y0))
+
+        a_boxes = self._get_ann_type(dm.AnnotationType.bbox, item_a)
+        b_boxes = self._get_ann_type(dm.AnnotationType.bbox, item_b)
+
         img_h, img_w = item_a.image.size
         return self._match_segments(
             dm.AnnotationType.bbox,
             item_a,
             item_b,
+            a_objs=a_boxes,
+            b_objs=b_boxes,
             distance=partial(_bbox_iou, img_h=img_h, img_w=img_w),
+            a_extents=[_get_extent(a) for a in a_boxes],
+            b_extents=[_get_extent(b) for b in b_boxes],
         )
 
     def match_segmentations(self, item_a, item_b):
@@ -1207,6 +1366,8 @@ class _DistanceComparator(dm.ops.DistanceComparator):
             b_objs=range(len(b_instances)),
             distance=_segment_comparator,
             label_matcher=_label_matcher,
+            a_extents=[_get_segment_extent(dm.ops.max_bbox(anns)) for anns in a_instances],
+            b_extents=[_get_segment_extent(dm.ops.max_bbox(anns)) for anns in b_instances],
         )
 
         # restore results for original annotations
@@ -1324,6 +1485,15 @@ class _DistanceComparator(dm.ops.DistanceComparator):
                     len(matched_points) + len(a_extra) + len(b_extra)
                 )
 
+        def _get_extent(points_ann: dm.Points) -> Tuple[float, float, float, float]:
+            x, y, w, h = instance_map[id(points_ann)][1]
+            if w * h == 0:
+                # Singular points are compared in the image space,
+                # the similarity is positive for any distance
+                return (-math.inf, -math.inf, math.inf, math.inf)
+
+            return (x, y, x + w, y + h)
+
         return self._match_segments(
             dm.AnnotationType.points,
             item_a,
@@ -1331,6 +1501,8 @@ class _DistanceComparator(dm.ops.DistanceComparator):
             a_objs=a_points,
             b_objs=b_points,
             distance=_distance,
+            a_extents=[_get_extent(a) for a in a_points],
+            b_extents=[_get_extent(b) for b in b_points],
         )
 
     def _get_skeleton_info(self, skeleton_label_id: int):
@@ -1665,6 +1837,7 @@ class DatasetComparator:
         gt_data_provider: JobDataProvider,
         *,
         settings: Optional[ComparisonParameters] = None,
+        reused_frame_results: Optional[Dict[int, ComparisonReportFrameSummary]] = None,
     ) -> None:
         if settings is None:
             settings = self.DEFAULT_SETTINGS
@@ -1677,6 +1850,9 @@ class DatasetComparator:
 
         self._frame_results: Dict[int, ComparisonReportFrameSummary] = {}
 
+        # Results of the previous comparisons for the frames with unchanged inputs
+        self._reused_frame_results = reused_frame_results or {}
+
         self.comparator = _Comparator(self._gt_dataset.categories(), settings=settings)
 
         self.included_frames = gt_data_provider.job_data._db_job.segment.frame_set
@@ -1699,6 +1875,13 @@ class DatasetComparator:
         gt_job_dataset = self._gt_dataset
 
         for gt_item in gt_job_dataset:
+            frame_id = self._dm_item_to_frame_id(gt_item)
+            if frame_id in self._reused_frame_results and (
+                self.included_frames is None or frame_id in self.included_frames
+            ):
+                self._frame_results[frame_id] = self._reused_frame_results[frame_id]
+                continue
+
             ds_item = ds_job_dataset.get(gt_item.id)
             if not ds_item:
                 continue  # we need to compare only intersecting frames
@@ -2102,11 +2285,45 @@ class DatasetComparator:
         )
 
 
+@define(kw_only=True)
+class _JobComparisonContext:
+    gt_job_data_provider: JobDataProvider
+    job_data_providers: Dict[int, JobDataProvider]
+    quality_params: ComparisonParameters
+    reused_frame_results: Dict[int, Dict[int, ComparisonReportFrameSummary]]
+
+    def compare_job(self, job_id: int) -> ComparisonReport:
+        job_data_provider = self.job_data_providers[job_id]
+        comparator = DatasetComparator(
+            job_data_provider,
+            self.gt_job_data_provider,
+            settings=self.quality_params,
+            reused_frame_results=self.reused_frame_results[job_id],
+        )
+        job_report = comparator.generate_report()
+
+        # Release resources
+        del job_data_provider.dm_dataset
+
+        return job_report
+
+
+# Set in the parent process before the worker processes are forked
+_job_comparison_context: Optional[_JobComparisonContext] = None
+
+
+def _compare_job_in_worker_process(job_id: int) -> str:
+    return _job_comparison_context.compare_job(job_id).to_json()
+
+
 class QualityReportUpdateManager:
     _QUEUE_JOB_PREFIX = "update-quality-metrics-task-"
     _RQ_CUSTOM_QUALITY_CHECK_JOB_TYPE = "custom_quality_check"
     _JOB_RESULT_TTL = 120
 
+    # Must be updated on changes in the comparison logic to invalidate the saved results
+    _REPORT_INPUTS_VERSION = 1
+
     @classmethod
     def _get_quality_check_job_delay(cls) -> timedelta:
         return timedelta(seconds=settings.QUALITY_CHECK_JOB_DELAY)
@@ -2130,6 +2347,26 @@ class QualityReportUpdateManager:
             return report.created_date
         return None
 
+    @staticmethod
+    def _make_inputs_hash(*inputs) -> str:
+        return hashlib.sha1(repr(inputs).encode()).hexdigest()
+
+    def _get_previous_job_reports(self, task: Task) -> Dict[int, models.QualityReport]:
+        last_task_report = (
+            models.QualityReport.objects.filter(task=task)
+            .order_by("-created_date", "-id")
+            .first()
+        )
+        if not last_task_report:
+            return {}
+
+        return {
+            job_report.job_id: job_report
+            for job_report in last_task_report.children.exclude(inputs_hash=None).only(
+                "job_id", "data", "inputs_hash", "frame_inputs_hashes"
+            )
+        }
+
     class QualityReportsNotAvailable(Exception):
         pass
 
@@ -2231,11 +2468,6 @@ class QualityReportUpdateManager:
             if gt_job is None:
                 return
 
-            # TODO: Probably, can be optimized to this:
-            # - task updated (the gt job, frame set or labels changed) -> everything is computed
-            # - job updated -> job report is computed
-            #   old reports can be reused in this case (need to add M-1 relationship in reports)
-
             # Add prefetch data to the shared queryset
             # All the jobs / segments share the same task, so we can load it just once.
             # We reuse the same object for better memory use (OOM is possible otherwise).
@@ -2251,26 +2483,91 @@ class QualityReportUpdateManager:
             gt_job_data_provider = JobDataProvider(gt_job.id, queryset=job_queryset)
             gt_job_frames = gt_job_data_provider.job_data.get_included_frames()
 
+            quality_params = self._get_task_quality_params(task)
+
+            previous_job_reports = self._get_previous_job_reports(task)
+
+            common_inputs_hash = self._make_inputs_hash(
+                self._REPORT_INPUTS_VERSION,
+                quality_params.to_dict(),
+                gt_job_data_provider.job_data.meta[JobData.META_FIELD]["labels"],
+            )
+
+            # Only the jobs and frames with changed inputs are compared,
+            # the previous results are reused for the others.
+            # The annotation versions are checked first, so that the unchanged jobs
+            # are not loaded at all.
             jobs: List[Job] = [j for j in job_queryset if j.type == JobType.ANNOTATION]
-            job_data_providers = {
-                job.id: JobDataProvider(
-                    job.id, queryset=job_queryset, included_frames=gt_job_frames
+            reused_job_reports: Dict[int, ComparisonReport] = {}
+            reused_job_report_data: Dict[int, str] = {}
+            job_inputs_hashes: Dict[int, Tuple[str, Dict[int, str]]] = {}
+            job_data_providers: Dict[int, JobDataProvider] = {}
+            for job in jobs:
+                job_hash = self._make_inputs_hash(
+                    common_inputs_hash,
+                    job.id,
+                    job.annotations_version,
+                    gt_job.annotations_version,
+                    (job.segment.start_frame, job.segment.stop_frame),
+                    sorted(gt_job_frames),
                 )
-                for job in jobs
-            }
 
-            quality_params = self._get_task_quality_params(task)
+                previous_job_report = previous_job_reports.get(job.id)
+                if previous_job_report and previous_job_report.inputs_hash == job_hash:
+                    reused_job_reports[job.id] = ComparisonReport.from_json(
+                        previous_job_report.data
+                    )
+                    reused_job_report_data[job.id] = previous_job_report.data
+                    job_inputs_hashes[job.id] = (job_hash, previous_job_report.frame_inputs_hashes)
+                    continue
 
-        job_comparison_reports: Dict[int, ComparisonReport] = {}
-        for job in jobs:
-            job_data_provider = job_data_providers[job.id]
-            comparator = DatasetComparator(
-                job_data_provider, gt_job_data_provider, settings=quality_params
-            )
-            job_comparison_reports[job.id] = comparator.generate_report()
+                job_inputs_hashes[job.id] = (job_hash, None)
+                job_data_providers[job.id] = JobDataProvider(
+                    job.id, queryset=job_queryset, included_frames=gt_job_frames
+                )
 
-            # Release resources
-            del job_data_provider.dm_dataset
+        gt_frame_hashes = gt_job_data_provider.get_frame_inputs_hashes()
+
+        reused_frame_results_by_job: Dict[int, Dict[int, ComparisonReportFrameSummary]] = {}
+        for job_id, job_data_provider in job_data_providers.items():
+            frame_hashes = {
+                frame_id: self._make_inputs_hash(
+                    common_inputs_hash, job_id, gt_frame_hashes.get(frame_id), frame_hash
+                )
+                for frame_id, frame_hash in job_data_provider.get_frame_inputs_hashes().items()
+            }
+            job_inputs_hashes[job_id] = (job_inputs_hashes[job_id][0], frame_hashes)
+
+            # The frame results can still be reused for the changed jobs
+            previous_job_report = previous_job_reports.get(job_id)
+            reused_frame_results = {}
+            if previous_job_report and previous_job_report.frame_inputs_hashes:
+                previous_frame_hashes = previous_job_report.frame_inputs_hashes
+                reused_frame_results = {
+                    frame_id: frame_result
+                    for frame_id, frame_result in ComparisonReport.from_json(
+                        previous_job_report.data
+                    ).frame_results.items()
+                    if frame_id in frame_hashes
+                    and frame_hashes[frame_id] == previous_frame_hashes.get(str(frame_id))
+                }
+
+                changed_frames = set(frame_hashes).difference(reused_frame_results)
+                if changed_frames:
+                    job_data_provider.restrict_frames(changed_frames)
+
+            reused_frame_results_by_job[job_id] = reused_frame_results
+
+        compared_job_reports = self._compare_jobs(
+            gt_job_data_provider,
+            job_data_providers,
+            quality_params=quality_params,
+            reused_frame_results=reused_frame_results_by_job,
+        )
+        job_comparison_reports = {
+            job.id: compared_job_reports.get(job.id) or reused_job_reports[job.id]
+            for job in jobs
+        }
 
         task_comparison_report = self._compute_task_report(task, job_comparison_reports)
 
@@ -2297,8 +2594,11 @@ class QualityReportUpdateManager:
                     job=job,
                     target_last_updated=job.updated_date,
                     gt_last_updated=gt_job.updated_date,
-                    data=job_comparison_report.to_json(),
+                    # The reused reports are saved as is
+                    data=reused_job_report_data.get(job.id) or job_comparison_report.to_json(),
                     conflicts=[c.to_dict() for c in job_comparison_report.conflicts],
+                    inputs_hash=job_inputs_hashes[job.id][0],
+                    frame_inputs_hashes=job_inputs_hashes[job.id][1],
                 )
 
                 job_quality_reports[job.id] = job_report
@@ -2316,6 +2616,62 @@ class QualityReportUpdateManager:
 
         return task_report.id
 
+    def _compare_jobs(
+        self,
+        gt_job_data_provider: JobDataProvider,
+        job_data_providers: Dict[int, JobDataProvider],
+        *,
+        quality_params: ComparisonParameters,
+        reused_frame_results: Dict[int, Dict[int, ComparisonReportFrameSummary]],
+    ) -> Dict[int, ComparisonReport]:
+        context = _JobComparisonContext(
+            gt_job_data_provider=gt_job_data_provider,
+            job_data_providers=job_data_providers,
+            quality_params=quality_params,
+            reused_frame_results=reused_frame_results,
+        )
+
+        worker_count = min(settings.QUALITY_CHECK_WORKERS, len(job_data_providers))
+        if worker_count <= 1:
+            return {job_id: context.compare_job(job_id) for job_id in job_data_providers}
+
+        # The worker processes are forked after the data is loaded,
+        # so they can use the GT dataset and the job data without copying.
+        # The GT dataset is converted once, before the workers are started.
+        gt_job_data_provider.dm_dataset.init_cache()
+
+        # The forked processes must not use the DB connections of the parent process
+        db.connections.close_all()
+
+        # Prevent page copying on garbage collection in the worker processes.
+        # The garbage is collected first, so that it's not kept in the permanent generation.
+        gc.collect()
+        gc.freeze()
+
+        global _job_comparison_context
+        _job_comparison_context = context
+        try:
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=worker_count, mp_context=multiprocessing.get_context("fork")
+            ) as executor:
+                job_ids = list(job_data_providers)
+                return {
+                    job_id: ComparisonReport.from_json(job_report)
+                    for job_id, job_report in zip(
+                        job_ids, executor.map(_compare_job_in_worker_process, job_ids)
+                    )
+                }
+        except concurrent.futures.process.BrokenProcessPool as ex:
+            # A worker process can be killed, e.g. by the OOM killer
+            slogger.glob.warning(
+                f"Failed to compare jobs in worker processes ({ex}), comparing sequentially"
+            )
+        finally:
+            _job_comparison_context = None
+            gc.unfreeze()
+
+        return {job_id: context.compare_job(job_id) for job_id in job_data_providers}
+
     def _get_current_job(self):
         from rq import get_current_job
 
@@ -2425,6 +2781,8 @@ class QualityReportUpdateManager:
                 target_last_updated=job_report["target_last_updated"],
                 gt_last_updated=job_report["gt_last_updated"],
                 data=job_report["data"],
+                inputs_hash=job_report["inputs_hash"],
+                frame_inputs_hashes=job_report["frame_inputs_hashes"],
             )
             db_job_reports.append(db_job_report)
 
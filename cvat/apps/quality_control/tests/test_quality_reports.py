@@ -0,0 +1,416 @@
+# Copyright (C) 2024 CVAT.ai Corporation
+#
+# SPDX-License-Identifier: MIT
+
+import itertools
+import math
+import os
+import random
+from contextlib import ExitStack, contextmanager
+from typing import Dict, List, Tuple
+from unittest import mock
+
+import datumaro as dm
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, override_settings
+from rest_framework import status
+
+from cvat.apps.engine.models import Job, JobType, Label
+from cvat.apps.engine.tests.utils import ApiTestBase, ForceLogin, generate_image_file
+from cvat.apps.quality_control.models import QualityReport, QualitySettings
+from cvat.apps.quality_control.quality_reports import (
+    ComparisonReport,
+    DatasetComparator,
+    JobDataProvider,
+    QualityReportUpdateManager,
+    _find_candidate_pairs,
+    _get_segment_extent,
+    _match_segments,
+)
+
+
+class CandidatePairsTest(SimpleTestCase):
+    def _make_extents(self, rng: random.Random, count: int):
+        extents = []
+        for _ in range(count):
+            kind = rng.random()
+            if kind < 0.05:
+                extents.append((-math.inf, -math.inf, math.inf, math.inf))
+                continue
+
+            x, y = rng.uniform(0, 500), rng.uniform(0, 500)
+            if kind < 0.15:
+                w, h = rng.uniform(0, 400), rng.uniform(0, 400)
+            else:
+                w, h = rng.choice([0, rng.uniform(0, 30)]), rng.uniform(0, 30)
+
+            extents.append((x, y, x + w, y + h))
+
+        return extents
+
+    def _find_pairs_directly(self, a_extents, b_extents):
+        return sorted(
+            (a_idx, b_idx)
+            for (a_idx, a), (b_idx, b) in itertools.product(
+                enumerate(a_extents), enumerate(b_extents)
+            )
+            if not all(map(math.isfinite, a + b))
+            or (b[0] <= a[2] and a[0] <= b[2] and b[1] <= a[3] and a[1] <= b[3])
+        )
+
+    def test_can_find_intersecting_extents(self):
+        rng = random.Random(0)
+
+        for _ in range(100):
+            a_extents = self._make_extents(rng, rng.randint(0, 50))
+            b_extents = self._make_extents(rng, rng.randint(0, 50))
+
+            self.assertEqual(
+                self._find_pairs_directly(a_extents, b_extents),
+                _find_candidate_pairs(a_extents, b_extents),
+            )
+
+    def test_can_find_touching_extents(self):
+        self.assertEqual([(0, 0)], _find_candidate_pairs([(0, 0, 10, 10)], [(10, 10, 20, 20)]))
+
+
+class DenseFrameMatchingTest(SimpleTestCase):
+    def _make_dense_frame(self, count: int):
+        rng = random.Random(42)
+
+        gt_boxes = [
+            dm.Bbox(
+                rng.uniform(0, 3000),
+                rng.uniform(0, 3000),
+                rng.uniform(5, 60),
+                rng.uniform(5, 60),
+                label=rng.randint(0, 3),
+            )
+            for _ in range(count)
+        ]
+
+        ds_boxes = [
+            dm.Bbox(
+                box.x + rng.uniform(-5, 5),
+                box.y + rng.uniform(-5, 5),
+                box.w,
+                box.h,
+                label=box.label if rng.random() < 0.9 else 0,
+            )
+            for box in gt_boxes[: count * 9 // 10]
+        ] + [
+            dm.Bbox(rng.uniform(0, 3000), rng.uniform(0, 3000), 20, 20, label=0)
+            for _ in range(count // 10)
+        ]
+
+        return gt_boxes, ds_boxes
+
+    def _match(self, gt_boxes, ds_boxes, *, use_extents: bool):
+        extra_args = {}
+        if use_extents:
+            extra_args["candidate_pairs"] = _find_candidate_pairs(
+                [_get_segment_extent(box.get_bbox()) for box in gt_boxes],
+                [_get_segment_extent(box.get_bbox()) for box in ds_boxes],
+            )
+
+        return _match_segments(
+            gt_boxes, ds_boxes, distance=dm.ops.bbox_iou, dist_thresh=0.5, **extra_args
+        )
+
+    def test_spatial_filtering_matches_full_comparison(self):
+        gt_boxes, ds_boxes = self._make_dense_frame(300)
+
+        expected = self._match(gt_boxes, ds_boxes, use_extents=False)
+        actual = self._match(gt_boxes, ds_boxes, use_extents=True)
+
+        self.assertGreater(len(expected[0]), 0)
+        for expected_anns, actual_anns in zip(expected, actual):
+            self.assertEqual(expected_anns, actual_anns)
+
+
+class _QualityReportsTestBase(ApiTestBase):
+    GT_FRAMES = [1, 3, 6, 8]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username="admin", email="", password="admin")
+
+    def setUp(self):
+        super().setUp()
+
+        with ForceLogin(self.admin, self.client):
+            response = self.client.post(
+                "/api/tasks",
+                data={
+                    "name": "quality task",
+                    "overlap": 0,
+                    "segment_size": 5,
+                    "labels": [{"name": "car"}, {"name": "person"}],
+                },
+                format="json",
+            )
+            assert response.status_code == status.HTTP_201_CREATED, response.status_code
+            self.task_id = response.data["id"]
+
+            response = self.client.post(
+                f"/api/tasks/{self.task_id}/data",
+                data={
+                    "image_quality": 75,
+                    **{
+                        f"client_files[{i}]": generate_image_file(f"image_{i}.jpg")
+                        for i in range(10)
+                    },
+                },
+            )
+            assert response.status_code == status.HTTP_202_ACCEPTED, response.status_code
+
+            response = self.client.post(
+                "/api/jobs",
+                data={
+                    "type": "ground_truth",
+                    "task_id": self.task_id,
+                    "frame_selection_method": "manual",
+                    "frames": self.GT_FRAMES,
+                },
+                format="json",
+            )
+            assert response.status_code == status.HTTP_201_CREATED, response.status_code
+            self.gt_job_id = response.data["id"]
+
+        self.job_ids = list(
+            Job.objects.filter(segment__task_id=self.task_id, type=JobType.ANNOTATION)
+            .order_by("segment__start_frame")
+            .values_list("id", flat=True)
+        )
+        self.label_id = Label.objects.get(task_id=self.task_id, name="car").id
+
+        # GT frames in each annotation job
+        self.job_frames = {
+            self.job_ids[0]: [frame for frame in self.GT_FRAMES if frame < 5],
+            self.job_ids[1]: [frame for frame in self.GT_FRAMES if 5 <= frame],
+        }
+
+        self._put_annotations(self.gt_job_id, self.GT_FRAMES, offset=0)
+        for job_id, frames in self.job_frames.items():
+            self._put_annotations(job_id, frames, offset=1)
+
+    def _put_annotations(self, job_id: int, frames: List[int], *, offset: float):
+        shapes = [
+            {
+                "type": "rectangle",
+                "frame": frame,
+                "label_id": self.label_id,
+                "group": 0,
+                "source": "manual",
+                "occluded": False,
+                "z_order": 0,
+                "points": [10 + offset, 10, 40 + offset, 40],
+                "attributes": [],
+            }
+            for frame in frames
+        ]
+
+        with ForceLogin(self.admin, self.client):
+            response = self.client.put(
+                f"/api/jobs/{job_id}/annotations",
+                data={"version": 0, "tags": [], "shapes": shapes, "tracks": []},
+                format="json",
+            )
+            assert response.status_code == status.HTTP_200_OK, response.status_code
+
+    def _update_shape_points(self, job_id: int, frame: int, points: List[float]):
+        with ForceLogin(self.admin, self.client):
+            response = self.client.get(f"/api/jobs/{job_id}/annotations")
+            assert response.status_code == status.HTTP_200_OK, response.status_code
+
+            shape = next(shape for shape in response.data["shapes"] if shape["frame"] == frame)
+            shape["points"] = points
+
+            response = self.client.patch(
+                f"/api/jobs/{job_id}/annotations?action=update",
+                data={"version": 0, "tags": [], "shapes": [shape], "tracks": []},
+                format="json",
+            )
+            assert response.status_code == status.HTTP_200_OK, response.status_code
+
+    def _compute_report(self, *, reuse_previous_results: bool = True) -> QualityReport:
+        manager = QualityReportUpdateManager()
+
+        with ExitStack() as es:
+            # Skip the check for reports computed too often
+            es.enter_context(
+                mock.patch.object(manager, "is_custom_quality_check_job", return_value=True)
+            )
+
+            if not reuse_previous_results:
+                es.enter_context(
+                    mock.patch.object(manager, "_get_previous_job_reports", return_value={})
+                )
+
+            report_id = manager._compute_reports(task_id=self.task_id)
+
+        return QualityReport.objects.get(id=report_id)
+
+    @contextmanager
+    def _spy_frame_comparisons(self):
+        compared_frames: List[Tuple[int, int]] = []
+        original_process_frame = DatasetComparator._process_frame
+
+        def process_frame(comparator: DatasetComparator, ds_item, gt_item):
+            compared_frames.append(
+                (comparator._ds_data_provider.job_id, comparator._dm_item_to_frame_id(gt_item))
+            )
+            return original_process_frame(comparator, ds_item, gt_item)
+
+        with mock.patch.object(DatasetComparator, "_process_frame", process_frame):
+            yield compared_frames
+
+    @staticmethod
+    def _get_job_reports_data(task_report: QualityReport) -> Dict[int, str]:
+        return {job_report.job_id: job_report.data for job_report in task_report.children.all()}
+
+    @staticmethod
+    def _parse_report(data: str) -> dict:
+        return ComparisonReport.from_json(data).to_dict()
+
+
+@override_settings(QUALITY_CHECK_WORKERS=1)
+class IncrementalQualityReportsTest(_QualityReportsTestBase):
+    def test_can_reuse_unchanged_job_reports(self):
+        first_report = self._compute_report()
+
+        with self._spy_frame_comparisons() as compared_frames:
+            second_report = self._compute_report()
+
+        self.assertEqual(compared_frames, [])
+        self.assertNotEqual(first_report.id, second_report.id)
+        self.assertEqual(
+            self._get_job_reports_data(first_report), self._get_job_reports_data(second_report)
+        )
+
+    def test_can_recompute_only_changed_frame(self):
+        first_report = self._compute_report()
+
+        changed_job_id = self.job_ids[0]
+        self._update_shape_points(changed_job_id, 3, [50, 50, 60, 60])
+
+        with self._spy_frame_comparisons() as compared_frames:
+            incremental_report = self._compute_report()
+
+        self.assertEqual(compared_frames, [(changed_job_id, 3)])
+
+        full_report = self._compute_report(reuse_previous_results=False)
+
+        incremental_job_reports = self._get_job_reports_data(incremental_report)
+        full_job_reports = self._get_job_reports_data(full_report)
+        self.assertEqual(incremental_job_reports.keys(), full_job_reports.keys())
+        for job_id, job_report_data in full_job_reports.items():
+            self.assertEqual(
+                self._parse_report(incremental_job_reports[job_id]),
+                self._parse_report(job_report_data),
+            )
+
+        self.assertEqual(
+            self._parse_report(incremental_report.data)["comparison_summary"],
+            self._parse_report(full_report.data)["comparison_summary"],
+        )
+
+        # the change must be visible in the report
+        self.assertNotEqual(
+            self._parse_report(self._get_job_reports_data(first_report)[changed_job_id]),
+            self._parse_report(incremental_job_reports[changed_job_id]),
+        )
+
+    def test_unchanged_jobs_are_not_loaded(self):
+        self._compute_report()
+
+        changed_job_id = self.job_ids[0]
+        self._update_shape_points(changed_job_id, 3, [50, 50, 60, 60])
+
+        with mock.patch.object(
+            JobDataProvider, "__init__", autospec=True, side_effect=JobDataProvider.__init__
+        ) as init_job_data_provider:
+            self._compute_report()
+
+        self.assertEqual(
+            sorted(call.args[1] for call in init_job_data_provider.call_args_list),
+            sorted([self.gt_job_id, changed_job_id]),
+        )
+
+    def _get_all_compared_frames(self):
+        return sorted(
+            (job_id, frame) for job_id, frames in self.job_frames.items() for frame in frames
+        )
+
+    def test_quality_settings_change_invalidates_results(self):
+        self._compute_report()
+
+        QualitySettings.objects.filter(task_id=self.task_id).update(iou_threshold=0.3)
+
+        with self._spy_frame_comparisons() as compared_frames:
+            self._compute_report()
+
+        self.assertEqual(sorted(compared_frames), self._get_all_compared_frames())
+
+    def test_labels_change_invalidates_results(self):
+        self._compute_report()
+
+        with ForceLogin(self.admin, self.client):
+            response = self.client.patch(
+                f"/api/tasks/{self.task_id}",
+                data={"labels": [{"name": "bicycle"}]},
+                format="json",
+            )
+            assert response.status_code == status.HTTP_200_OK, response.status_code
+
+        with self._spy_frame_comparisons() as compared_frames:
+            self._compute_report()
+
+        self.assertEqual(sorted(compared_frames), self._get_all_compared_frames())
+
+
+def _exit_worker_process(job_id: int) -> str:
+    os._exit(1)
+
+
+class ParallelQualityReportsTest(_QualityReportsTestBase):
+    def setUp(self):
+        super().setUp()
+
+        # Make some conflicts in the reports
+        self._update_shape_points(self.job_ids[0], 3, [50, 50, 60, 60])
+        self._update_shape_points(self.job_ids[1], 8, [5, 5, 35, 35])
+
+    def _compute_full_report(self, *, workers: int) -> QualityReport:
+        with override_settings(QUALITY_CHECK_WORKERS=workers):
+            return self._compute_report(reuse_previous_results=False)
+
+    def _check_reports_equal(self, expected: QualityReport, actual: QualityReport):
+        self.assertEqual(
+            {
+                job_id: self._parse_report(data)
+                for job_id, data in self._get_job_reports_data(expected).items()
+            },
+            {
+                job_id: self._parse_report(data)
+                for job_id, data in self._get_job_reports_data(actual).items()
+            },
+        )
+        self.assertEqual(self._parse_report(expected.data), self._parse_report(actual.data))
+
+    def test_parallel_comparison_matches_sequential(self):
+        sequential_report = self._compute_full_report(workers=1)
+        parallel_report = self._compute_full_report(workers=2)
+
+        self._check_reports_equal(sequential_report, parallel_report)
+
+    def test_can_compare_sequentially_if_worker_process_fails(self):
+        sequential_report = self._compute_full_report(workers=1)
+
+        with mock.patch(
+            "cvat.apps.quality_control.quality_reports._compare_job_in_worker_process",
+            _exit_worker_process,
+        ):
+            parallel_report = self._compute_full_report(workers=2)
+
+        self._check_reports_equal(sequential_report, parallel_report)
@@ -236,6 +236,9 @@ IAM_ADMIN_ROLE = 'admin'
 IAM_ROLES = [IAM_ADMIN_ROLE, 'business', 'user', 'worker']
 IAM_OPA_HOST = 'http://opa:8181'
 IAM_OPA_DATA_URL = f'{IAM_OPA_HOST}/v1/data'
+# OPA decisions are cached per process for IAM_OPA_DECISION_CACHE_TTL seconds, 0 disables the cache
+IAM_OPA_DECISION_CACHE_TTL = float(os.getenv('CVAT_IAM_OPA_DECISION_CACHE_TTL', 5))
+IAM_OPA_DECISION_CACHE_SIZE = int(os.getenv('CVAT_IAM_OPA_DECISION_CACHE_SIZE', 10000))
 LOGIN_URL = 'rest_login'
 LOGIN_REDIRECT_URL = '/'
 
@@ -273,6 +276,7 @@ class CVAT_QUEUES(Enum):
     QUALITY_REPORTS = 'quality_reports'
     ANALYTICS_REPORTS = 'analytics_reports'
     CLEANING = 'cleaning'
+    CHUNKS = 'chunks'
 
 redis_inmem_host = os.getenv('CVAT_REDIS_INMEM_HOST', 'localhost')
 redis_inmem_port = os.getenv('CVAT_REDIS_INMEM_PORT', 6379)
@@ -318,6 +322,10 @@ RQ_QUEUES = {
         **shared_queue_settings,
         'DEFAULT_TIMEOUT': '1h',
     },
+    CVAT_QUEUES.CHUNKS.value: {
+        **shared_queue_settings,
+        'DEFAULT_TIMEOUT': '1h',
+    },
 }
 
 NUCLIO = {
@@ -328,6 +336,12 @@ NUCLIO = {
     'FUNCTION_NAMESPACE': os.getenv('CVAT_NUCLIO_FUNCTION_NAMESPACE', 'nuclio'),
     'INVOKE_METHOD': os.getenv('CVAT_NUCLIO_INVOKE_METHOD',
         default='dashboard' if 'KUBERNETES_SERVICE_HOST' in os.environ else 'direct'),
+    # The default number of concurrent function invocations during automatic annotation.
+    # Can be overridden by the "concurrency" annotation of a function.
+    # Values greater than 1 enable the pipelined mode.
+    'INVOCATION_CONCURRENCY': int(os.getenv('CVAT_NUCLIO_INVOCATION_CONCURRENCY', 1)),
+    # The number of frames decoded ahead of time in the pipelined mode
+    'FRAME_PREFETCH_SIZE': int(os.getenv('CVAT_NUCLIO_FRAME_PREFETCH_SIZE', 8)),
 }
 
 assert NUCLIO['INVOKE_METHOD'] in {'dashboard', 'direct'}
@@ -546,6 +560,28 @@ CACHES = {
 
 USE_CACHE = True
 
+# Concurrent requests for a missing media cache item wait for a single worker to prepare it.
+# The lock expires after MEDIA_CACHE_LOCK_TIMEOUT seconds, so a crashed worker can't block others
+MEDIA_CACHE_LOCK_TIMEOUT = int(os.getenv('CVAT_MEDIA_CACHE_LOCK_TIMEOUT', 120))
+MEDIA_CACHE_LOCK_WAIT_TIMEOUT = int(os.getenv('CVAT_MEDIA_CACHE_LOCK_WAIT_TIMEOUT', 300))
+MEDIA_CACHE_LOCK_POLL_INTERVAL = 0.2
+
+# The share of media cache reads that verify the item checksum, from 0 to 1
+MEDIA_CACHE_CHECKSUM_VERIFICATION_RATE = float(
+    os.getenv('CVAT_MEDIA_CACHE_CHECKSUM_VERIFICATION_RATE', 1))
+
+# Rendered job annotations are kept in the media cache for ANNOTATIONS_CACHE_TTL seconds
+# or until the next change. 0 disables the cache
+ANNOTATIONS_CACHE_TTL = int(os.getenv('CVAT_ANNOTATIONS_CACHE_TTL', 3600))
+
+# Optional media cache tiers in front of and behind Redis. Sizes are in bytes, 0 disables a tier.
+# The memory tier is per-process, the disk tier is local to the node
+MEDIA_CACHE_MEMORY_TIER_SIZE = int(os.getenv('CVAT_MEDIA_CACHE_MEMORY_TIER_SIZE', 0))
+MEDIA_CACHE_DISK_TIER_SIZE = int(os.getenv('CVAT_MEDIA_CACHE_DISK_TIER_SIZE', 0))
+MEDIA_CACHE_DISK_TIER_MIN_ITEM_SIZE = int(
+    os.getenv('CVAT_MEDIA_CACHE_DISK_TIER_MIN_ITEM_SIZE', 16 * 1024 * 1024))
+MEDIA_CACHE_DISK_TIER_ROOT = os.path.join(CACHE_ROOT, 'media')
+
 CORS_ALLOW_HEADERS = list(default_headers) + [
     # tus upload protocol headers
     'upload-offset',
@@ -692,6 +728,10 @@ DATABASES = {
     }
 }
 
+# Annotation batches with at least this number of rows are written with COPY on PostgreSQL.
+# 0 disables COPY
+ANNOTATION_COPY_THRESHOLD = int(os.getenv('CVAT_ANNOTATION_COPY_THRESHOLD', 1000))
+
 BUCKET_CONTENT_MAX_PAGE_SIZE =  500
 
 IMPORT_CACHE_FAILED_TTL = timedelta(days=30)
@@ -715,5 +755,18 @@ ONE_RUNNING_JOB_IN_QUEUE_PER_USER = to_bool(os.getenv('ONE_RUNNING_JOB_IN_QUEUE_
 # How many chunks can be prepared simultaneously during task creation in case the cache is not used
 CVAT_CONCURRENT_CHUNK_PROCESSING = int(os.getenv('CVAT_CONCURRENT_CHUNK_PROCESSING', 1))
 
+# Where chunks are encoded during task creation: in threads ("thread") or in worker processes ("process")
+CVAT_CHUNK_PROCESSING_EXECUTOR = os.getenv('CVAT_CHUNK_PROCESSING_EXECUTOR', 'thread')
+assert CVAT_CHUNK_PROCESSING_EXECUTOR in {'thread', 'process'}
+
+# The size of the per-process cache of decoded video frames, in bytes. 0 disables the cache.
+# The cache is disabled by default, because each server worker process keeps its own copy.
+# It can be enabled on servers with enough memory for the workers, e.g. with 134217728 (128 MB)
+DECODED_FRAME_CACHE_SIZE = int(os.getenv('CVAT_DECODED_FRAME_CACHE_SIZE', 0))
+
+# How many chunks after the requested one are prepared in background when the media cache is used.
+# 0 disables chunk pre-warming
+CVAT_CHUNK_PREWARM_COUNT = int(os.getenv('CVAT_CHUNK_PREWARM_COUNT', 0))
+
 from cvat.rq_patching import update_started_job_registry_cleanup
 update_started_job_registry_cleanup()
@@ -7,7 +7,7 @@ import os.path as osp
 import zipfile
 from logging import Logger
 from pathlib import Path
-from typing import Tuple
+from typing import List, Tuple
 
 import pytest
 from cvat_sdk import Client, models
@@ -64,6 +64,16 @@ class TestTaskUsecases:
 
         return task
 
+    @pytest.fixture
+    def fxt_image_files(self):
+        image_files = []
+        for i in range(5):
+            image_path = self.tmp_path / f"image_{i}.jpg"
+            Image.new("RGB", (50 + i, 50), color=(i, i, i)).save(image_path)
+            image_files.append(image_path)
+
+        return image_files
+
     @pytest.fixture
     def fxt_new_task_without_data(self):
         task = self.client.tasks.create(
@@ -343,6 +353,30 @@ class TestTaskUsecases:
         assert (self.tmp_path / f"frame-0.{expected_frame_ext}").is_file()
         assert self.stdout.getvalue() == ""
 
+    def test_can_format_frame_ranges(self):
+        assert Task._format_frame_ranges([0, 1, 2, 5, 7, 8]) == "0-2,5,7-8"
+        assert Task._format_frame_ranges([3]) == "3"
+        assert Task._format_frame_ranges([]) == ""
+
+    @pytest.mark.parametrize("quality", ("compressed", "original"))
+    def test_can_iterate_frames_in_batches(
+        self, monkeypatch: pytest.MonkeyPatch, fxt_image_files: List[Path], quality: str
+    ):
+        task = self.client.tasks.create_from_data(
+            spec={"name": "test_task", "labels": [{"name": "car"}]},
+            resources=fxt_image_files,
+            data_params={"image_quality": 80},
+        )
+        monkeypatch.setattr(Task, "_FRAMES_PER_REQUEST", 2)
+
+        frames = [
+            (frame_id, Image.open(frame).size)
+            for frame_id, frame in task._iterate_frames([4, 0, 2, 4, 3], quality=quality)
+        ]
+
+        assert frames == [(frame_id, (50 + frame_id, 50)) for frame_id in [0, 2, 3, 4]]
+        assert self.stdout.getvalue() == ""
+
     @pytest.mark.parametrize("quality", ("compressed", "original"))
     def test_can_download_chunk(self, fxt_new_task: Task, quality: str):
         chunk_path = self.tmp_path / "chunk.zip"
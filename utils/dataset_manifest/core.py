@@ -3,14 +3,18 @@
 #
 # SPDX-License-Identifier: MIT
 
+from array import array
 from enum import Enum
 from io import StringIO, BytesIO
 import av
 import json
+import mmap
 import os
+import sys
+import tempfile
 
 from abc import ABC, abstractmethod, abstractproperty, abstractstaticmethod
-from contextlib import closing
+from contextlib import closing, suppress
 from PIL import Image
 from json.decoder import JSONDecodeError
 
@@ -19,6 +23,12 @@ from .utils import SortingMethod, md5_hash, rotate_image, sort
 
 from typing import Dict, List, Union, Optional, Iterator, Tuple
 
+try:
+    # orjson is significantly faster on large manifests, but it's optional
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
 class VideoStreamReader:
     def __init__(self, source_path, chunk_size, force):
         self._source_path = source_path
@@ -283,53 +293,121 @@ class _Manifest:
 # Needed for faster iteration over the manifest file, will be generated to work inside CVAT
 # and will not be generated when manually creating a manifest
 class _Index:
-    FILE_NAME = 'index.json'
+    """
+    Line offsets of the manifest items. The index is stored as a flat array
+    of little-endian uint64 values, which is memory-mapped on loading.
+    """
+
+    FILE_NAME = 'index.bin'
+    LEGACY_FILE_NAME = 'index.json'
+
+    _ITEM_TYPE = 'Q'
 
     def __init__(self, path):
         assert path and os.path.isdir(path), 'No index directory path'
         self._path = os.path.join(path, self.FILE_NAME)
-        self._index = {}
+        self._legacy_path = os.path.join(path, self.LEGACY_FILE_NAME)
+        self._index = array(self._ITEM_TYPE)
 
     @property
     def path(self):
         return self._path
 
+    def exists(self) -> bool:
+        return os.path.exists(self._path) or os.path.exists(self._legacy_path)
+
     def dump(self):
-        with open(self._path, 'w') as index_file:
-            json.dump(self._index, index_file,  separators=(',', ':'))
+        index = array(self._ITEM_TYPE, self._index)
+        if sys.byteorder != 'little':
+            index.byteswap()
+
+        # A unique temporary file is used, so that concurrent dumps don't clash
+        tmp_fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(self._path), prefix=self.FILE_NAME + '.', suffix='.tmp'
+        )
+        try:
+            with os.fdopen(tmp_fd, 'wb') as index_file:
+                index.tofile(index_file)
+            os.replace(tmp_path, self._path)
+        except BaseException:
+            with suppress(FileNotFoundError):
+                os.remove(tmp_path)
+            raise
 
     def load(self):
-        with open(self._path, 'r') as index_file:
-            self._index = json.load(index_file,
-                object_hook=lambda d: {int(k): v for k, v in d.items()})
+        if not os.path.exists(self._path) and os.path.exists(self._legacy_path):
+            self._migrate_legacy_index()
+        else:
+            self._load_binary_index()
+
+    def _load_binary_index(self):
+        with open(self._path, 'rb') as index_file:
+            if not os.fstat(index_file.fileno()).st_size:
+                self._index = array(self._ITEM_TYPE)
+                return
+
+            buffer = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if sys.byteorder != 'little':
+            self._index = array(self._ITEM_TYPE, buffer)
+            self._index.byteswap()
+        else:
+            # The mapping is kept open while the view is alive
+            self._index = memoryview(buffer).cast(self._ITEM_TYPE)
+
+    def _migrate_legacy_index(self):
+        try:
+            with open(self._legacy_path, 'r') as index_file:
+                legacy_index = json.load(index_file)
+        except FileNotFoundError:
+            # The index has been migrated by another process
+            self._load_binary_index()
+            return
+
+        if os.path.exists(self._path):
+            # The index has been migrated by another process
+            # while the legacy file was being read
+            self._load_binary_index()
+        else:
+            self._index = array(self._ITEM_TYPE,
+                (legacy_index[str(i)] for i in range(len(legacy_index))))
+            self.dump()
+
+        with suppress(FileNotFoundError):
+            os.remove(self._legacy_path)
 
     def remove(self):
-        os.remove(self._path)
+        for path in (self._path, self._legacy_path):
+            if os.path.exists(path):
+                os.remove(path)
 
     def create(self, manifest, *, skip):
         assert os.path.exists(manifest), 'A manifest file not exists, index cannot be created'
+        self._index = array(self._ITEM_TYPE)
         with open(manifest, 'r+') as manifest_file:
             while skip:
                 manifest_file.readline()
                 skip -= 1
-            image_number = 0
             position = manifest_file.tell()
             line = manifest_file.readline()
             while line:
                 if line.strip():
-                    self._index[image_number] = position
-                    image_number += 1
+                    self._index.append(position)
                     position = manifest_file.tell()
                 line = manifest_file.readline()
 
     def partial_update(self, manifest, number):
         assert os.path.exists(manifest), 'A manifest file not exists, index cannot be updated'
+        self._index = array(self._ITEM_TYPE, self._index) # the loaded index is read-only
         with open(manifest, 'r+') as manifest_file:
             manifest_file.seek(self._index[number])
             line = manifest_file.readline()
             while line:
                 if line.strip():
-                    self._index[number] = manifest_file.tell()
+                    if number < len(self._index):
+                        self._index[number] = manifest_file.tell()
+                    else:
+                        self._index.append(manifest_file.tell())
                     number += 1
                 line = manifest_file.readline()
 
@@ -339,6 +417,9 @@ class _Index:
 
         return self._index[number]
 
+    def __iter__(self):
+        return iter(self._index)
+
     def __len__(self):
         return len(self._index)
 
@@ -387,8 +468,36 @@ class _ManifestManager(ABC):
                 self._json_item_is_valid(**parsed_properties)
                 return parsed_properties
 
+    def get_range(self, start: int, stop: int, step: int = 1) -> List['ImageProperties']:
+        """
+        Reads the items in the [start, stop) range with the step.
+        The byte span covering the range is read from the manifest file at once.
+        """
+
+        assert self._index, 'No prepared index'
+        stop = min(stop, len(self._index))
+        if stop <= start:
+            return []
+
+        with open(self._manifest.path, 'rb') as manifest_file:
+            manifest_file.seek(self._index[start])
+            if stop < len(self._index):
+                span = manifest_file.read(self._index[stop] - self._index[start])
+            else:
+                span = manifest_file.read()
+
+        lines = [line for line in span.splitlines() if line.strip()]
+
+        items = []
+        for line in lines[:stop - start:step]:
+            item = ImageProperties(_json_loads(line))
+            self._json_item_is_valid(**item)
+            items.append(item)
+
+        return items
+
     def init_index(self):
-        if os.path.exists(self._index.path):
+        if self._index.exists():
             self._index.load()
         else:
             self._index.create(self._manifest.path, skip=self._manifest.get_header_lines_count())
@@ -396,7 +505,7 @@ class _ManifestManager(ABC):
                 self._index.dump()
 
     def reset_index(self):
-        if self._create_index and os.path.exists(self._index.path):
+        if self._create_index and self._index.exists():
             self._index.remove()
 
     def set_index(self):
@@ -442,7 +551,7 @@ class _ManifestManager(ABC):
 
     def __getitem__(self, item):
         if isinstance(item, slice):
-            return [self._parse_line(i) for i in range(item.start or 0, item.stop or len(self), item.step or 1)]
+            return self.get_range(item.start or 0, item.stop or len(self), item.step or 1)
         return self._parse_line(item)
 
     @property